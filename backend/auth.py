@@ -1,7 +1,7 @@
 # auth.py
 import jwt
 from datetime import datetime, timedelta
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from typing import Optional
@@ -21,27 +21,23 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-# Verify JWT
-def verify_token(token: str = Depends(oauth2_scheme)):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return username
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-
+# Verify JWT (decoded once per request and cached across requests, see auth_context.py)
+def verify_token(request: Request, token: str = Depends(oauth2_scheme)):
+    # local import to avoid circular imports at module import time
+    from auth_context import request_auth
 
+    ctx = request_auth(request)
+    if ctx.error:
+        raise HTTPException(status_code=401, detail=ctx.error)
+    if ctx.username is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return ctx.username
 
 
 # Helper: resolve class number from username and DB (keeps deps minimal to avoid circular imports)
 def get_user_class_number_by_username(username: str, db: Session) -> int:
     """
-    Return the numeric class for the given username by looking up the User in the DB.
+    Return the numeric class for the given username (cached user snapshot, see auth_context.py).
 
     - If the user has `class_level` like 'class_5' or '5', the numeric portion is returned.
     - Else falls back to the `level` integer column.
@@ -49,31 +45,9 @@ def get_user_class_number_by_username(username: str, db: Session) -> int:
     """
     try:
         # local import to avoid circular imports at module import time
-        from models.models import User
+        from auth_context import DEFAULT_CLASS_NUMBER, load_user
 
-        user = db.query(User).filter(User.username == username).first()
-        if not user:
-            return 5
-
-        # Prefer class_level if present
-        raw = getattr(user, "class_level", None)
-        if raw and isinstance(raw, str):
-            # extract digits from strings like 'class_5' or 'Grade 5' or '5'
-            digits = "".join(c for c in raw if c.isdigit())
-            if digits:
-                try:
-                    return int(digits)
-                except Exception:
-                    pass
-
-        # Fall back to level column
-        lvl = getattr(user, "level", None)
-        if lvl is not None:
-            try:
-                return int(lvl)
-            except Exception:
-                pass
-
-        return 5
+        user = load_user(db, username)
+        return user.class_number if user else DEFAULT_CLASS_NUMBER
     except Exception:
         return 5
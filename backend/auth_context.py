@@ -0,0 +1,162 @@
+"""Per-request auth context backed by short-lived caches.
+
+The bearer token of a request is decoded once and the user it names is
+loaded at most once, however many dependencies ask (`verify_token`,
+`get_user_class`, `get_user_class_number`); the result is kept on
+`request.state.auth`.
+
+Across requests, verified tokens are cached for `AUTH_TOKEN_CACHE_TTL`
+seconds (default 300, never past the token's own `exp`) and user profile
+snapshots for `AUTH_USER_CACHE_TTL` seconds (default 30). `/users/update`
+drops the user's snapshot, so a class change is visible on the next request
+of the same worker and within the TTL on other workers. Unknown users are
+never cached, so a new signup is picked up immediately.
+"""
+import os
+import time
+from typing import NamedTuple
+
+import jwt
+from fastapi import Request
+from sqlalchemy.orm import Session
+
+import metrics
+from auth import ALGORITHM, SECRET_KEY
+from models.models import User
+from ttl_cache import TTLCache
+
+AUTH_TOKEN_CACHE_TTL = float(os.getenv("AUTH_TOKEN_CACHE_TTL", "300"))
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "30"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
+DEFAULT_CLASS_NUMBER = 5
+
+token_cache = TTLCache(maxsize=AUTH_CACHE_MAX_ENTRIES, ttl=AUTH_TOKEN_CACHE_TTL)  # token -> (username, exp)
+user_cache = TTLCache(maxsize=AUTH_CACHE_MAX_ENTRIES, ttl=AUTH_USER_CACHE_TTL)  # username -> UserSnapshot
+
+_token_hits = metrics.counter("auth_token_cache_hits_total", "Bearer tokens served from the verified-token cache")
+_token_misses = metrics.counter("auth_token_cache_misses_total", "Bearer tokens verified with jwt.decode")
+_user_hits = metrics.counter("auth_user_cache_hits_total", "User snapshots served from the cache")
+_user_misses = metrics.counter("auth_user_cache_misses_total", "User snapshots loaded from the database")
+
+
+class UserSnapshot(NamedTuple):
+    """The profile fields auth-dependent code needs, detached from any session."""
+    id: int
+    username: str
+    name: str | None
+    level: int
+    class_level: str | None
+    resolved_class_key: str  # e.g. 'class_5', used to load syllabus/topics
+    class_number: int
+
+
+def _resolve_class(class_level, level) -> tuple:
+    """('class_<n>', n) preferring an explicit class_level ('class_5', '5', 'Grade 5') over level."""
+    level = level or DEFAULT_CLASS_NUMBER
+    resolved = f"class_{level}"
+    if class_level and isinstance(class_level, str) and class_level.strip():
+        cl = class_level.strip()
+        if cl.startswith("class_"):
+            resolved = cl
+        else:
+            digits = "".join(c for c in cl if c.isdigit())
+            resolved = f"class_{digits or level}"
+    digits = "".join(c for c in resolved if c.isdigit())
+    try:
+        number = int(digits) if digits else int(level)
+    except (TypeError, ValueError):
+        number = DEFAULT_CLASS_NUMBER
+    return resolved, number
+
+
+def snapshot_user(user: User) -> UserSnapshot:
+    resolved, number = _resolve_class(user.class_level, user.level)
+    return UserSnapshot(user.id, user.username, user.name, user.level or DEFAULT_CLASS_NUMBER,
+                        user.class_level, resolved, number)
+
+
+def decode_token(token: str) -> str:
+    """The username (`sub`) of a valid token; raises jwt.ExpiredSignatureError / jwt.InvalidTokenError."""
+    entry = token_cache.get(token)
+    if entry is not None:
+        username, exp = entry
+        if exp is not None and exp <= time.time():
+            token_cache.pop(token)
+            raise jwt.ExpiredSignatureError("Signature has expired")
+        _token_hits.inc()
+        return username
+    _token_misses.inc()
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    username = payload.get("sub")
+    if not username:
+        raise jwt.InvalidTokenError("Token has no subject")
+    token_cache.set(token, (username, payload.get("exp")))
+    return username
+
+
+def load_user(db: Session, username: str) -> UserSnapshot | None:
+    """Cached profile snapshot for `username`, or None if there is no such user."""
+    user = user_cache.get(username)
+    if user is not None:
+        _user_hits.inc()
+        return user
+    _user_misses.inc()
+    db_user = db.query(User).filter(User.username == username).first()
+    if db_user is None:
+        return None
+    user = snapshot_user(db_user)
+    user_cache.set(username, user)
+    return user
+
+
+def invalidate_user(username: str):
+    """Forget the cached snapshot after the user's profile changed."""
+    user_cache.pop(username)
+
+
+def clear():
+    token_cache.clear()
+    user_cache.clear()
+
+
+_UNSET = object()
+
+
+class AuthContext:
+    """Who made the request: resolved once, lazily, and shared by all dependencies."""
+
+    def __init__(self, token: str | None):
+        self.token = token
+        self.username = None
+        self.error = None  # 'Token expired' / 'Invalid token' when a token was sent but rejected
+        self._user = _UNSET
+        if token:
+            try:
+                self.username = decode_token(token)
+            except jwt.ExpiredSignatureError:
+                self.error = "Token expired"
+            except jwt.InvalidTokenError:
+                self.error = "Invalid token"
+
+    def user(self, db: Session) -> UserSnapshot | None:
+        """The requesting user's snapshot (None for guests and unknown users)."""
+        if self._user is _UNSET:
+            self._user = load_user(db, self.username) if self.username else None
+        return self._user
+
+
+def _bearer_token(request: Request) -> str | None:
+    parts = (request.headers.get("authorization") or "").split()
+    if len(parts) != 2 or parts[0].lower() != "bearer":
+        return None
+    return parts[1]
+
+
+def request_auth(request: Request) -> AuthContext:
+    """The request's AuthContext, created on first use and memoised on `request.state`."""
+    ctx = getattr(request.state, "auth", None)
+    if ctx is None:
+        ctx = AuthContext(_bearer_token(request))
+        request.state.auth = ctx
+    return ctx
@@ -0,0 +1,73 @@
+"""Circuit breaker for calls to an unreliable dependency (the LLM provider).
+
+Closed: calls go through. After `failure_threshold` consecutive failures the
+breaker opens and `allow()` returns False for `reset_timeout` seconds, so
+callers fail fast (and serve a fallback) instead of waiting on a provider
+that is down. Then it is half-open: a single probe call is let through; its
+success closes the breaker, its failure opens it again.
+"""
+import threading
+import time
+
+import metrics
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+_opened = metrics.counter("circuit_breaker_opened_total", "Times a circuit breaker opened")
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return CLOSED
+        if self.clock() - self._opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return OPEN
+
+    def allow(self) -> bool:
+        """Whether a call may be attempted now (at most one at a time while half-open)."""
+        with self._lock:
+            state = self._state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or (self._opened_at is None and self._failures >= self.failure_threshold):
+                print(f"⚠️ circuit breaker {self.name}: open after {self._failures} failures", flush=True)
+                _opened.inc()
+                self._opened_at = self.clock()
+                self._probing = False
+
+    def retry_after(self) -> float:
+        """Seconds until the next probe is allowed (0 when closed)."""
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self.reset_timeout - (self.clock() - self._opened_at))
@@ -0,0 +1,18 @@
+"""Class groups and score buckets shared by class_stats.py and leaderboard.py.
+
+A student belongs to `class_level:<class_level>` (when set) and
+`level:<level>`. Scores are quantised to SCORE_QUANTUM, which is exact for
+the 1.0 / 0.25 steps check_message_instant applies.
+"""
+SCORE_QUANTUM = 0.25
+
+
+def score_bucket(score) -> int:
+    return int(round((score or 0.0) / SCORE_QUANTUM))
+
+
+def class_keys(class_level, level) -> list:
+    keys = [f"level:{level}"]
+    if class_level:
+        keys.insert(0, f"class_level:{class_level}")
+    return keys
@@ -0,0 +1,230 @@
+"""Materialized per-class statistics for parent dashboards.
+
+`/parents/stats` compares a child with every student in the same class. Rather
+than scanning the class on each call, `class_stats` keeps running totals per
+class (student count, score sum, attempt sums, max score) and
+`class_score_histogram` keeps how many students sit at each quantised score.
+Rank and percentile are then a sum over the histogram buckets above the
+child's score, independent of class size.
+
+The tables are updated incrementally, in the caller's transaction, by
+`apply_user_change()` whenever a user's score, attempts or class changes, so
+they commit or roll back together with the `users` row. Scores move in steps
+of 1.0 and 0.25 (see check_message_instant), so a 0.25 quantum makes the
+histogram exact.
+
+A student belongs to two groups, mirroring how parent_stats picks the class:
+`class_level:<class_level>` (when set) and `level:<level>`.
+
+Recovery: `python class_stats.py rebuild` recomputes both tables from `users`.
+"""
+import sys
+
+from sqlalchemy import Integer, cast, delete, func, select, true, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from class_groups import SCORE_QUANTUM, class_keys, score_bucket
+from leaderboard import leaderboards
+from models.models import ClassScoreBucket, ClassStats, User
+
+_stats = ClassStats.__table__
+_hist = ClassScoreBucket.__table__
+
+_STAT_COLUMNS = ("student_count", "score_sum", "total_attempts_sum", "correct_attempts_sum")
+
+
+def key_for(student: User) -> str:
+    """The group parent_stats compares `student` with (class_level if set, else level)."""
+    return class_keys(student.class_level, student.level)[0]
+
+
+def snapshot(user: User | None) -> dict | None:
+    """The fields of `user` that feed class statistics."""
+    if user is None:
+        return None
+    return {
+        "username": user.username,
+        "class_level": user.class_level,
+        "level": user.level,
+        "score": float(user.score or 0.0),
+        "total_attempts": int(user.total_attempts or 0),
+        "correct_attempts": int(user.correct_attempts or 0),
+    }
+
+
+def _upsert_add(db: Session, table, key_columns: tuple, rows: list):
+    """Add the non-key values of each row onto the existing row, inserting missing rows."""
+    if not rows:
+        return
+    value_columns = [c for c in rows[0] if c not in key_columns]
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key_columns),
+            set_={c: table.c[c] + stmt.excluded[c] for c in value_columns},
+        )
+        db.execute(stmt, rows)
+        return
+    for row in rows:
+        where = [table.c[k] == row[k] for k in key_columns]
+        res = db.execute(update(table).where(*where).values({c: table.c[c] + row[c] for c in value_columns}))
+        if res.rowcount == 0:
+            db.execute(table.insert().values(**row))
+
+
+def apply_user_change(db: Session, before: dict | None, after: dict | None):
+    """Move one user's contribution from `before` to `after` (snapshots; None = absent).
+
+    Does not commit: call it inside the transaction that changes the user.
+    The in-memory leaderboard picks the change up when that transaction commits.
+    """
+    if before == after:
+        return
+    leaderboards.stage_change(db, before, after)
+
+    stat_deltas = {}
+    bucket_deltas = {}
+    for snap, sign in ((before, -1), (after, 1)):
+        if snap is None:
+            continue
+        bucket = score_bucket(snap["score"])
+        for key in class_keys(snap["class_level"], snap["level"]):
+            d = stat_deltas.setdefault(key, dict.fromkeys(_STAT_COLUMNS, 0))
+            d["student_count"] += sign
+            d["score_sum"] += sign * snap["score"]
+            d["total_attempts_sum"] += sign * snap["total_attempts"]
+            d["correct_attempts_sum"] += sign * snap["correct_attempts"]
+            bucket_deltas[(key, bucket)] = bucket_deltas.get((key, bucket), 0) + sign
+
+    _upsert_add(
+        db, _stats, ("class_key",),
+        [{"class_key": key, **d} for key, d in stat_deltas.items() if any(d.values())],
+    )
+    _upsert_add(
+        db, _hist, ("class_key", "bucket"),
+        [{"class_key": k, "bucket": b, "count": n} for (k, b), n in bucket_deltas.items() if n],
+    )
+
+    touched = list(stat_deltas)
+    db.execute(delete(_hist).where(_hist.c.class_key.in_(touched), _hist.c.count <= 0))
+    # Max score can drop when the top student loses points or leaves the class
+    top_bucket = (
+        select(func.max(_hist.c.bucket))
+        .where(_hist.c.class_key == _stats.c.class_key)
+        .scalar_subquery()
+    )
+    db.execute(
+        update(_stats)
+        .where(_stats.c.class_key.in_(touched))
+        .values(max_score=func.coalesce(top_bucket, 0) * SCORE_QUANTUM)
+    )
+
+
+def comparison(db: Session, student: User) -> dict | None:
+    """Class comparison for `student` from the materialized tables, or None if not built."""
+    key = key_for(student)
+    row = db.get(ClassStats, key)
+    if row is None or row.student_count <= 0:
+        return None
+
+    total = int(row.student_count)
+    # Rank from the in-memory order-statistic index when it is built (O(log n),
+    # no query); otherwise sum the histogram buckets above the student.
+    board = leaderboards.board(key) if leaderboards.loaded else None
+    if board is not None and len(board):
+        higher_count, total_ranked = leaderboards.read(lambda: (board.higher_count(student.score), len(board)))
+    else:
+        higher_count = db.execute(
+            select(func.coalesce(func.sum(_hist.c.count), 0))
+            .where(_hist.c.class_key == key, _hist.c.bucket > score_bucket(student.score))
+        ).scalar()
+        total_ranked = total
+
+    higher_count = int(higher_count or 0)
+    return {
+        "class_count": total,
+        "avg_score": float(row.score_sum / total),
+        "avg_accuracy": float(row.correct_attempts_sum / row.total_attempts_sum) if row.total_attempts_sum else 0.0,
+        "top_score": float(row.max_score),
+        # Rank by score (1 = highest)
+        "rank": higher_count + 1,
+        "percentile": 100.0 * (1.0 - (higher_count / total_ranked)),
+    }
+
+
+def rebuild_class_stats(db: Session) -> int:
+    """Recompute both tables from `users` (recovery / first deployment). Commits; returns groups built."""
+    db.execute(delete(_hist))
+    db.execute(delete(_stats))
+
+    score = func.coalesce(User.score, 0.0)
+    bucket = cast(func.round(score / SCORE_QUANTUM), Integer)
+    groups = 0
+    for prefix, column, where in (
+        ("class_level", User.class_level, (User.class_level.isnot(None)) & (User.class_level != "")),
+        ("level", User.level, true()),
+    ):
+        totals = db.execute(
+            select(
+                column,
+                func.count(User.id),
+                func.sum(score),
+                func.sum(func.coalesce(User.total_attempts, 0)),
+                func.sum(func.coalesce(User.correct_attempts, 0)),
+                func.max(score),
+            ).where(where).group_by(column)
+        ).all()
+        if totals:
+            db.execute(_stats.insert(), [
+                {
+                    "class_key": f"{prefix}:{value}",
+                    "student_count": count,
+                    "score_sum": score_sum or 0.0,
+                    "total_attempts_sum": attempts or 0,
+                    "correct_attempts_sum": correct or 0,
+                    "max_score": max_score or 0.0,
+                }
+                for value, count, score_sum, attempts, correct, max_score in totals
+            ])
+        histogram = db.execute(
+            select(column, bucket, func.count(User.id)).where(where).group_by(column, bucket)
+        ).all()
+        if histogram:
+            db.execute(_hist.insert(), [
+                {"class_key": f"{prefix}:{value}", "bucket": b, "count": n} for value, b, n in histogram
+            ])
+        groups += len(totals)
+
+    db.commit()
+    return groups
+
+
+def ensure_class_stats(session_factory):
+    """Build the tables on first start when users exist but no stats do (non-fatal)."""
+    db = session_factory()
+    try:
+        if db.query(ClassStats.class_key).first() is None and db.query(User.id).first() is not None:
+            groups = rebuild_class_stats(db)
+            print(f"class_stats built for {groups} groups", flush=True)
+    except Exception as e:
+        db.rollback()
+        print(f"class_stats build error (non-fatal, using live aggregates): {e}", flush=True)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebuild"]:
+        print("usage: python class_stats.py rebuild")
+        sys.exit(2)
+    from database import Base, SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        print(f"Rebuilt class_stats for {rebuild_class_stats(session)} groups")
+    finally:
+        session.close()
@@ -0,0 +1,139 @@
+"""Negotiated response compression (brotli when installed, otherwise gzip).
+
+JSON and text responses of at least `COMPRESSION_MIN_BYTES` (default 1 KB)
+are compressed with the best encoding the client accepts; smaller bodies go
+out as-is, since compressing them costs more than it saves. Already-encoded
+responses, non-text types (PDFs, images, video) and streamed bodies pass
+through untouched.
+
+Compressed responses get `Vary: Accept-Encoding` and an encoding suffix on
+a strong ETag ("abc" -> "abc-gzip"), so caches never serve one encoding for
+another. The suffix is stripped from incoming If-None-Match headers, so the
+ETag checks in http_cache.py keep matching.
+"""
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+_COMPRESSIBLE = ("application/json", "text/", "application/javascript", "application/xml", "image/svg+xml")
+
+
+def _accepted_encodings(header: str) -> dict:
+    accepted = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    return accepted
+
+
+def negotiate(accept_encoding: str) -> str | None:
+    """The encoding to use for a request's Accept-Encoding: 'br', 'gzip' or None."""
+    accepted = _accepted_encodings(accept_encoding)
+    for encoding in (("br", "gzip") if brotli is not None else ("gzip",)):
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _header(headers, name: bytes):
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        encoding = negotiate((_header(scope["headers"], b"accept-encoding") or b"").decode("latin-1"))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        suffix = f"-{encoding}\"".encode("latin-1")
+        inm = _header(scope["headers"], b"if-none-match")
+        client_has_encoded = inm is not None and suffix in inm
+        if client_has_encoded:
+            scope = {**scope, "headers": [
+                (k, v.replace(suffix, b'"') if k == b"if-none-match" else v) for k, v in scope["headers"]
+            ]}
+
+        start = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if passthrough:
+                return await send(message)
+            if message["type"] == "http.response.start":
+                start = message
+                if message["status"] == 304 and client_has_encoded:
+                    await send({**message, "headers": self._tag(message["headers"], suffix)})
+                    passthrough = True
+                return
+            if message["type"] != "http.response.body":
+                return await send(message)
+
+            headers = list(start.get("headers", []))
+            body = message.get("body", b"")
+            content_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+            if (
+                message.get("more_body", False)
+                or start["status"] in (204, 304)
+                or _header(headers, b"content-encoding") is not None
+                or not content_type.startswith(_COMPRESSIBLE)
+                or len(body) < self.minimum_size
+            ):
+                passthrough = True
+                await send(start)
+                return await send(message)
+
+            body = compress(body, encoding)
+            headers = [(k, v) for k, v in self._tag(headers, suffix) if k.lower() != b"content-length"]
+            headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"vary", b"Accept-Encoding"),
+            ]
+            passthrough = True
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+    @staticmethod
+    def _tag(headers, suffix: bytes) -> list:
+        """Add the encoding suffix to a strong ETag."""
+        out = []
+        for key, value in headers:
+            if key.lower() == b"etag" and value.startswith(b'"') and value.endswith(b'"'):
+                value = value[:-1] + suffix
+            out.append((key, value))
+        return out
@@ -0,0 +1,120 @@
+"""Shared pytest fixtures for the in-process backend tests in `test/`.
+
+The app is imported against a throwaway SQLite file so the developer's
+`app.db` is never touched. Every test starts from empty tables.
+"""
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+BASE_DIR = Path(__file__).resolve().parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+_TMP_DIR = tempfile.mkdtemp(prefix="math4champ-test-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP_DIR}/test.db"
+os.environ["CONVERSATION_SUMMARY_ENABLED"] = "false"  # tests drive ConversationSummarizer directly
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+import auth_context  # noqa: E402
+import llm  # noqa: E402
+import main  # noqa: E402
+import rate_limit  # noqa: E402
+from database import Base, SessionLocal, engine  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _empty_tables():
+    with engine.begin() as conn:
+        for tbl in reversed(Base.metadata.sorted_tables):
+            conn.execute(tbl.delete())
+    auth_context.clear()
+    rate_limit.rate_limiter.reset()
+    yield
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client():
+    with TestClient(main.app) as c:
+        yield c
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """Canned chat LLM calls; append verdicts for `check_answer` to the returned list."""
+    verdicts = []
+    monkeypatch.setattr(llm, "get_chat_title", lambda text: "title")
+    monkeypatch.setattr(llm, "generate_hint", lambda **kwargs: "hint")
+    monkeypatch.setattr(llm, "check_answer", lambda **kwargs: verdicts.pop(0))
+    return verdicts
+
+
+@pytest.fixture
+def answer(client, fake_llm):
+    """Post a final answer for `username` through /chat/send/check, graded `correct`."""
+
+    def _answer(username, correct):
+        fake_llm.append({"final": True, "correct": correct})
+        r = client.post(f"/chat/send/check/{username}", json={"text": "42", "sender": "user", "session_id": username})
+        assert r.status_code == 200
+
+    return _answer
+
+
+@pytest.fixture
+def report_child():
+    """A child's stats as the parent report endpoints receive them."""
+    return {"username": "kid", "name": "Kid", "class_level": "class_6", "score": 3.5, "accuracy": 0.75,
+            "total_attempts": 4, "correct_attempts": 3, "current_streak": 2, "max_streak": 3}
+
+
+@pytest.fixture
+def report_comparison():
+    """Class averages to go with `report_child`."""
+    return {"class_count": 10, "avg_score": 2.0, "avg_accuracy": 0.5, "top_score": 5.0, "rank": 2, "percentile": 90.0}
+
+
+class StatementCounter:
+    """Records every SQL statement sent to the engine while active."""
+
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@pytest.fixture
+def count_queries():
+    """Context manager counting SQL statements, e.g. `with count_queries() as q: ...; q.count`."""
+
+    @contextmanager
+    def _count():
+        counter = StatementCounter()
+
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            counter.statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", _before)
+        try:
+            yield counter
+        finally:
+            event.remove(engine, "before_cursor_execute", _before)
+
+    return _count
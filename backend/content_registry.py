@@ -0,0 +1,136 @@
+"""Static content (syllabus topics, tutor prompt, quotes) loaded once and served from memory.
+
+Each file is parsed and indexed into an immutable `ContentSnapshot`. Readers
+take the current snapshot and never see a half-built one: a reload builds the
+new snapshot first and then swaps a single reference. Files are checked for
+changes (mtime and size) at most every `CONTENT_CHECK_SECONDS` (default 2), so
+editing `topics.json` or `quotes.json` takes effect without a restart. If a
+changed file cannot be parsed (e.g. caught mid-write) the previous snapshot
+keeps being served and the reload is retried on the next check.
+
+Every snapshot carries a `version` (content hash) that changes exactly when
+the served data changes.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from quotes_index import QuotesIndex
+
+BASE_DIR = Path(__file__).resolve().parent
+TOPICS_PATH = BASE_DIR / "syllabus" / "topics.json"
+UPPER_SYLLABUS_PATH = BASE_DIR / "syllabus" / "class6-12.json"
+BASE_PROMPT_PATH = BASE_DIR / "prompts" / "two.json"
+QUOTES_PATH = BASE_DIR / "quotes.json"
+
+CONTENT_CHECK_SECONDS = float(os.getenv("CONTENT_CHECK_SECONDS", "2"))
+
+
+class ContentUnavailable(Exception):
+    """The file is missing or has never been parsed successfully."""
+
+
+class ContentSnapshot(NamedTuple):
+    data: Any  # parsed JSON, as stored in the file
+    index: Any  # lookup structures built by the file's index function
+    version: str  # sha256 prefix of the file bytes
+
+
+class StaticContent:
+    """One JSON file, parsed and indexed once, reloaded when it changes on disk."""
+
+    def __init__(self, path: Path, build_index=lambda data: None, check_interval: float = CONTENT_CHECK_SECONDS,
+                 clock=time.monotonic):
+        self.path = Path(path)
+        self.build_index = build_index
+        self.check_interval = check_interval
+        self.clock = clock
+        self._snapshot = None
+        self._signature = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self, signature):
+        raw = self.path.read_bytes()
+        data = json.loads(raw)
+        snapshot = ContentSnapshot(data, self.build_index(data), hashlib.sha256(raw).hexdigest()[:16])
+        self._snapshot = snapshot  # atomic swap
+        self._signature = signature
+
+    def snapshot(self) -> ContentSnapshot:
+        """The current snapshot; raises ContentUnavailable if the file was never loaded."""
+        snapshot = self._snapshot
+        if snapshot is not None and self.clock() < self._next_check:
+            return snapshot
+        with self._lock:
+            now = self.clock()
+            if self._snapshot is None or now >= self._next_check:
+                self._next_check = now + self.check_interval
+                self._refresh()
+            if self._snapshot is None:
+                raise ContentUnavailable(f"{self.path.name} could not be loaded")
+            return self._snapshot
+
+    def _refresh(self):
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            if self._snapshot is None:
+                raise ContentUnavailable(f"{self.path.name} not found")
+            return  # keep serving the last good copy
+        signature = (st.st_mtime_ns, st.st_size)
+        if signature == self._signature:
+            return
+        try:
+            self._load(signature)
+            print(f"content: loaded {self.path.name} (version {self._snapshot.version})", flush=True)
+        except Exception as e:
+            if self._snapshot is None:
+                raise ContentUnavailable(f"Failed to read {self.path.name}: {e}") from e
+            print(f"⚠️ content: reload of {self.path.name} failed, keeping previous version: {e}", flush=True)
+
+
+def class_key(level) -> str:
+    """'class_<n>' for a class number, 'class_<n>' string or ' <n> '."""
+    return f"class_{str(level).strip().replace('class_', '')}"
+
+
+def _index_topics(data: dict) -> dict:
+    # class key -> topic names, in file order
+    return {key: list(topics.keys()) for key, topics in data.items() if isinstance(topics, dict)}
+
+
+topics_content = StaticContent(TOPICS_PATH, _index_topics)
+upper_syllabus_content = StaticContent(UPPER_SYLLABUS_PATH)  # classes 6-12
+base_prompt_content = StaticContent(BASE_PROMPT_PATH)  # tutor system prompt
+quotes_content = StaticContent(QUOTES_PATH, QuotesIndex)
+
+
+def syllabus_content(class_number: int) -> StaticContent:
+    return topics_content if 1 <= class_number <= 5 else upper_syllabus_content
+
+
+def _version(content: StaticContent) -> str | None:
+    try:
+        return content.snapshot().version
+    except ContentUnavailable:
+        return None
+
+
+def prompt_version(class_number: int) -> tuple:
+    """Versions of the files a class's tutor prompt is built from; changes when either is edited."""
+    return _version(base_prompt_content), _version(syllabus_content(class_number))
+
+
+def class_topics(level):
+    """Syllabus topics for a user's class (dict of topic -> subtopics), or None."""
+    if level is None:
+        return None
+    try:
+        return topics_content.snapshot().data.get(class_key(level))
+    except ContentUnavailable:
+        return None
@@ -0,0 +1,164 @@
+"""Rolling summaries of long tutoring chats.
+
+Each `Chat` stores a compact `summary` of its older messages and the id of
+the last message folded into it (`summary_upto_id`). Prompts get that summary
+plus the messages after it, so per-turn prompt size stays flat over long
+sessions while the model keeps the long-range context.
+
+Once a chat has at least `CONVERSATION_SUMMARY_EVERY` (default 6) messages
+beyond the summary, on top of the `CONVERSATION_SUMMARY_KEEP_RECENT` (default
+4) most recent ones, the chat is queued for the background summarizer. It
+folds those older messages into the summary with one small LLM call, off the
+request path. The update is conditional on `summary_upto_id` being unchanged,
+so two workers summarizing the same chat cannot overwrite each other. If the
+LLM is unavailable the old summary stays and the chat is queued again on its
+next message.
+"""
+import os
+import threading
+
+from sqlalchemy import func, inspect, text
+
+import metrics
+from database import SessionLocal
+from models.models import Chat, Message
+
+CONVERSATION_SUMMARY_ENABLED = os.getenv("CONVERSATION_SUMMARY_ENABLED", "true").lower() == "true"
+CONVERSATION_SUMMARY_EVERY = int(os.getenv("CONVERSATION_SUMMARY_EVERY", "6"))
+CONVERSATION_SUMMARY_KEEP_RECENT = int(os.getenv("CONVERSATION_SUMMARY_KEEP_RECENT", "4"))
+CONVERSATION_SUMMARY_MAX_TOKENS = int(os.getenv("CONVERSATION_SUMMARY_MAX_TOKENS", "200"))
+
+_summaries = metrics.counter("conversation_summaries_total", "Chat summaries updated")
+_summary_failures = metrics.counter("conversation_summary_failures_total", "Chat summary updates that failed")
+
+
+def ensure_summary_columns(engine):
+    """Add the summary columns to an existing `chats` table (lightweight dev-time migration)."""
+    try:
+        cols = {c["name"] for c in inspect(engine).get_columns("chats")}
+        stmts = []
+        if "summary" not in cols:
+            stmts.append("ALTER TABLE chats ADD COLUMN summary TEXT")
+        if "summary_upto_id" not in cols:
+            stmts.append("ALTER TABLE chats ADD COLUMN summary_upto_id INTEGER")
+        if stmts:
+            with engine.begin() as conn:
+                for stmt in stmts:
+                    conn.execute(text(stmt))
+            print(f"DB migration applied: added columns -> {stmts}", flush=True)
+    except Exception as e:
+        print(f"DB migration error (non-fatal): {e}", flush=True)
+
+
+def _unsummarized(db, chat):
+    query = db.query(Message).filter(Message.chat_id == chat.id)
+    if chat.summary_upto_id is not None:
+        query = query.filter(Message.id > chat.summary_upto_id)
+    return query
+
+
+def recent_messages(db, chat, limit: int) -> list:
+    """Up to `limit` newest messages not yet in the chat's summary, oldest first."""
+    messages = _unsummarized(db, chat).order_by(Message.id.desc()).limit(limit).all()
+    messages.reverse()
+    return messages
+
+
+def format_turns(messages: list) -> str:
+    return "\n".join(f"{m.sender.capitalize()}: {m.text}" for m in messages if m.text)
+
+
+class ConversationSummarizer:
+    """Background thread folding older chat messages into `Chat.summary`."""
+
+    def __init__(self, session_factory=SessionLocal, summarize=None, every: int = CONVERSATION_SUMMARY_EVERY,
+                 keep_recent: int = CONVERSATION_SUMMARY_KEEP_RECENT, enabled: bool = CONVERSATION_SUMMARY_ENABLED):
+        self.session_factory = session_factory
+        self._summarize = summarize  # (previous_summary, turns_text) -> summary; defaults to llm.summarize_conversation
+        self.every = every
+        self.keep_recent = keep_recent
+        self.enabled = enabled
+        self._pending = set()  # chat ids
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def summarize(self, previous_summary, turns_text):
+        if self._summarize is not None:
+            return self._summarize(previous_summary, turns_text)
+        import llm  # llm imports this module for its settings
+
+        return llm.summarize_conversation(previous_summary, turns_text)
+
+    def maybe_schedule(self, db, chat):
+        """Queue `chat` once enough messages have piled up beyond its summary (one COUNT query)."""
+        if not self.enabled:
+            return
+        count = _unsummarized(db, chat).with_entities(func.count(Message.id)).scalar()
+        if count >= self.every + self.keep_recent:
+            with self._lock:
+                self._pending.add(chat.id)
+            self._wake.set()
+
+    def summarize_chat(self, chat_id: int) -> bool:
+        """Fold the chat's older unsummarized messages into its summary; True if it was updated."""
+        db = self.session_factory()
+        try:
+            chat = db.query(Chat).filter(Chat.id == chat_id).first()
+            if chat is None:
+                return False
+            messages = _unsummarized(db, chat).order_by(Message.id).all()
+            older = messages[:-self.keep_recent] if self.keep_recent else messages
+            if len(older) < self.every:
+                return False
+
+            previous_upto = chat.summary_upto_id
+            summary = self.summarize(chat.summary, format_turns(older))
+            condition = Chat.summary_upto_id.is_(None) if previous_upto is None else Chat.summary_upto_id == previous_upto
+            updated = (
+                db.query(Chat)
+                .filter(Chat.id == chat_id, condition)
+                .update({Chat.summary: summary, Chat.summary_upto_id: older[-1].id}, synchronize_session=False)
+            )
+            db.commit()
+            if updated:
+                _summaries.inc()
+            return bool(updated)
+        except Exception as e:
+            db.rollback()
+            _summary_failures.inc()
+            print(f"⚠️ conversation summary for chat {chat_id} failed: {e}", flush=True)
+            return False
+        finally:
+            db.close()
+
+    def run_pending(self) -> int:
+        with self._lock:
+            chat_ids, self._pending = self._pending, set()
+        return sum(self.summarize_chat(chat_id) for chat_id in sorted(chat_ids))
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            self.run_pending()
+
+    def start(self):
+        if not self.enabled or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="conversation-summary", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=30)
+            self._thread = None
+
+
+summarizer = ConversationSummarizer()
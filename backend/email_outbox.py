@@ -0,0 +1,262 @@
+"""Persistent email outbox with a background SMTP sender.
+
+Endpoints call `enqueue_email()`, which stores the message in `email_outbox`
+and returns at once with the row id as a job id. `email_sender` picks up due
+rows in batches of `EMAIL_BATCH_SIZE` and delivers a whole batch over one
+SMTP connection (connect, STARTTLS and login once), instead of one connection
+per email.
+
+Failed deliveries are retried with exponential backoff and jitter
+(`EMAIL_RETRY_BASE_SECONDS` doubling up to `EMAIL_RETRY_MAX_SECONDS`) until
+`EMAIL_MAX_ATTEMPTS`, after which the row is marked `failed`. A row being sent
+is leased for `EMAIL_SEND_LEASE_SECONDS`; if the process dies mid-batch the
+lease expires and another sender retries it, so delivery is at-least-once.
+
+SMTP settings come from the environment: SMTP_HOST, SMTP_PORT, SMTP_USER,
+SMTP_PASSWORD, SMTP_FROM_EMAIL, SMTP_FROM_NAME and SMTP_STARTTLS (default on).
+"""
+import os
+import random
+import smtplib
+import threading
+import time
+from datetime import datetime
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from sqlalchemy import or_, update
+
+from database import SessionLocal
+from models.models import EmailOutbox
+
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "50"))
+EMAIL_POLL_SECONDS = float(os.getenv("EMAIL_POLL_SECONDS", "5"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "6"))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "30"))
+EMAIL_RETRY_MAX_SECONDS = float(os.getenv("EMAIL_RETRY_MAX_SECONDS", "3600"))
+EMAIL_SEND_LEASE_SECONDS = float(os.getenv("EMAIL_SEND_LEASE_SECONDS", "300"))
+
+
+class SmtpSettings:
+    def __init__(self, host, port, user=None, password=None, from_email=None,
+                 from_name="Toeho Learning Platform", starttls=True, timeout=30.0):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.from_email = from_email or user
+        self.from_name = from_name
+        self.starttls = starttls
+        self.timeout = timeout
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            host=os.getenv("SMTP_HOST", "smtp.gmail.com"),
+            port=int(os.getenv("SMTP_PORT", "587")),
+            user=os.getenv("SMTP_USER"),
+            password=os.getenv("SMTP_PASSWORD"),
+            from_email=os.getenv("SMTP_FROM_EMAIL", os.getenv("SMTP_USER")),
+            from_name=os.getenv("SMTP_FROM_NAME", "Toeho Learning Platform"),
+            starttls=os.getenv("SMTP_STARTTLS", "1").lower() not in ("0", "false", "no"),
+        )
+
+    def connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.user and self.password:
+                server.login(self.user, self.password)
+        except Exception:
+            server.close()
+            raise
+        return server
+
+
+def build_message(row: EmailOutbox, settings: SmtpSettings) -> MIMEMultipart:
+    msg = MIMEMultipart()
+    msg["From"] = f"{settings.from_name} <{settings.from_email}>"
+    msg["To"] = row.to_email
+    msg["Subject"] = row.subject
+    msg.attach(MIMEText(row.body, "plain"))
+    if row.attachment is not None:
+        attachment = MIMEApplication(row.attachment, _subtype="pdf")
+        attachment.add_header("Content-Disposition", "attachment", filename=row.attachment_name or "attachment.pdf")
+        msg.attach(attachment)
+    return msg
+
+
+def enqueue_email(db, to_email: str, subject: str, body: str, attachment: bytes | None = None,
+                  attachment_name: str | None = None, owner: str | None = None, commit: bool = True) -> EmailOutbox:
+    """Store an email for delivery and wake the sender; returns the outbox row (its id is the job id)."""
+    row = EmailOutbox(
+        owner=owner,
+        to_email=to_email,
+        subject=subject,
+        body=body,
+        attachment=attachment,
+        attachment_name=attachment_name,
+        status="pending",
+        attempts=0,
+        next_attempt_at=0.0,
+        created_at=datetime.utcnow().isoformat(),
+    )
+    db.add(row)
+    if commit:
+        db.commit()
+        db.refresh(row)
+        email_sender.wake()
+    return row
+
+
+class EmailSender:
+    """Background thread delivering due outbox rows over one SMTP connection per batch."""
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        settings_factory=SmtpSettings.from_env,
+        batch_size: int = EMAIL_BATCH_SIZE,
+        poll_seconds: float = EMAIL_POLL_SECONDS,
+        max_attempts: int = EMAIL_MAX_ATTEMPTS,
+        retry_base_seconds: float = EMAIL_RETRY_BASE_SECONDS,
+        retry_max_seconds: float = EMAIL_RETRY_MAX_SECONDS,
+        lease_seconds: float = EMAIL_SEND_LEASE_SECONDS,
+        clock=time.time,
+    ):
+        self.session_factory = session_factory
+        self.settings_factory = settings_factory
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.lease_seconds = lease_seconds
+        self.clock = clock
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def backoff(self, attempts: int) -> float:
+        """Delay before retry number `attempts` (1-based): exponential, capped, jittered."""
+        delay = min(self.retry_max_seconds, self.retry_base_seconds * 2 ** (attempts - 1))
+        return random.uniform(delay / 2, delay)
+
+    def _claim(self, db) -> list:
+        """Lease up to one batch of due rows; rows leased by another sender are skipped."""
+        now = self.clock()
+        candidates = (
+            db.query(EmailOutbox.id, EmailOutbox.status, EmailOutbox.next_attempt_at)
+            .filter(
+                or_(EmailOutbox.status == "pending", EmailOutbox.status == "sending"),
+                EmailOutbox.next_attempt_at <= now,
+            )
+            .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+            .limit(self.batch_size)
+            .all()
+        )
+        claimed = []
+        for row_id, status, due in candidates:
+            res = db.execute(
+                update(EmailOutbox)
+                .where(EmailOutbox.id == row_id, EmailOutbox.status == status, EmailOutbox.next_attempt_at == due)
+                .values(status="sending", next_attempt_at=now + self.lease_seconds)
+            )
+            if res.rowcount == 1:
+                claimed.append(row_id)
+        db.commit()
+        if not claimed:
+            return []
+        return db.query(EmailOutbox).filter(EmailOutbox.id.in_(claimed)).order_by(EmailOutbox.id).all()
+
+    def _failed(self, row: EmailOutbox, error: Exception):
+        row.attempts += 1
+        row.last_error = f"{type(error).__name__}: {error}"
+        if row.attempts >= self.max_attempts:
+            row.status = "failed"
+        else:
+            row.status = "pending"
+            row.next_attempt_at = self.clock() + self.backoff(row.attempts)
+
+    def send_pending(self) -> int:
+        """Deliver one batch of due emails; returns how many were sent."""
+        db = self.session_factory()
+        try:
+            rows = self._claim(db)
+            if not rows:
+                return 0
+
+            settings = self.settings_factory()
+            try:
+                server = settings.connect()
+            except Exception as e:
+                print(f"⚠️ email outbox: SMTP connect failed, retrying {len(rows)} later: {e}", flush=True)
+                for row in rows:
+                    self._failed(row, e)
+                db.commit()
+                return 0
+
+            sent = 0
+            try:
+                for row in rows:
+                    try:
+                        server.send_message(build_message(row, settings))
+                    except smtplib.SMTPServerDisconnected as e:
+                        # The connection is gone: this and the remaining rows go back to the queue
+                        for rest in rows[rows.index(row):]:
+                            self._failed(rest, e)
+                        break
+                    except Exception as e:
+                        self._failed(row, e)
+                    else:
+                        row.status = "sent"
+                        row.attempts += 1
+                        row.last_error = None
+                        row.sent_at = datetime.utcnow().isoformat()
+                        sent += 1
+                    db.commit()  # record each outcome so a crash does not resend delivered mail
+            finally:
+                try:
+                    server.quit()
+                except Exception:
+                    server.close()
+            db.commit()
+            return sent
+        finally:
+            db.close()
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                # Keep going while full batches come back
+                while self.send_pending() >= self.batch_size and not self._stop.is_set():
+                    pass
+            except Exception as e:
+                print(f"⚠️ email outbox send failed: {e}", flush=True)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=30)
+            self._thread = None
+
+
+email_sender = EmailSender()
@@ -0,0 +1,44 @@
+"""Fast JSON responses for the whole API.
+
+`FastJSONResponse` is the app's default response class: it renders with
+orjson instead of the standard-library encoder, and renders pydantic models
+straight to bytes with pydantic-core.
+
+FastAPI still validates and converts a `response_model` result to plain
+Python objects before the response class sees it. Endpoints returning large
+lists of models (chat history, teacher videos) use `model_response()`
+instead, which validates the ORM objects and writes the JSON bytes in one
+pydantic-core pass. The declared `response_model` stays for the OpenAPI docs.
+"""
+from functools import lru_cache
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+
+
+def _default(value):
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.model_dump_json().encode("utf-8")
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+@lru_cache(maxsize=None)
+def _adapter(schema) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+
+def model_response(schema, value, status_code: int = 200) -> Response:
+    """Serialize `value` (ORM objects or dicts) as `schema`, e.g. `list[ChatSchema]`, in one pass."""
+    adapter = _adapter(schema)
+    body = adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+    return Response(content=body, status_code=status_code, media_type="application/json")
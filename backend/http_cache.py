@@ -0,0 +1,182 @@
+"""HTTP caching (ETag / If-None-Match / Cache-Control) for static-content routes.
+
+The syllabus and quotes data change a few times a term, so browsers and CDNs
+should keep it. For routes whose response depends only on the URL, the ETag
+comes from the content registry version, and 200 responses carry the ETag plus
+a public `Cache-Control` lifetime (`STATIC_CACHE_MAX_AGE`, default 1h). The
+version covers a whole file, not one URL, so a matching `If-None-Match` (or
+`*`) gets a 304 without running the endpoint only when that method and URL
+already answered 200 under the same version. Otherwise the endpoint runs, and
+a 200 becomes a 304; its 404s and 405s pass through unchanged.
+
+`/topics/` depends on the caller's class (from the Authorization header), so
+the endpoint always runs and the ETag is a hash of the body; it is marked
+`private` with `Vary: Authorization` so shared caches never mix users.
+
+Only successful GET/HEAD responses are tagged; errors pass through unchanged.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Callable, NamedTuple
+
+from content_registry import ContentUnavailable, quotes_content, topics_content
+
+STATIC_CACHE_MAX_AGE = int(os.getenv("STATIC_CACHE_MAX_AGE", "3600"))
+DAILY_CACHE_MAX_AGE = int(os.getenv("DAILY_CACHE_MAX_AGE", "600"))
+PRIVATE_CACHE_MAX_AGE = int(os.getenv("PRIVATE_CACHE_MAX_AGE", "300"))
+# (method, path, query) entries remembered as answering 200 for their current ETag
+HTTP_CACHE_KNOWN_URLS = int(os.getenv("HTTP_CACHE_KNOWN_URLS", "4096"))
+
+
+class CacheRule(NamedTuple):
+    matches: Callable[[str], bool]
+    # ETag value (without quotes) from the content version, or None to hash the body
+    version: Callable[[], str] | None
+    cache_control: str
+    vary: str | None = None
+
+
+CACHE_RULES = (
+    CacheRule(
+        lambda path: path.startswith("/syllabus/"),
+        lambda: f"t-{topics_content.snapshot().version}",
+        f"public, max-age={STATIC_CACHE_MAX_AGE}",
+    ),
+    CacheRule(
+        lambda path: path == "/quotes/" or path.startswith("/quotes/by-topic/"),
+        lambda: f"q-{quotes_content.snapshot().version}",
+        f"public, max-age={STATIC_CACHE_MAX_AGE}",
+    ),
+    CacheRule(
+        lambda path: path == "/quotes/today",
+        lambda: f"q-{quotes_content.snapshot().version}-{date.today().isoformat()}",
+        f"public, max-age={DAILY_CACHE_MAX_AGE}",
+    ),
+    CacheRule(
+        lambda path: path == "/topics/",
+        None,
+        f"private, max-age={PRIVATE_CACHE_MAX_AGE}",
+        vary="Authorization",
+    ),
+)
+
+
+def _if_none_match(scope) -> set:
+    for name, value in scope["headers"]:
+        if name == b"if-none-match":
+            # Weak comparison, as RFC 9110 requires for If-None-Match
+            return {tag.strip().removeprefix("W/") for tag in value.decode("latin-1").split(",")}
+    return set()
+
+
+def _matches(etag: str, candidates: set) -> bool:
+    return "*" in candidates or etag in candidates
+
+
+class HttpCacheMiddleware:
+    """Pure ASGI middleware applying CACHE_RULES (no per-request overhead on other routes)."""
+
+    def __init__(self, app, rules=CACHE_RULES, max_known: int = HTTP_CACHE_KNOWN_URLS):
+        self.app = app
+        self.rules = rules
+        self.max_known = max_known
+        self._known = OrderedDict()  # (method, path, query) -> ETag last served with 200
+        self._lock = threading.Lock()
+
+    def _served(self, key) -> str | None:
+        with self._lock:
+            etag = self._known.get(key)
+            if etag is not None:
+                self._known.move_to_end(key)
+            return etag
+
+    def _remember(self, key, etag: str):
+        with self._lock:
+            self._known[key] = etag
+            self._known.move_to_end(key)
+            while len(self._known) > self.max_known:
+                self._known.popitem(last=False)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            return await self.app(scope, receive, send)
+        rule = next((r for r in self.rules if r.matches(scope["path"])), None)
+        if rule is None:
+            return await self.app(scope, receive, send)
+
+        if rule.version is None:
+            return await self._hash_body(rule, scope, receive, send)
+
+        try:
+            etag = f'"{rule.version()}"'
+        except ContentUnavailable:
+            return await self.app(scope, receive, send)  # the endpoint reports the error
+        cache_headers = self._headers(rule, etag)
+        key = (scope["method"], scope["path"], scope.get("query_string", b""))
+        matched = _matches(etag, _if_none_match(scope))
+        if matched and self._served(key) == etag:
+            return await self._not_modified(send, cache_headers)
+
+        status = None
+
+        async def send_with_etag(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if status == 200:
+                    self._remember(key, etag)
+                    if matched:
+                        await self._not_modified(send, cache_headers)
+                        return
+                    message = {**message, "headers": list(message.get("headers", [])) + cache_headers}
+            elif message["type"] == "http.response.body" and status == 200 and matched:
+                return  # the 304 already went out without a body
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
+
+    async def _hash_body(self, rule, scope, receive, send):
+        start = None
+        chunks = []
+
+        async def buffer(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    await finish()
+            else:
+                await send(message)
+
+        async def finish():
+            body = b"".join(chunks)
+            if start["status"] != 200:
+                await send(start)
+                await send({"type": "http.response.body", "body": body})
+                return
+            etag = f'"b-{hashlib.sha256(body).hexdigest()[:32]}"'
+            cache_headers = self._headers(rule, etag)
+            if _matches(etag, _if_none_match(scope)):
+                await self._not_modified(send, cache_headers)
+                return
+            await send({**start, "headers": list(start.get("headers", [])) + cache_headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, buffer)
+
+    @staticmethod
+    def _headers(rule, etag: str) -> list:
+        headers = [(b"etag", etag.encode("latin-1")), (b"cache-control", rule.cache_control.encode("latin-1"))]
+        if rule.vary:
+            headers.append((b"vary", rule.vary.encode("latin-1")))
+        return headers
+
+    @staticmethod
+    async def _not_modified(send, cache_headers):
+        await send({"type": "http.response.start", "status": 304, "headers": cache_headers})
+        await send({"type": "http.response.body", "body": b""})
@@ -0,0 +1,280 @@
+"""In-memory order-statistic index of student scores per class.
+
+Each class group (the same `class_level:<x>` / `level:<n>` keys as
+class_stats.py) gets a Fenwick tree over quantised scores plus the usernames
+in each score bucket. That answers rank, percentile, top-k and "students near
+you" in O(log n) per step without touching the database.
+
+Keeping it in sync: class_stats.apply_user_change() stages every score/class
+change on the SQLAlchemy session, and the change is applied here only after
+that session commits (rolled-back changes are dropped). The index is rebuilt
+from `users` at startup and every `LEADERBOARD_RESYNC_SECONDS` (default 300),
+which also picks up changes committed by other worker processes.
+"""
+import os
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from class_groups import SCORE_QUANTUM, class_keys, score_bucket
+from database import SessionLocal
+from models.models import User
+
+LEADERBOARD_RESYNC_SECONDS = float(os.getenv("LEADERBOARD_RESYNC_SECONDS", "300"))
+
+_STAGED_KEY = "leaderboard_changes"
+
+
+def _bucket(score) -> int:
+    return max(0, score_bucket(score))
+
+
+class _Fenwick:
+    """Counts per bucket with O(log n) prefix sums and k-th element search."""
+
+    def __init__(self, size: int = 64):
+        self.size = size
+        self.tree = [0] * (size + 1)
+
+    def add(self, i: int, delta: int):
+        i += 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, i: int) -> int:
+        """Sum of counts in buckets 0..i (inclusive)."""
+        i = min(i, self.size - 1) + 1
+        total = 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def find_kth(self, k: int) -> int:
+        """Smallest bucket whose prefix sum reaches k (1-based k)."""
+        pos = 0
+        step = 1 << self.size.bit_length()
+        while step:
+            nxt = pos + step
+            if nxt <= self.size and self.tree[nxt] < k:
+                pos = nxt
+                k -= self.tree[nxt]
+            step >>= 1
+        return pos
+
+
+class ClassLeaderboard:
+    """Order statistics for one class group."""
+
+    def __init__(self):
+        self._tree = _Fenwick()
+        self._members = {}  # username -> bucket
+        self._by_bucket = {}  # bucket -> set of usernames
+
+    def __len__(self):
+        return len(self._members)
+
+    def _grow(self, bucket: int):
+        size = self._tree.size
+        while size <= bucket:
+            size *= 2
+        tree = _Fenwick(size)
+        for b, names in self._by_bucket.items():
+            tree.add(b, len(names))
+        self._tree = tree
+
+    def add(self, username: str, score):
+        self.remove(username)
+        bucket = _bucket(score)
+        if bucket >= self._tree.size:
+            self._grow(bucket)
+        self._members[username] = bucket
+        self._by_bucket.setdefault(bucket, set()).add(username)
+        self._tree.add(bucket, 1)
+
+    def remove(self, username: str):
+        bucket = self._members.pop(username, None)
+        if bucket is None:
+            return
+        names = self._by_bucket[bucket]
+        names.discard(username)
+        if not names:
+            del self._by_bucket[bucket]
+        self._tree.add(bucket, -1)
+
+    def higher_count(self, score) -> int:
+        return len(self._members) - self._tree.prefix(_bucket(score))
+
+    def rank(self, score) -> int:
+        """1 = highest; students with equal scores share a rank."""
+        return self.higher_count(score) + 1
+
+    def percentile(self, score) -> float:
+        total = len(self._members)
+        return 100.0 * (1.0 - self.higher_count(score) / total) if total else 0.0
+
+    def _next_lower_bucket(self, bucket: int):
+        below = self._tree.prefix(bucket - 1) if bucket > 0 else 0
+        return self._tree.find_kth(below) if below else None
+
+    def _next_higher_bucket(self, bucket: int):
+        upto = self._tree.prefix(bucket)
+        return self._tree.find_kth(upto + 1) if upto < len(self._members) else None
+
+    def _entries(self, bucket: int, higher: int) -> list:
+        return [
+            {"rank": higher + 1, "username": name, "score": bucket * SCORE_QUANTUM}
+            for name in sorted(self._by_bucket[bucket])
+        ]
+
+    def top(self, k: int) -> list:
+        """Best `k` students, highest score first (ties by username)."""
+        out = []
+        if not self._members or k <= 0:
+            return out
+        bucket = self._tree.find_kth(len(self._members))
+        while bucket is not None and len(out) < k:
+            out.extend(self._entries(bucket, len(self._members) - self._tree.prefix(bucket)))
+            bucket = self._next_lower_bucket(bucket)
+        return out[:k]
+
+    def around(self, username: str, radius: int) -> list:
+        """Up to `radius` students on each side of `username` in ranking order, plus the student."""
+        bucket = self._members.get(username)
+        if bucket is None:
+            return []
+        total = len(self._members)
+        same = self._entries(bucket, total - self._tree.prefix(bucket))
+        pos = next(i for i, e in enumerate(same) if e["username"] == username)
+
+        above = same[:pos][-radius:] if radius else []
+        b = bucket
+        while len(above) < radius:
+            b = self._next_higher_bucket(b)
+            if b is None:
+                break
+            above = (self._entries(b, total - self._tree.prefix(b)) + above)[-radius:]
+
+        below = same[pos + 1:][:radius]
+        b = bucket
+        while len(below) < radius:
+            b = self._next_lower_bucket(b)
+            if b is None:
+                break
+            below = (below + self._entries(b, total - self._tree.prefix(b)))[:radius]
+
+        return above + [same[pos]] + below
+
+
+class Leaderboards:
+    """Registry of ClassLeaderboard per class group, shared by all requests."""
+
+    def __init__(self, session_factory=SessionLocal, resync_seconds: float = LEADERBOARD_RESYNC_SECONDS):
+        self.session_factory = session_factory
+        self.resync_seconds = resync_seconds
+        self._boards = {}
+        self._recorders = []  # one list per rebuild in progress
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def board(self, key: str):
+        return self._boards.get(key)
+
+    def rebuild(self, db):
+        """Rebuild every board from `users` without losing changes committed during the scan."""
+        applied = []  # changes apply() makes while the scan runs, replayed onto the new boards
+        with self._lock:
+            self._recorders.append(applied)
+        try:
+            boards = {}
+            for username, class_level, level, score in db.query(User.username, User.class_level, User.level, User.score):
+                for key in class_keys(class_level, level):
+                    boards.setdefault(key, ClassLeaderboard()).add(username, score)
+        finally:
+            with self._lock:
+                self._recorders.remove(applied)
+        with self._lock:
+            # Each change sets the student's final state, so replaying one the scan already saw is harmless
+            for before, after in applied:
+                self._apply(boards, before, after)
+            self._boards = boards
+            self._loaded = True
+
+    @staticmethod
+    def _apply(boards: dict, before: dict | None, after: dict | None):
+        if before is not None:
+            for key in class_keys(before["class_level"], before["level"]):
+                board = boards.get(key)
+                if board is not None:
+                    board.remove(before["username"])
+        if after is not None:
+            for key in class_keys(after["class_level"], after["level"]):
+                boards.setdefault(key, ClassLeaderboard()).add(after["username"], after["score"])
+
+    def apply(self, before: dict | None, after: dict | None):
+        with self._lock:
+            self._apply(self._boards, before, after)
+            for recorder in self._recorders:
+                recorder.append((before, after))
+
+    def read(self, fn):
+        """Run `fn()` under the lock so a query sees one consistent state."""
+        with self._lock:
+            return fn()
+
+    def stage_change(self, db: Session, before: dict | None, after: dict | None):
+        """Queue a user change to apply once `db` commits."""
+        db.info.setdefault(_STAGED_KEY, []).append((before, after))
+
+    def _resync(self):
+        db = self.session_factory()
+        try:
+            self.rebuild(db)
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stop.wait(self.resync_seconds):
+            try:
+                self._resync()
+            except Exception as e:
+                print(f"⚠️ leaderboard resync failed: {e}", flush=True)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        try:
+            self._resync()
+        except Exception as e:
+            print(f"⚠️ leaderboard build failed (rank falls back to SQL): {e}", flush=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="leaderboard-resync", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+leaderboards = Leaderboards()
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed_changes(session):
+    for before, after in session.info.pop(_STAGED_KEY, ()):
+        leaderboards.apply(before, after)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back_changes(session):
+    session.info.pop(_STAGED_KEY, None)
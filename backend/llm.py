@@ -1,14 +1,171 @@
 import os
-import json, re
+import json
+import random
+import threading
+import time
+from functools import lru_cache
 from dotenv import load_dotenv
+import litellm
 from litellm import completion
 
+import content_registry
+import local_grader
+import metrics
+from circuit_breaker import OPEN, CircuitBreaker
+from model_router import ModelRouter, NoHealthyModel
+import prompt_budget
+import prompt_cache
+from prompt_budget import PROMPT_FEEDBACK_MAX_TOKENS, PROMPT_SYLLABUS_MAX_TOKENS, Section
+from conversation_summary import CONVERSATION_SUMMARY_MAX_TOKENS
+from structured_output import VERDICT_RESPONSE_FORMAT, parse_verdict, supports_response_format
+from ttl_cache import TTLCache
+
 
 load_dotenv()
 
 MODEL_NAME = "gemini/gemini-2.5-flash"  # format for LiteLLM Gemini
 API_KEY = os.getenv("GEMINI_API_KEY")
 
+# Each attempt gets LLM_TIMEOUT_SECONDS, all attempts of one call together LLM_DEADLINE_SECONDS
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "15"))
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "25"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+# Consecutive failures that open a model's breaker, and how long it stays open
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+# Provider errors worth another attempt; anything else (bad request, auth) fails at once
+_RETRYABLE = (
+    litellm.Timeout,
+    litellm.RateLimitError,
+    litellm.APIConnectionError,
+    litellm.ServiceUnavailableError,
+    litellm.InternalServerError,
+)
+
+FALLBACK_HINT = (
+    "I'm having a little trouble thinking right now. Try breaking the problem into smaller steps: "
+    "what do you already know, and what are you asked to find?"
+)
+
+_request_seconds = metrics.histogram("llm_request_seconds", "Duration of each LLM provider attempt")
+_failures = metrics.counter("llm_failures_total", "LLM provider attempts that failed")
+_retries = metrics.counter("llm_retries_total", "LLM provider attempts retried after a transient error")
+_grade_seconds = metrics.histogram("check_answer_llm_seconds", "Time for the grading model to return a verdict")
+_fallbacks = metrics.counter("llm_fallbacks_total", "LLM calls answered by a cached/canned hint or the local grader")
+
+# (class_number, question) -> last good hint, served when the provider is unavailable
+_hint_cache = TTLCache(maxsize=2048, ttl=24 * 3600)
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+class LLMUnavailable(Exception):
+    """The provider failed, timed out or its circuit breaker is open."""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def breaker_for(model: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(model)
+        if breaker is None:
+            breaker = _breakers[model] = CircuitBreaker(
+                model, failure_threshold=LLM_BREAKER_FAILURES, reset_timeout=LLM_BREAKER_RESET_SECONDS
+            )
+        return breaker
+
+
+def _complete(messages: list, model: str = MODEL_NAME, deadline: float | None = None, **kwargs):
+    """`completion()` with per-attempt timeouts, jittered retries inside one deadline, and a circuit breaker.
+
+    `deadline` (`time.monotonic()`) defaults to LLM_DEADLINE_SECONDS from now;
+    the router passes one deadline to every model it tries. Raises
+    LLMUnavailable at once while the model's breaker is open, and when the
+    call fails or runs out of time, so callers can serve a fallback.
+    """
+    if "response_format" in kwargs and not supports_response_format(model):
+        kwargs = {k: v for k, v in kwargs.items() if k != "response_format"}  # the prompt asks for JSON too
+    if deadline is None:
+        deadline = time.monotonic() + LLM_DEADLINE_SECONDS
+    elif deadline <= time.monotonic():
+        raise LLMUnavailable(f"{model}: deadline exceeded")
+    messages = prompt_cache.with_cache_control(messages, model)
+    breaker = breaker_for(model)
+    if not breaker.allow():
+        raise LLMUnavailable(f"{model} circuit open", retry_after=breaker.retry_after())
+
+    attempt = 0
+    while True:
+        timeout = min(LLM_TIMEOUT_SECONDS, deadline - time.monotonic())
+        start = time.perf_counter()
+        try:
+            response = completion(model=model, messages=messages, api_key=API_KEY, timeout=timeout, **kwargs)
+        except _RETRYABLE as e:
+            _request_seconds.observe(time.perf_counter() - start)
+            _failures.inc()
+            breaker.record_failure()
+            attempt += 1
+            # Full jitter keeps retries from many workers from arriving together
+            delay = random.uniform(0, LLM_RETRY_BASE_SECONDS * 2 ** attempt)
+            if attempt > LLM_MAX_RETRIES or time.monotonic() + delay >= deadline or not breaker.allow():
+                raise LLMUnavailable(f"{model}: {e}", retry_after=breaker.retry_after()) from e
+            _retries.inc()
+            time.sleep(delay)
+            continue
+        except Exception as e:
+            _request_seconds.observe(time.perf_counter() - start)
+            _failures.inc()
+            breaker.record_success()  # the provider answered; the request itself was rejected
+            raise LLMUnavailable(f"{model}: {e}") from e
+        _request_seconds.observe(time.perf_counter() - start)
+        breaker.record_success()
+        prompt_cache.record_usage(response)
+        return response
+
+
+def _models(task: str, default: str) -> list:
+    return [m.strip() for m in os.getenv(f"LLM_MODELS_{task.upper()}", default).split(",") if m.strip()]
+
+
+# Ranked models per task, best first; override with e.g.
+# LLM_MODELS_TITLE="gemini/gemini-2.0-flash-lite,gemini/gemini-2.5-flash"
+LLM_ROUTES = {
+    "hint": _models("hint", f"{MODEL_NAME},gemini/gemini-2.0-flash"),
+    "grade": _models("grade", f"{MODEL_NAME},gemini/gemini-2.0-flash"),
+    "title": _models("title", f"gemini/gemini-2.0-flash-lite,{MODEL_NAME}"),
+    "report": _models("report", MODEL_NAME),
+    "summary": _models("summary", f"gemini/gemini-2.0-flash-lite,{MODEL_NAME}"),
+}
+# Student-facing tasks get a hedged second request when the first is slower than usual
+LLM_HEDGE_TASKS = [t.strip() for t in os.getenv("LLM_HEDGE_TASKS", "hint,grade").split(",") if t.strip()]
+LLM_HEDGE_MIN_SECONDS = float(os.getenv("LLM_HEDGE_MIN_SECONDS", "1.5"))
+
+model_router = ModelRouter(
+    LLM_ROUTES,
+    call=lambda model, messages, **kwargs: _complete(messages, model=model, **kwargs),
+    hedge_tasks=LLM_HEDGE_TASKS,
+    is_available=lambda model: breaker_for(model).state != OPEN,
+    hedge_min_delay=LLM_HEDGE_MIN_SECONDS,
+    clock=time.monotonic,  # the clock _complete's deadline is on
+)
+
+
+def _route(task: str, messages: list, **kwargs):
+    """Run `task` on the fastest healthy model for it (see model_router.py); raises LLMUnavailable.
+
+    Failover and hedged requests share the call's LLM_DEADLINE_SECONDS.
+    """
+    try:
+        return model_router.complete(task, messages, deadline=time.monotonic() + LLM_DEADLINE_SECONDS, **kwargs)
+    except NoHealthyModel as e:
+        retry_after = min(breaker_for(m).retry_after() for m in e.models)
+        raise LLMUnavailable(str(e), retry_after=retry_after) from e
+
 
 
 
@@ -24,22 +181,17 @@ def load_prompt_for_class(class_number: int) -> dict:
     # We will load the base prompt from `prompts/two.json` and then
     # load the syllabus for the requested class and add it into the
     # system prompt content before returning.
-    # Resolve paths relative to this file so imports work from any CWD
-    base_dir = os.path.dirname(__file__)
-    base_prompt_path = os.path.join(base_dir, "prompts", "two.json")
-
-    # Fallback behavior if base prompt missing: try class-specific prompt
-    if not os.path.exists(base_prompt_path):
+    # Both files are parsed once and reloaded when they change on disk (content_registry)
+    try:
+        # Copy: the snapshot is shared and its content is replaced below
+        prompt = dict(content_registry.base_prompt_content.snapshot().data)
+    except content_registry.ContentUnavailable:
+        # Fallback behavior if base prompt missing: try class-specific prompt
         file_path = mapping.get(class_number, "prompts/five.json")
         if not os.path.exists(file_path):
             return {"role": "system", "content": {"type": "text", "text": "You are a helpful math tutor."}}
         with open(file_path, "r", encoding="utf-8") as f:
             return json.load(f)
-
-    # Load base prompt (two.json)
-    try:
-        with open(base_prompt_path, "r", encoding="utf-8") as f:
-            prompt = json.load(f)
     except Exception:
         return {"role": "system", "content": {"type": "text", "text": "You are a helpful math tutor."}}
 
@@ -53,15 +205,12 @@ def load_prompt_for_class(class_number: int) -> dict:
     syllabus_text = ""
     try:
         if 1 <= cls_num <= 5:
-            syllabus_file = os.path.join(base_dir, "syllabus", "topics.json")
             syllabus_key = f"class_{cls_num}"
         else:
-            syllabus_file = os.path.join(base_dir, "syllabus", "class6-12.json")
             syllabus_key = f"Class_{cls_num}"
 
-        if os.path.exists(syllabus_file):
-            with open(syllabus_file, "r", encoding="utf-8") as sf:
-                syl = json.load(sf)
+        syl = content_registry.syllabus_content(cls_num).snapshot().data
+        if type(syl) is dict:
             class_syl = syl.get(syllabus_key)
             # Some syllabus files (e.g. class6-12.json) wrap classes under
             # a top-level key like "Mathematics_Syllabus" — handle that.
@@ -71,9 +220,8 @@ def load_prompt_for_class(class_number: int) -> dict:
                     class_syl = wrapped.get(syllabus_key)
             if class_syl:
                 parts = []
-                # limits to keep prompt size reasonable
+                # limits to keep prompt size reasonable (the token cap is applied below)
                 MAX_ITEMS_PER_SECTION = 6
-                MAX_TOTAL_CHARS = 1000
                 # class_syl is usually a mapping of section -> list
                 for section, items in class_syl.items():
                     # Prefer explicit type checks without using isinstance
@@ -100,9 +248,8 @@ def load_prompt_for_class(class_number: int) -> dict:
 
                 if parts:
                     syllabus_text = f"Syllabus for class_{cls_num}:\n" + "\n".join(parts)
-                    # Ensure syllabus_text stays within a reasonable size
-                    if len(syllabus_text) > MAX_TOTAL_CHARS:
-                        syllabus_text = syllabus_text[:MAX_TOTAL_CHARS].rsplit('\n', 1)[0] + "\n..."
+                    # Ensure syllabus_text stays within its token allowance (whole lines)
+                    syllabus_text = prompt_budget.truncate(syllabus_text, PROMPT_SYLLABUS_MAX_TOKENS)
     except Exception:
         syllabus_text = ""
 
@@ -125,12 +272,28 @@ def load_prompt_for_class(class_number: int) -> dict:
     return prompt
 
 
+def class_prefix(class_number: int) -> str:
+    """The class's system prompt (with syllabus) as one string, rebuilt only when its files change.
 
-def generate_hint(question: str,  last_context: str = "", image_b64 :str | None = None, user_class: int | str | None = None, parent_feedback: str | None = None, **kwargs) -> str:
+    It leads every hint prompt and must stay byte-identical between calls for
+    provider-side prompt caching (see prompt_cache.py); anything per request
+    goes in the user message after it.
+    """
+    return _class_prefix(class_number, content_registry.prompt_version(class_number))
+
+
+@lru_cache(maxsize=64)
+def _class_prefix(class_number: int, version: tuple) -> str:
+    content = load_prompt_for_class(class_number).get("content")
+    return content if isinstance(content, str) else json.dumps(content, ensure_ascii=False, sort_keys=True)
+
+
+def generate_hint(question: str,  last_context: str = "", image_b64 :str | None = None, user_class: int | str | None = None, parent_feedback: str | None = None, summary: str | None = None, **kwargs) -> str:
     """Generate a concise hint using a class-specific prompt.
     Args:
         question: The student's question text.
         last_context: Recent chat context to include.
+        summary: Rolling summary of the older part of the chat, if any.
         image_b64: Optional base64 PNG image string.
         user_class: Class level (int like 5 or string like 'class_5' or '5').
 
@@ -152,16 +315,27 @@ def generate_hint(question: str,  last_context: str = "", image_b64 :str | None
             return 5
 
     class_number = _class_to_number(user_class)
-    system_prompt = load_prompt_for_class(class_number)
+    system_text = class_prefix(class_number)
+
+    # Fit the prompt into the token budget: system prompt and question always go in,
+    # then parent feedback (capped), then as much recent context as is left (oldest lines dropped first)
+    packed = prompt_budget.pack([
+        Section("system", system_text, required=True),
+        Section("question", f"Student class: class_{class_number}\nStudent question: {question}\nRespond concisely.", required=True),
+        Section("feedback", parent_feedback or "", priority=1, max_tokens=PROMPT_FEEDBACK_MAX_TOKENS),
+        Section("summary", summary or "", priority=2, max_tokens=CONVERSATION_SUMMARY_MAX_TOKENS),
+        Section("context", last_context or "", priority=3, keep="tail"),
+    ])
 
     # Build message content and include the student class in the prompt
     # Include parent feedback in the prompt if present to give the LLM extra context
-    feedback_section = f"\nParent feedback: {parent_feedback}" if parent_feedback else ""
+    feedback_section = f"\nParent feedback: {packed.texts['feedback']}" if packed.texts["feedback"] else ""
+    summary_section = f"Conversation so far (summary): {packed.texts['summary']}\n" if packed.texts["summary"] else ""
 
     content = [
         {
             "type": "text",
-            "text": f"Student class: class_{class_number}\nStudent question: {question}\nPrevious context: {last_context}{feedback_section}\nRespond concisely."
+            "text": f"Student class: class_{class_number}\nStudent question: {question}\n{summary_section}Previous context: {packed.texts['context']}{feedback_section}\nRespond concisely."
         }
     ]
 
@@ -171,18 +345,23 @@ def generate_hint(question: str,  last_context: str = "", image_b64 :str | None
         image_data_url = f"data:image/png;base64,{image_b64}"
         content.append({"type": "image_url", "image_url": image_data_url})
 
-    # Build final messages
+    # Build final messages: the static class prefix first, so providers can cache it
     messages = [
-        system_prompt,
+        {"role": "system", "content": system_text},
         {"role": "user", "content": content}
     ]
-    response = completion(
-        model=MODEL_NAME,
-        messages=messages,
-        api_key=API_KEY,
-    )
+    cache_key = (class_number, question.strip().lower()) if question and not image_b64 else None
+    try:
+        response = _route("hint", messages)
+    except LLMUnavailable as e:
+        print(f"⚠️ generate_hint fallback: {e}", flush=True)
+        _fallbacks.inc()
+        return (_hint_cache.get(cache_key) if cache_key else None) or FALLBACK_HINT
 
-    return response["choices"][0]["message"]["content"].strip()
+    hint = response["choices"][0]["message"]["content"].strip()
+    if cache_key:
+        _hint_cache.set(cache_key, hint)
+    return hint
 
 
 
@@ -193,16 +372,20 @@ def get_chat_title(text: str) -> str:
             {"role": "system", "content": "Generate an appropriate title for this message to be saved as chat title in the database, it will have more messages from user and llm, give most appropriate title in very short 3 or 4 words"},
             {"role": "user", "content": text}
         ]
-        response = completion(
-            model=MODEL_NAME,
-            messages=messages,
-            api_key=API_KEY,
-        )
+        response = _route("title", messages)
         return response["choices"][0]["message"]["content"].strip()
     except Exception as e:
-        return f"Error: {str(e)}"
+        print(f"⚠️ get_chat_title fallback: {e}", flush=True)
+        _fallbacks.inc()
+        return _fallback_title(text)
+
+
+def _fallback_title(text: str) -> str:
+    """The first few words of the message, used when no title can be generated."""
+    words = (text or "").split()
+    return " ".join(words[:4]) + ("..." if len(words) > 4 else "") if words else "New chat"
     
-def check_answer(conversation=None, question=None, answer=None, context=None, class_topics=None):
+def check_answer(conversation=None, question=None, answer=None, context=None, class_topics=None, summary=None):
 
     """
     Evaluates if the student's last message is a final answer and whether it's correct.
@@ -236,72 +419,57 @@ Output format (must match exactly):
 """
 
     try:
-        response = completion(
-            model=MODEL_NAME,
-            messages=[
+        start = time.perf_counter()
+        response = _route(
+            "grade",
+            # Oldest turns are dropped first if the conversation is over the token budget
+            prompt_budget.fit_messages([
                 {"role": "system", "content": system_prompt},
+                *([{"role": "system", "content": f"Earlier in this conversation: {summary}"}] if summary else []),
                 *conversation
-            ],
-            api_key=API_KEY,
+            ]),
             temperature=0.0,
             max_tokens=300,
+            response_format=VERDICT_RESPONSE_FORMAT,
         )
-
-        text = response["choices"][0]["message"]["content"].strip()
-
-        # Debug: log raw output so we can inspect failure cases
-        print("🛈 check_answer raw output:", repr(text[:2000]))
-
-        # Remove fenced code blocks (```json ... ``` or ``` ... ```)
-        m_code = re.search(r"```(?:json)?\s*(.*?)\s*```", text, re.S | re.I)
-        if m_code:
-            text = m_code.group(1).strip()
-
-        # If still not obviously JSON, try to extract the first {...} block
-        match = re.search(r"\{.*\}", text, re.S)
-        if match:
-            text = match.group(0)
-        else:
-            # Fallback: try substring from first '{' to last '}' if present
-            first = text.find('{')
-            last = text.rfind('}')
-            if first != -1 and last != -1 and last > first:
-                text = text[first:last+1]
-
-        text = text.strip()
-
-        # Try direct JSON parse first
-        try:
-            result = json.loads(text)
-            return result
-        except Exception as e:
-            # Attempt common sanitizations and retry
-            san = text
-            # Replace single quotes with double quotes when appropriate
-            if san.count("'") > san.count('"'):
-                san = san.replace("'", '"')
-            # Replace Python booleans/None to JSON equivalents
-            san = re.sub(r"\bTrue\b", "true", san)
-            san = re.sub(r"\bFalse\b", "false", san)
-            san = re.sub(r"\bNone\b", "null", san)
-            # Remove trailing commas before } or ]
-            san = re.sub(r",\s*([}\]])", r"\1", san)
-
-            try:
-                result = json.loads(san)
-                return result
-            except Exception as e2:
-                print("⚠️ check_answer parse retry failed:", e2)
-                print("🛈 final sanitized attempt contents:", repr(san[:2000]))
-
-        # If parsing ultimately failed, return a safe structured response with raw feedback
-        return {"final": False, "correct": False, "feedback": "Error or invalid JSON", "raw": text}
+        _grade_seconds.observe(time.perf_counter() - start)
+
+        text = (response["choices"][0]["message"]["content"] or "").strip()
+        verdict = parse_verdict(text)
+        if verdict is None:
+            print("⚠️ check_answer: unparseable verdict:", repr(text[:200]))
+            # Safe structured response with the raw reply for inspection
+            return {"final": False, "correct": False, "feedback": "Error or invalid JSON", "raw": text[:2000]}
+        return verdict
+
+    except LLMUnavailable as e:
+        # Grade simple arithmetic locally; anything else is not scored while the LLM is down
+        print("⚠️ check_answer fallback to local grader:", e)
+        _fallbacks.inc()
+        return local_grader.grade(conversation)
 
     except Exception as e:
         print("⚠️ check_answer error:", e)
         return {"final": False, "correct": False, "feedback": "Error or invalid JSON"}
 
 
+def summarize_conversation(previous_summary: str | None, turns: str) -> str:
+    """Fold older tutoring turns into the chat's running summary (raises LLMUnavailable)."""
+    messages = [
+        {
+            "role": "system",
+            "content": (
+                "You keep a running summary of a math tutoring chat with a child. Merge the previous summary "
+                "and the new messages into one summary of at most 80 words: the problems worked on, what the "
+                "student got right or wrong, misconceptions, and where they are now. Plain text only."
+            ),
+        },
+        {"role": "user", "content": f"Previous summary: {previous_summary or '(none)'}\n\nNew messages:\n{turns}"},
+    ]
+    resp = _route("summary", messages, max_tokens=CONVERSATION_SUMMARY_MAX_TOKENS)
+    return resp["choices"][0]["message"]["content"].strip()
+
+
 def generate_parent_report(child: dict, comparison: dict | None = None) -> str:
     """Generate a short descriptive, encouraging report for a parent.
 
@@ -361,5 +529,5 @@ def generate_parent_report(child: dict, comparison: dict | None = None) -> str:
         {"role": "user", "content": user_content},
     ]
 
-    resp = completion(model=MODEL_NAME, messages=messages, api_key=API_KEY)
+    resp = _route("report", messages)  # raises LLMUnavailable; no canned report, so it is never cached
     return resp["choices"][0]["message"]["content"].strip()
\ No newline at end of file
@@ -0,0 +1,78 @@
+"""Offline answer checking for simple arithmetic, used when the LLM grader is unavailable.
+
+Only the clear-cut case is graded: the tutor's last question contains exactly
+one arithmetic expression (e.g. "What is 12 x 7?"), not qualified by a word
+like "of" or "%", without thousands separators, and the student's whole reply
+is a single number (optionally with a unit and punctuation). Only a correct
+answer is marked final; a wrong or unclear one comes back as "not a final
+answer", so a grading guess never costs the student score or a streak while
+the LLM is down.
+"""
+import ast
+import operator
+import re
+
+_NUMBER = r"\d+(?:\.\d+)?"
+_EXPRESSION = re.compile(rf"{_NUMBER}(?:\s*[-+*/x×÷]\s*{_NUMBER})+")
+# The whole reply: one number or fraction, then optionally a unit word and punctuation
+_ANSWER = re.compile(rf"\s*(-?{_NUMBER}(?:\s*/\s*\d+)?)\s*(?:[^\W\d_]+)?\s*[.!]*\s*")
+_THOUSANDS = re.compile(r"\d,\d")
+# "3/4 of 12", "20 % of 50": the expression is not the whole calculation
+_QUALIFIED = re.compile(r"\s*(?:of\b|%|percent\b)", re.IGNORECASE)
+
+_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.USub: operator.neg,
+}
+
+UNGRADED = {"final": False, "correct": False, "feedback": "Answer checking is temporarily unavailable"}
+
+
+def _evaluate(node):
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+        return _OPERATORS[type(node.op)](_evaluate(node.left), _evaluate(node.right))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _OPERATORS:
+        return _OPERATORS[type(node.op)](_evaluate(node.operand))
+    raise ValueError("unsupported expression")
+
+
+def evaluate(expression: str) -> float:
+    """Value of an arithmetic expression using + - * / (also x, × and ÷)."""
+    expression = expression.replace("×", "*").replace("x", "*").replace("÷", "/")
+    return _evaluate(ast.parse(expression, mode="eval").body)
+
+
+def _format(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else f"{value:g}"
+
+
+def grade(conversation: list) -> dict:
+    """A check_answer-style verdict for the last student message, or UNGRADED."""
+    answer_index = next((i for i in range(len(conversation) - 1, -1, -1) if conversation[i].get("role") == "user"), None)
+    if answer_index is None:
+        return dict(UNGRADED)
+    question = next(
+        (m.get("content") or "" for m in reversed(conversation[:answer_index]) if m.get("role") == "assistant"), ""
+    )
+    question = str(question)
+    expressions = list(_EXPRESSION.finditer(question))
+    answer = _ANSWER.fullmatch(str(conversation[answer_index].get("content") or ""))
+    if len(expressions) != 1 or answer is None or _THOUSANDS.search(question):
+        return dict(UNGRADED)
+    expression = expressions[0]
+    if _QUALIFIED.match(question, expression.end()):
+        return dict(UNGRADED)
+    try:
+        expected = evaluate(expression.group(0))
+        given = evaluate(answer.group(1).replace(" ", ""))
+    except (ValueError, SyntaxError, ZeroDivisionError):
+        return dict(UNGRADED)
+
+    if abs(expected - given) >= 1e-9:
+        return dict(UNGRADED)  # possibly misread; leave wrong answers to the LLM grader
+    return {"final": True, "correct": True, "feedback": "Correct!", "correct_answer": _format(expected)}
@@ -1,9 +1,11 @@
 import sys
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
-from database import Base, engine
+from database import Base, SessionLocal, engine
 from sqlalchemy import text
 
 # Ensure the backend directory is on sys.path so imports like `from routers import ...`
@@ -14,6 +16,19 @@ if str(BASE_DIR) not in sys.path:
     sys.path.insert(0, str(BASE_DIR))
 
 from routers import user, chat, history, explore, syllabus, topics, parent, quotes_router, teacher
+from search_index import ensure_video_search_index
+from view_counter import view_counter
+from trending import trending_board
+from class_stats import ensure_class_stats
+from leaderboard import leaderboards
+from report_renderer import report_renderer
+from email_outbox import email_sender
+from llm import model_router
+from conversation_summary import ensure_summary_columns, summarizer
+from http_cache import HttpCacheMiddleware
+from compression import CompressionMiddleware
+from fast_json import FastJSONResponse
+import metrics
 from fastapi.middleware.cors import CORSMiddleware
 # create tables
 def ensure_streak_columns():
@@ -44,17 +59,57 @@ def ensure_streak_columns():
         print(f"DB migration error (non-fatal): {e}", flush=True)
 
 
+def ensure_indexes():
+    """Create indexes declared on the models that an older DB file is missing.
+
+    `create_all` only creates indexes together with new tables.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(bind=engine, checkfirst=True)
+            except Exception as e:
+                print(f"DB index error (non-fatal) for {index.name}: {e}", flush=True)
+
+
 # Ensure schema exists and run lightweight migrations
 ensure_streak_columns()
 Base.metadata.create_all(bind=engine)
+ensure_indexes()
+ensure_summary_columns(engine)
+ensure_video_search_index(engine)
+ensure_class_stats(SessionLocal)
+
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    view_counter.start()
+    trending_board.start()
+    leaderboards.start()
+    email_sender.start()
+    summarizer.start()
+    yield
+    summarizer.stop()
+    email_sender.stop()
+    leaderboards.stop()
+    trending_board.stop()
+    report_renderer.shutdown()
+    model_router.shutdown()
+    # Flush buffered view counts before the worker exits
+    view_counter.stop()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # Serve uploaded files (videos/thumbnails) at /uploads/*
 uploads_dir = BASE_DIR / "uploads"
 uploads_dir.mkdir(parents=True, exist_ok=True)
 app.mount("/uploads", StaticFiles(directory=str(uploads_dir)), name="uploads")
 
+# ETag/304 for syllabus, topics and quotes (inside CORS so 304s carry CORS headers too)
+app.add_middleware(HttpCacheMiddleware)
+# gzip/brotli for large JSON and text bodies
+app.add_middleware(CompressionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -72,3 +127,9 @@ app.include_router(topics.router)
 app.include_router(parent.router)
 app.include_router(teacher.router)
 app.include_router(quotes_router.router)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Per-process metrics in the Prometheus text format."""
+    return metrics.render_prometheus()
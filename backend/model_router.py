@@ -0,0 +1,177 @@
+"""Latency-aware routing of LLM calls across a ranked list of models per task.
+
+Each task ("hint", "grade", ...) has a ranked list of models. Every call
+goes to the fastest healthy model, by median latency over the last
+`window` calls. Models without samples count as `default_latency`, and ties
+keep the ranking. A model is unhealthy while `is_available(model)` says
+no (an open circuit breaker) or when its recent error rate is above
+`max_error_rate`. If every model in the list is unhealthy, the whole list is
+tried in rank order anyway, rather than failing outright on stale stats.
+
+If the chosen model fails, the call fails over to the next one, unless the
+call's `deadline` (on `clock`) has already passed. The deadline is passed on
+to every `call`, so the failover only gets the time that is left. For
+latency-sensitive tasks (`hedge_tasks`) a hedged request goes to the
+next-best model once the first has taken longer than its recent p95
+(`hedge_min_delay` at least). The first success wins, and the slower reply
+is discarded. `call(model, messages, **kwargs)` does the actual request, so
+tests can route against fake backends.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import metrics
+
+_hedged = metrics.counter("llm_hedged_requests_total", "LLM calls that sent a hedged second request")
+_hedge_wins = metrics.counter("llm_hedge_wins_total", "Hedged LLM calls answered by the second request")
+_failovers = metrics.counter("llm_failovers_total", "LLM calls retried on the next model after a failure")
+
+
+class NoHealthyModel(Exception):
+    def __init__(self, task: str, models: list):
+        super().__init__(f"no model available for {task}: {', '.join(models)}")
+        self.task = task
+        self.models = models
+
+
+class ModelStats:
+    """Rolling latency and error rate over a model's last `window` calls."""
+
+    def __init__(self, window: int = 50):
+        self._latencies = deque(maxlen=window)
+        self._outcomes = deque(maxlen=window)  # True = success
+        self._lock = threading.Lock()
+
+    def observe(self, ok: bool, latency: float | None = None):
+        with self._lock:
+            self._outcomes.append(ok)
+            if ok and latency is not None:
+                self._latencies.append(latency)
+
+    def latency(self, quantile: float = 0.5) -> float | None:
+        with self._lock:
+            if not self._latencies:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(quantile * len(ordered)))]
+
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return self._outcomes.count(False) / len(self._outcomes)
+
+
+class ModelRouter:
+    def __init__(self, routes: dict, call, hedge_tasks=(), is_available=lambda model: True,
+                 default_latency: float = 2.0, max_error_rate: float = 0.5, hedge_min_delay: float = 1.0,
+                 window: int = 50, max_workers: int = 16, clock=time.perf_counter):
+        self.routes = {task: list(models) for task, models in routes.items()}
+        self.call = call
+        self.hedge_tasks = set(hedge_tasks)
+        self.is_available = is_available
+        self.default_latency = default_latency
+        self.max_error_rate = max_error_rate
+        self.hedge_min_delay = hedge_min_delay
+        self.window = window
+        self.clock = clock
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        self._executor = None
+        self._max_workers = max_workers
+
+    def stats(self, model: str) -> ModelStats:
+        with self._stats_lock:
+            stats = self._stats.get(model)
+            if stats is None:
+                stats = self._stats[model] = ModelStats(self.window)
+            return stats
+
+    def candidates(self, task: str) -> list:
+        """The task's models, best first: healthy ones by median latency, then the rest in rank order."""
+        models = self.routes[task]
+        healthy = [m for m in models if self.is_available(m) and self.stats(m).error_rate() <= self.max_error_rate]
+        if not healthy:
+            return [m for m in models if self.is_available(m)]
+
+        def expected(item):
+            rank, model = item
+            latency = self.stats(model).latency()
+            return (self.default_latency if latency is None else latency, rank)
+
+        return [m for _, m in sorted(enumerate(healthy), key=expected)]
+
+    def hedge_delay(self, model: str) -> float:
+        p95 = self.stats(model).latency(0.95)
+        return max(self.hedge_min_delay, p95 if p95 is not None else self.default_latency)
+
+    def _timed(self, model: str, messages: list, kwargs: dict):
+        start = self.clock()
+        try:
+            response = self.call(model, messages, **kwargs)
+        except Exception:
+            self.stats(model).observe(False)
+            raise
+        self.stats(model).observe(True, self.clock() - start)
+        return response
+
+    def complete(self, task: str, messages: list, deadline: float | None = None, **kwargs):
+        """Run the task on the best model, all attempts within `deadline`; raises NoHealthyModel or the last model's error."""
+        models = self.candidates(task)
+        if not models:
+            raise NoHealthyModel(task, self.routes[task])
+        if deadline is not None:
+            kwargs["deadline"] = deadline
+        if task in self.hedge_tasks and len(models) > 1:
+            return self._hedged(models, messages, kwargs)
+
+        last_error = None
+        for i, model in enumerate(models[:2]):  # one failover at most, to keep latency bounded
+            if i:
+                if deadline is not None and self.clock() >= deadline:
+                    break
+                _failovers.inc()
+            try:
+                return self._timed(model, messages, kwargs)
+            except Exception as e:
+                last_error = e
+        raise last_error
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._stats_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="llm-hedge")
+            return self._executor
+
+    def _hedged(self, models: list, messages: list, kwargs: dict):
+        primary, backup = models[0], models[1]
+        pool = self._pool()
+        first = pool.submit(self._timed, primary, messages, kwargs)
+        done, _ = wait([first], timeout=self.hedge_delay(primary))
+        if done and first.exception() is None:
+            return first.result()
+
+        if not done:
+            _hedged.inc()
+        else:
+            _failovers.inc()
+        second = pool.submit(self._timed, backup, messages, kwargs)
+        pending = {first, second} - done
+        last_error = first.exception() if done else None
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                if future.exception() is None:
+                    if future is second and not done:
+                        _hedge_wins.inc()
+                    return future.result()
+                last_error = future.exception()
+        raise last_error
+
+    def shutdown(self):
+        with self._stats_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Float, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -29,6 +29,13 @@ class User(Base):
     # Parent feedback column: stores latest parent feedback for this student
     Parent_feedback = Column(Text, nullable=True)
 
+    __table_args__ = (
+        # Class comparisons in /parents/stats filter by class and rank by score;
+        # the attempt columns make the aggregate an index-only scan
+        Index("ix_users_class_level_score", "class_level", "score", "correct_attempts", "total_attempts"),
+        Index("ix_users_level_score", "level", "score", "correct_attempts", "total_attempts"),
+    )
+
 # ---------- Chat ----------
 class Chat(Base):
     __tablename__ = "chats"
@@ -36,6 +43,9 @@ class Chat(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     session_id = Column(String, index=True, nullable=True)  # belongs to chat
+    # Rolling summary of the messages up to summary_upto_id (see conversation_summary.py)
+    summary = Column(Text, nullable=True)
+    summary_upto_id = Column(Integer, nullable=True)
 
     messages = relationship("Message", back_populates="chat", cascade="all, delete")
 
@@ -127,4 +137,73 @@ class Video(Base):
     
     # Metadata
     upload_date = Column(String, nullable=False)  # ISO format date
-    view_count = Column(Integer, default=0)
\ No newline at end of file
+    view_count = Column(Integer, default=0)
+
+    __table_args__ = (
+        # "teachers for a class" groups a class's videos by teacher
+        Index("ix_videos_class_level_teacher_id", "class_level", "teacher_id"),
+    )
+
+
+# ---------- Class statistics (materialized) ----------
+class ClassStats(Base):
+    """Running per-class totals behind /parents/stats (maintained by class_stats.py)."""
+    __tablename__ = "class_stats"
+
+    # "class_level:<value>" or "level:<value>", see class_stats.class_keys()
+    class_key = Column(String, primary_key=True)
+    student_count = Column(Integer, default=0, nullable=False)
+    score_sum = Column(Float, default=0.0, nullable=False)
+    total_attempts_sum = Column(Integer, default=0, nullable=False)
+    correct_attempts_sum = Column(Integer, default=0, nullable=False)
+    max_score = Column(Float, default=0.0, nullable=False)
+
+
+class ClassScoreBucket(Base):
+    """Score histogram per class: number of students per quantised score."""
+    __tablename__ = "class_score_histogram"
+
+    class_key = Column(String, primary_key=True)
+    bucket = Column(Integer, primary_key=True)  # round(score / class_stats.SCORE_QUANTUM)
+    count = Column(Integer, default=0, nullable=False)
+
+
+# ---------- Email outbox ----------
+class EmailOutbox(Base):
+    """Queued outgoing email, delivered by the background sender in email_outbox.py."""
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    owner = Column(String, nullable=True, index=True)  # username that queued it (status lookups)
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    attachment = Column(LargeBinary, nullable=True)
+    attachment_name = Column(String, nullable=True)
+
+    status = Column(String, default="pending", nullable=False)  # pending | sending | sent | failed
+    attempts = Column(Integer, default=0, nullable=False)
+    # Unix time the row is due (pending) or its send lease expires (sending)
+    next_attempt_at = Column(Float, default=0.0, nullable=False)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(String, nullable=False)  # ISO format datetime
+    sent_at = Column(String, nullable=True)  # ISO format datetime
+
+    __table_args__ = (
+        # the sender polls for due rows
+        Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+
+# ---------- Weekly digest checkpoints ----------
+class DigestRun(Base):
+    """Progress of one weekly digest run (weekly_digest.py), for resuming after a crash."""
+    __tablename__ = "digest_runs"
+
+    run_key = Column(String, primary_key=True)  # ISO week, e.g. "2026-W42"
+    last_parent_id = Column(Integer, default=0, nullable=False)  # every parent up to this id is done
+    reports_sent = Column(Integer, default=0, nullable=False)
+    failures = Column(Integer, default=0, nullable=False)
+    failed_parent_ids = Column(Text, nullable=True)  # comma-separated, retried by the next run of the week
+    started_at = Column(String, nullable=False)  # ISO format datetime
+    finished_at = Column(String, nullable=True)  # ISO format datetime
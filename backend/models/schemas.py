@@ -147,7 +147,8 @@ class ParentStatsOut(BaseModel):
 
 # ---------- Parent Report Schemas ----------
 class ParentReportRequest(BaseModel):
-    child: ChildStats
+    # Optional: when omitted the server reads the linked child's stats and class comparison itself
+    child: Optional[ChildStats] = None
     # Optional: include comparison to enrich report if available
     comparison: Optional[Comparison] = None
 
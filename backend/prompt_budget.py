@@ -0,0 +1,157 @@
+"""Token counting and budgeted prompt assembly.
+
+Prompts are measured in tokens with the local tokenizer litellm ships for
+`PROMPT_TOKENIZER_MODEL`, so nothing goes over the network. If it cannot be
+loaded, the count falls back to the usual ~4 characters per token estimate.
+
+`pack()` fits prompt sections into `PROMPT_TOKEN_BUDGET` (default 1200
+input tokens, images not counted). Required sections (system prompt, the
+question) always go in. The others are packed by priority, each capped at
+its own `max_tokens`. A section is trimmed by whole lines: "head" keeps its
+start (syllabus, parent feedback) and "tail" keeps its end, so chat context
+loses its oldest lines first. Sections with no room left are dropped.
+Prompt sizes and trimmed or dropped sections are exported as metrics.
+"""
+import os
+from typing import NamedTuple
+
+import litellm
+
+import metrics
+
+PROMPT_TOKENIZER_MODEL = os.getenv("PROMPT_TOKENIZER_MODEL", "gemini/gemini-2.5-flash")
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1200"))
+PROMPT_SYLLABUS_MAX_TOKENS = int(os.getenv("PROMPT_SYLLABUS_MAX_TOKENS", "250"))
+PROMPT_FEEDBACK_MAX_TOKENS = int(os.getenv("PROMPT_FEEDBACK_MAX_TOKENS", "120"))
+
+ELLIPSIS = "..."
+
+_prompt_tokens = metrics.histogram(
+    "llm_prompt_tokens", "Input tokens per LLM prompt (text only)", buckets=(128, 256, 512, 1024, 2048, 4096, 8192)
+)
+_trimmed = metrics.counter("llm_prompt_sections_trimmed_total", "Prompt sections shortened to fit the token budget")
+_dropped = metrics.counter("llm_prompt_sections_dropped_total", "Prompt sections left out to fit the token budget")
+
+_heuristic = False  # set once the tokenizer failed to load
+
+
+def _encode(text: str) -> list | None:
+    global _heuristic
+    if _heuristic:
+        return None
+    try:
+        return litellm.encode(model=PROMPT_TOKENIZER_MODEL, text=text)
+    except Exception as e:
+        print(f"⚠️ prompt_budget: tokenizer unavailable ({e}); estimating 4 characters per token", flush=True)
+        _heuristic = True
+        return None
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    tokens = _encode(text)
+    return len(tokens) if tokens is not None else (len(text) + 3) // 4
+
+
+def _cut(text: str, max_tokens: int, keep: str) -> str:
+    """Cut a single line to `max_tokens` at a token boundary."""
+    tokens = _encode(text)
+    if tokens is None:
+        chars = max_tokens * 4
+        return text[:chars] if keep == "head" else text[-chars:]
+    kept = tokens[:max_tokens] if keep == "head" else tokens[-max_tokens:]
+    return litellm.decode(model=PROMPT_TOKENIZER_MODEL, tokens=kept)
+
+
+def truncate(text: str, max_tokens: int, keep: str = "head") -> str:
+    """`text` cut to at most `max_tokens` by whole lines, keeping its start ("head") or end ("tail")."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    room = max_tokens - count_tokens(ELLIPSIS) - 1
+    if room <= 0:
+        return ""
+    lines = text.splitlines()
+    if keep == "tail":
+        lines.reverse()
+    kept, used = [], 0
+    for line in lines:
+        cost = count_tokens(line) + 1  # + newline
+        if used + cost > room:
+            if not kept:
+                kept.append(_cut(line, room, keep))
+            break
+        kept.append(line)
+        used += cost
+    if keep == "tail":
+        kept.reverse()
+        return "\n".join([ELLIPSIS] + kept)
+    return "\n".join(kept + [ELLIPSIS])
+
+
+class Section(NamedTuple):
+    name: str
+    text: str
+    priority: int = 0  # lower is packed first
+    max_tokens: int | None = None
+    keep: str = "head"  # "head" or "tail", see truncate()
+    required: bool = False  # always included in full
+
+
+class PackedPrompt(NamedTuple):
+    texts: dict  # section name -> text as packed ("" when dropped)
+    tokens: dict  # section name -> tokens used
+    total: int
+    trimmed: list
+    dropped: list
+
+
+def pack(sections: list, budget: int | None = None) -> PackedPrompt:
+    """Fit `sections` into `budget` tokens (default PROMPT_TOKEN_BUDGET, see module docstring)."""
+    budget = PROMPT_TOKEN_BUDGET if budget is None else budget
+    texts, tokens, trimmed, dropped = {}, {}, [], []
+    for section in sections:
+        if section.required:
+            texts[section.name] = section.text
+            tokens[section.name] = count_tokens(section.text)
+    remaining = budget - sum(tokens.values())
+
+    for section in sorted((s for s in sections if not s.required), key=lambda s: s.priority):
+        limit = remaining if section.max_tokens is None else min(section.max_tokens, remaining)
+        text = truncate(section.text, limit, section.keep) if section.text and limit > 0 else ""
+        if section.text and not text:
+            dropped.append(section.name)
+        elif text != section.text:
+            trimmed.append(section.name)
+        texts[section.name] = text
+        tokens[section.name] = count_tokens(text)
+        remaining -= tokens[section.name]
+
+    total = sum(tokens.values())
+    _prompt_tokens.observe(total)
+    _trimmed.inc(len(trimmed))
+    _dropped.inc(len(dropped))
+    return PackedPrompt(texts, tokens, total, trimmed, dropped)
+
+
+def message_tokens(message: dict) -> int:
+    content = message.get("content")
+    return count_tokens(content if isinstance(content, str) else str(content)) + 4  # role / separators
+
+
+def fit_messages(messages: list, budget: int | None = None) -> list:
+    """Drop the oldest non-system messages until `messages` fits `budget` (the last one always stays)."""
+    budget = PROMPT_TOKEN_BUDGET if budget is None else budget
+    sizes = [message_tokens(m) for m in messages]
+    total = sum(sizes)
+    keep = [True] * len(messages)
+    for i, message in enumerate(messages[:-1]):
+        if total <= budget:
+            break
+        if message.get("role") != "system":
+            keep[i] = False
+            total -= sizes[i]
+    if not all(keep):
+        _dropped.inc(keep.count(False))
+    _prompt_tokens.observe(total)
+    return [m for m, k in zip(messages, keep) if k]
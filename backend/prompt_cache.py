@@ -0,0 +1,75 @@
+"""Provider-side caching of the static prompt prefix.
+
+Providers bill and process a repeated prompt prefix at a discount (or
+skip it), but only when the prefix is byte-identical between calls. Prompts
+therefore start with a system message that depends on nothing but the class
+(`llm.class_prefix`), and everything per request goes after it.
+
+Gemini and OpenAI models cache long identical prefixes implicitly. For
+providers that need an explicit marker (`PROMPT_CACHE_PROVIDERS`, Anthropic
+style `cache_control`, which litellm passes through), the leading system
+message is marked cacheable. Gemini is left out by default: litellm maps the
+marker to its context-caching API, which costs a cache lookup per call.
+
+The share of prompt tokens served from the cache, as reported in
+`usage.prompt_tokens_details.cached_tokens`, is exported as metrics.
+"""
+import os
+from functools import lru_cache
+
+import litellm
+
+import metrics
+
+PROMPT_CACHE_PROVIDERS = {
+    p.strip() for p in os.getenv("PROMPT_CACHE_PROVIDERS", "anthropic,bedrock,vertex_ai").split(",") if p.strip()
+}
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+_prompt_tokens = metrics.counter("llm_prompt_tokens_total", "Prompt tokens reported by the LLM provider")
+_cached_tokens = metrics.counter("llm_cached_prompt_tokens_total", "Prompt tokens the provider served from its cache")
+_cached_ratio = metrics.histogram(
+    "llm_cached_token_ratio", "Share of each prompt served from the provider cache", buckets=(0.0, 0.25, 0.5, 0.75, 0.9, 1.0)
+)
+
+
+@lru_cache(maxsize=None)
+def provider_of(model: str) -> str:
+    try:
+        return litellm.get_llm_provider(model)[1]
+    except Exception:
+        return ""
+
+
+def with_cache_control(messages: list, model: str) -> list:
+    """`messages` with the leading system message marked cacheable, when `model`'s provider needs the marker."""
+    if not messages or provider_of(model) not in PROMPT_CACHE_PROVIDERS:
+        return messages
+    first = messages[0]
+    if first.get("role") != "system" or not isinstance(first.get("content"), str):
+        return messages
+    marked = {"role": "system", "content": [{"type": "text", "text": first["content"], "cache_control": CACHE_CONTROL}]}
+    return [marked, *messages[1:]]
+
+
+def _field(obj, name):
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def record_usage(response) -> float | None:
+    """Export the response's cached-token share; returns it, or None when usage was not reported."""
+    usage = _field(response, "usage")
+    prompt_tokens = _field(usage, "prompt_tokens")
+    if not prompt_tokens:
+        return None
+    cached = _field(_field(usage, "prompt_tokens_details"), "cached_tokens") or 0
+    _prompt_tokens.inc(prompt_tokens)
+    _cached_tokens.inc(cached)
+    ratio = cached / prompt_tokens
+    _cached_ratio.observe(ratio)
+    return ratio
@@ -0,0 +1,168 @@
+"""Shared data-access helpers for the routers.
+
+Each helper loads a whole result set in a fixed number of SQL statements
+(joins or one batched IN query) so endpoints don't issue one query per row.
+"""
+from sqlalchemy import case, func, select, tuple_
+from sqlalchemy.orm import Session
+
+from models.models import Parent, Teacher, TeacherStudent, User, Video
+from models.schemas import VideoOut
+
+
+def teacher_enrollments(db: Session, teacher_id: int) -> list:
+    """Return `(TeacherStudent, User | None)` pairs for one teacher, in enrollment order.
+
+    One statement: the student row is outer-joined so dangling enrollments
+    still show up (with `None`) for callers that report them.
+    """
+    return (
+        db.query(TeacherStudent, User)
+        .outerjoin(User, User.username == TeacherStudent.student_username)
+        .filter(TeacherStudent.teacher_id == teacher_id)
+        .order_by(TeacherStudent.id)
+        .all()
+    )
+
+
+def all_enrollments(db: Session) -> list:
+    """Return `(TeacherStudent, Teacher | None, User | None)` for every enrollment (one statement)."""
+    return (
+        db.query(TeacherStudent, Teacher, User)
+        .outerjoin(Teacher, Teacher.id == TeacherStudent.teacher_id)
+        .outerjoin(User, User.username == TeacherStudent.student_username)
+        .order_by(TeacherStudent.id)
+        .all()
+    )
+
+
+def student_teachers_with_videos(db: Session, student_username: str) -> list:
+    """Return `(TeacherStudent, Teacher, [Video])` for each teacher a student is enrolled with.
+
+    Videos are limited to the class the student was enrolled in. Two
+    statements regardless of how many teachers: enrollments joined with their
+    teacher, then every matching video in one `(teacher_id, class_level) IN`.
+    """
+    rows = (
+        db.query(TeacherStudent, Teacher)
+        .join(Teacher, Teacher.id == TeacherStudent.teacher_id)
+        .filter(TeacherStudent.student_username == student_username)
+        .order_by(TeacherStudent.id)
+        .all()
+    )
+    if not rows:
+        return []
+
+    keys = {(rel.teacher_id, rel.class_level) for rel, _ in rows}
+    videos_by_key = {key: [] for key in keys}
+    videos = (
+        db.query(Video)
+        .filter(tuple_(Video.teacher_id, Video.class_level).in_(list(keys)))
+        .order_by(Video.id)
+        .all()
+    )
+    for video in videos:
+        videos_by_key[(video.teacher_id, video.class_level)].append(video)
+
+    return [(rel, teacher, videos_by_key[(rel.teacher_id, rel.class_level)]) for rel, teacher in rows]
+
+
+def class_teachers_with_video_counts(db: Session, class_level: str) -> list:
+    """Return `(Teacher, video_count)` for every teacher with videos in `class_level`.
+
+    One joined, grouped statement; the database does the counting, so the
+    cost no longer grows with teachers x videos.
+    """
+    return (
+        db.query(Teacher, func.count(Video.id))
+        .join(Video, Video.teacher_id == Teacher.id)
+        .filter(Video.class_level == class_level)
+        .group_by(Teacher.id)
+        .order_by(Teacher.id)
+        .all()
+    )
+
+
+def group_videos_by_teacher(videos, teacher_fields=("id", "name", "bio")) -> list:
+    """Group videos under their teacher in a single pass, keeping video order.
+
+    `videos` must have `Video.teacher` already loaded (joinedload or
+    contains_eager in the same statement), so no query runs here. Teachers are
+    listed in order of their first video; videos are serialized through
+    `VideoOut` so the loaded teacher row is not embedded in each video.
+    """
+    groups = {}
+    for video in videos:
+        group = groups.get(video.teacher_id)
+        if group is None:
+            teacher = video.teacher
+            group = groups[video.teacher_id] = {
+                "teacher": {field: getattr(teacher, field) for field in teacher_fields},
+                "videos": [],
+            }
+        group["videos"].append(VideoOut.model_validate(video))
+    return list(groups.values())
+
+
+def class_filter_for(student: User):
+    """Students compared with `student`: same `class_level` if set, else same numeric `level`."""
+    if student.class_level:
+        return User.class_level == student.class_level
+    return User.level == student.level
+
+
+def parent_with_student(db: Session, parent_username: str):
+    """Return `(Parent, User | None)` for a parent and their linked child in one statement, or `(None, None)`."""
+    row = (
+        db.query(Parent, User)
+        .outerjoin(User, User.username == Parent.student_username)
+        .filter(Parent.username == parent_username)
+        .first()
+    )
+    return row if row is not None else (None, None)
+
+
+def child_stats(student: User) -> dict:
+    """The `ChildStats` fields parent dashboards and reports show for one student."""
+    return {
+        "username": student.username,
+        "name": student.name,
+        "class_level": student.class_level,
+        "level": student.level,
+        "total_attempts": int(student.total_attempts or 0),
+        "correct_attempts": int(student.correct_attempts or 0),
+        "accuracy": (float(student.correct_attempts or 0) / float(student.total_attempts)) if student.total_attempts else 0.0,
+        "score": float(student.score or 0.0),
+        "current_streak": int(student.current_streak or 0),
+        "max_streak": int(student.max_streak or 0),
+    }
+
+
+def class_comparison(db: Session, student: User) -> dict:
+    """Class-wide aggregates and the student's rank in one SQL statement.
+
+    Served from the (class_level, score) / (level, score) indexes.
+    """
+    my_score = student.score or 0.0
+    stmt = select(
+        func.count(User.id),
+        func.avg(User.score),
+        func.sum(User.correct_attempts),
+        func.sum(User.total_attempts),
+        func.max(User.score),
+        func.sum(case((User.score > my_score, 1), else_=0)),
+    ).where(class_filter_for(student))
+    total_students, avg_score, total_correct, total_attempts, top_score, higher_count = db.execute(stmt).one()
+
+    total_students = int(total_students or 0)
+    higher_count = int(higher_count or 0)
+    total_attempts = total_attempts or 0
+    return {
+        "class_count": total_students,
+        "avg_score": float(avg_score or 0.0),
+        "avg_accuracy": float((total_correct or 0) / total_attempts) if total_attempts else 0.0,
+        "top_score": float(top_score or 0.0),
+        # Rank by score (1 = highest)
+        "rank": higher_count + 1,
+        "percentile": 100.0 * (1.0 - (higher_count / total_students)) if total_students else 0.0,
+    }
@@ -0,0 +1,51 @@
+"""Pre-built lookups and response bodies for the quotes endpoints.
+
+Built once per quotes.json version by the content registry. Quotes are
+bucketed by normalised topic, and every response body the endpoints can send
+(all quotes, quotes per topic, each single quote) is serialized up front, so
+a request is a dict lookup or a random index into a tuple followed by writing
+ready-made bytes.
+"""
+import json
+import random
+from datetime import date
+
+
+def normalize_topic(topic) -> str:
+    return str(topic or "").strip().lower()
+
+
+def _dumps(value) -> bytes:
+    # Same encoding as FastAPI's JSONResponse
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+class QuotesIndex:
+    def __init__(self, quotes: list):
+        self.quotes = tuple(quotes)
+        by_topic = {}
+        for quote in self.quotes:
+            by_topic.setdefault(normalize_topic(quote.get("topic")), []).append(quote)
+        self.by_topic = {topic: tuple(items) for topic, items in by_topic.items()}
+
+        self.all_body = _dumps({"quotes": list(self.quotes)})
+        self.topic_bodies = {topic: _dumps({"quotes": list(items)}) for topic, items in self.by_topic.items()}
+        self.quote_bodies = tuple(_dumps(quote) for quote in self.quotes)
+        self.topic_quote_bodies = {
+            topic: tuple(_dumps(quote) for quote in items) for topic, items in self.by_topic.items()
+        }
+
+    def _bodies(self, topic: str | None):
+        if topic is None:
+            return self.quote_bodies
+        return self.topic_quote_bodies.get(normalize_topic(topic), ())
+
+    def random_body(self, topic: str | None = None, rng=random) -> bytes | None:
+        """One random quote (optionally from `topic`) as JSON bytes, or None if there is none."""
+        bodies = self._bodies(topic)
+        return bodies[rng.randrange(len(bodies))] if bodies else None
+
+    def daily_body(self, day: date, topic: str | None = None) -> bytes | None:
+        """The quote of the day: the same for every request and worker on `day`."""
+        bodies = self._bodies(topic)
+        return bodies[day.toordinal() % len(bodies)] if bodies else None
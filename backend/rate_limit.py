@@ -0,0 +1,275 @@
+"""Rate limiting and admission control for the LLM-backed chat endpoints.
+
+Two token buckets guard every LLM call: one per client (default 12/min,
+bursts of 6) and one per class (default 240/min, bursts of 60), so a single
+student cannot use up the model quota and a single class cannot starve the
+others. A rejected request gets 429 with `Retry-After` set to the time until
+the bucket has a token again.
+
+The chat routes name the student in the path and do not require a token, so
+the path username cannot key the client bucket: anyone could drain it and
+lock that student out. Requests with a valid bearer token are keyed on the
+token's subject; all others share one bucket per client address (behind a
+proxy, run uvicorn with `--proxy-headers` so that is the real client). The
+class bucket still follows the path user's class, so an anonymous client can
+at most spend its own bucket's share of that class's quota.
+
+Buckets live in process memory by default. With `RATE_LIMIT_REDIS_URL` set
+(and the optional `redis` package installed) they live in Redis instead and
+are shared by all workers; `LocalStore` is an in-process stand-in with the
+same `eval` interface for development and tests.
+
+On top of that, at most `LLM_MAX_CONCURRENCY` (default 8) LLM requests run at
+once per worker. Requests beyond that are shed immediately with 429 instead
+of queueing in the threadpool; `Retry-After` is the recent average LLM call
+duration. The slot is checked first, so a shed request neither runs the
+limiter's user lookup nor spends a token.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy.orm import Session
+
+import metrics
+from auth_context import load_user, request_auth
+from helper import get_db
+
+try:
+    import redis
+except ImportError:  # optional: in-memory buckets only
+    redis = None
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_USER_PER_MINUTE = float(os.getenv("RATE_LIMIT_USER_PER_MINUTE", "12"))
+RATE_LIMIT_USER_BURST = float(os.getenv("RATE_LIMIT_USER_BURST", "6"))
+RATE_LIMIT_CLASS_PER_MINUTE = float(os.getenv("RATE_LIMIT_CLASS_PER_MINUTE", "240"))
+RATE_LIMIT_CLASS_BURST = float(os.getenv("RATE_LIMIT_CLASS_BURST", "60"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+_user_rejected = metrics.counter("rate_limit_user_rejected_total", "LLM requests rejected by a per-student bucket")
+_class_rejected = metrics.counter("rate_limit_class_rejected_total", "LLM requests rejected by a per-class bucket")
+_admission_rejected = metrics.counter("llm_admission_rejected_total", "LLM requests shed because all LLM slots were busy")
+
+
+class Limit(NamedTuple):
+    per_minute: float
+    burst: float
+
+    @property
+    def per_second(self) -> float:
+        return self.per_minute / 60.0
+
+
+def take_token(tokens, updated_at, limit: Limit, now: float, cost: float = 1.0) -> tuple:
+    """Refill a bucket to `now` and try to take `cost` tokens.
+
+    `tokens`/`updated_at` are None for a new bucket. Returns
+    (tokens, allowed, retry_after_seconds).
+    """
+    if tokens is None:
+        tokens, updated_at = limit.burst, now
+    tokens = min(limit.burst, tokens + max(0.0, now - updated_at) * limit.per_second)
+    if tokens >= cost:
+        return tokens - cost, True, 0.0
+    return tokens, False, (cost - tokens) / limit.per_second
+
+
+class MemoryBackend:
+    """Buckets in a bounded LRU dict (per worker)."""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def take(self, key: str, limit: Limit, now: float, cost: float = 1.0) -> tuple:
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (None, None))
+            tokens, allowed, retry_after = take_token(tokens, updated_at, limit, now, cost)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            # Evicted buckets were idle longest; they would have refilled anyway
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+# KEYS[1] bucket; ARGV: per_second, burst, now, cost. Runs atomically in Redis.
+TOKEN_BUCKET_SCRIPT = """
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+local now, cost = tonumber(ARGV[3]), tonumber(ARGV[4])
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed, retry = 0, 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+else
+  retry = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(retry)}
+"""
+
+
+class SharedStoreBackend:
+    """Buckets in a shared store (a `redis.Redis` client, or `LocalStore`) so all workers see one limit."""
+
+    def __init__(self, store, prefix: str = "ratelimit:"):
+        self.store = store
+        self.prefix = prefix
+
+    def take(self, key: str, limit: Limit, now: float) -> tuple:
+        allowed, retry_after = self.store.eval(
+            TOKEN_BUCKET_SCRIPT, 1, self.prefix + key, limit.per_second, limit.burst, now, 1
+        )
+        return bool(int(allowed)), float(retry_after)
+
+    def reset(self):
+        pass  # keys expire on their own once the bucket is full again
+
+
+class LocalStore:
+    """In-process stand-in for Redis that understands TOKEN_BUCKET_SCRIPT only."""
+
+    def __init__(self):
+        self._backend = MemoryBackend()
+
+    def eval(self, script: str, numkeys: int, key: str, per_second, burst, now, cost):
+        if script != TOKEN_BUCKET_SCRIPT or numkeys != 1:
+            raise NotImplementedError("LocalStore only runs the token bucket script")
+        limit = Limit(float(per_second) * 60.0, float(burst))
+        allowed, retry_after = self._backend.take(key, limit, float(now), float(cost))
+        return [int(allowed), str(retry_after)]
+
+
+class RateLimited(Exception):
+    def __init__(self, scope: str, retry_after: float):
+        super().__init__(f"{scope} rate limit exceeded")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    def __init__(self, backend, user_limit: Limit, class_limit: Limit, clock=time.time):
+        self.backend = backend
+        self.user_limit = user_limit
+        self.class_limit = class_limit
+        self.clock = clock
+
+    def check(self, client: str, class_key: str | None = None):
+        """Take one token from the client's bucket (see `client_key`), then the class's; raises RateLimited."""
+        now = self.clock()
+        allowed, retry_after = self.backend.take(client, self.user_limit, now)
+        if not allowed:
+            _user_rejected.inc()
+            raise RateLimited("student", retry_after)
+        if class_key is not None:
+            allowed, retry_after = self.backend.take(f"class:{class_key}", self.class_limit, now)
+            if not allowed:
+                _class_rejected.inc()
+                raise RateLimited("class", retry_after)
+
+    def reset(self):
+        self.backend.reset()
+
+
+def _default_backend():
+    if RATE_LIMIT_REDIS_URL:
+        if redis is None:
+            print("⚠️ rate_limit: RATE_LIMIT_REDIS_URL is set but redis is not installed; using in-memory buckets", flush=True)
+        else:
+            return SharedStoreBackend(redis.Redis.from_url(RATE_LIMIT_REDIS_URL))
+    return MemoryBackend()
+
+
+class AdmissionControl:
+    """At most `max_concurrent` LLM requests in flight; the rest are rejected, not queued."""
+
+    def __init__(self, max_concurrent: int = LLM_MAX_CONCURRENCY, initial_estimate: float = 2.0):
+        self.max_concurrent = max_concurrent
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._avg_seconds = initial_estimate  # moving average of LLM request time
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        return self._slots.acquire(blocking=False)
+
+    def release(self, elapsed: float):
+        with self._lock:
+            self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * elapsed
+        self._slots.release()
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self._avg_seconds))
+
+
+rate_limiter = RateLimiter(
+    _default_backend(),
+    Limit(RATE_LIMIT_USER_PER_MINUTE, RATE_LIMIT_USER_BURST),
+    Limit(RATE_LIMIT_CLASS_PER_MINUTE, RATE_LIMIT_CLASS_BURST),
+)
+llm_admission = AdmissionControl()
+
+
+def _too_many(detail: str, retry_after: float):
+    raise HTTPException(
+        status_code=429, detail=detail, headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
+def client_key(request: Request) -> str:
+    """The client bucket's key: the bearer token's subject, or the client address without a valid token."""
+    auth = request_auth(request)
+    if auth.username:
+        return f"user:{auth.username}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def llm_rate_limit(request: Request, username: str, db: Session = Depends(get_db)):
+    """Route dependency: per-client and per-class buckets for `/chat/send*/{username}`.
+
+    Unknown usernames get 404 before any bucket is touched. The client bucket
+    is keyed by `client_key`, never by the path username, so one client cannot
+    lock another student out. Declare it after `llm_slot` so a request shed
+    for lack of a slot does not spend a token.
+    """
+    if not RATE_LIMIT_ENABLED:
+        return
+    user = load_user(db, username)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    try:
+        rate_limiter.check(client_key(request), user.resolved_class_key)
+    except RateLimited as e:
+        _too_many(f"Too many requests for this {e.scope}, please slow down", e.retry_after)
+
+
+async def llm_slot():
+    """Route dependency holding one of the LLM_MAX_CONCURRENCY slots for the whole request.
+
+    Async so a saturated worker rejects on the event loop without taking a threadpool thread;
+    it must come before `llm_rate_limit` (a sync, DB-backed dependency) in the route's dependencies.
+    """
+    if not llm_admission.try_acquire():
+        _admission_rejected.inc()
+        _too_many("The tutor is busy right now, please try again shortly", llm_admission.retry_after())
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        llm_admission.release(time.perf_counter() - start)
@@ -0,0 +1,53 @@
+"""Cache of generated parent reports, keyed by a fingerprint of the stats.
+
+A parent who views, downloads and then emails a report sends the same
+`ParentReportRequest` three times. The LLM text and the rendered PDF for a
+payload are cached for `REPORT_CACHE_TTL_SECONDS` (default 1h), up to
+`REPORT_CACHE_MAX_ENTRIES` payloads (LRU), so only the first request pays for
+the LLM call and the render. Any change in the child's stats changes the
+fingerprint, so a stale report is never served for new numbers.
+"""
+import hashlib
+import json
+import os
+
+import metrics
+from ttl_cache import TTLCache
+
+REPORT_CACHE_TTL_SECONDS = float(os.getenv("REPORT_CACHE_TTL_SECONDS", "3600"))
+REPORT_CACHE_MAX_ENTRIES = int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "256"))
+
+# Two entries (text, pdf) per payload
+report_cache = TTLCache(maxsize=2 * REPORT_CACHE_MAX_ENTRIES, ttl=REPORT_CACHE_TTL_SECONDS)
+
+_hits = metrics.counter("report_cache_hits_total", "Parent report text/PDF served from the cache")
+_misses = metrics.counter("report_cache_misses_total", "Parent report text/PDF generated on a cache miss")
+
+
+def fingerprint(child: dict, comparison: dict | None) -> str:
+    """Stable sha256 of the report inputs."""
+    canonical = json.dumps({"child": child, "comparison": comparison}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _cached(key, factory):
+    computed = []
+
+    def _compute():
+        computed.append(True)
+        return factory()
+
+    value = report_cache.get_or_set(key, _compute)
+    (_misses if computed else _hits).inc()
+    return value
+
+
+def cached_report_text(child: dict, comparison: dict | None, generate) -> str:
+    """Report text for these stats; `generate(child, comparison)` runs only on a miss."""
+    return _cached(("text", fingerprint(child, comparison)), lambda: generate(child, comparison))
+
+
+def cached_report_pdf(child: dict, comparison: dict | None, report_text: str, render) -> bytes:
+    """PDF bytes for these stats; `render(report_text, child, comparison)` runs only on a miss."""
+    text_hash = hashlib.sha256(report_text.encode("utf-8")).hexdigest()
+    return _cached(("pdf", fingerprint(child, comparison), text_hash), lambda: render(report_text, child, comparison))
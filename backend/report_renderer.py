@@ -0,0 +1,260 @@
+"""Parent report PDF rendering on a process pool.
+
+`build_report_pdf()` is the single reportlab layout used by the download and
+email endpoints. Building the document is CPU-bound and holds the GIL, so the
+endpoints hand it to `report_renderer`, which runs it in worker processes
+(`REPORT_RENDER_WORKERS`, default: CPU count). At most `REPORT_RENDER_QUEUE`
+jobs (default 4 per worker) may be queued or running; beyond that `submit()`
+raises `RendererBusy` and the endpoints answer 503 instead of piling up work.
+
+Render time and queue wait are exported as histograms on `/metrics`.
+REPORT_RENDER_WORKERS=0 renders inline in the calling thread (no pool).
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import LETTER
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+REPORT_RENDER_WORKERS = int(os.getenv("REPORT_RENDER_WORKERS", str(os.cpu_count() or 1)))
+REPORT_RENDER_QUEUE = int(os.getenv("REPORT_RENDER_QUEUE", str(4 * max(1, REPORT_RENDER_WORKERS))))
+REPORT_RENDER_TIMEOUT_SECONDS = float(os.getenv("REPORT_RENDER_TIMEOUT_SECONDS", "30"))
+
+
+class RendererBusy(Exception):
+    """The render queue is full; retry later."""
+
+
+@lru_cache(maxsize=1)
+def _styles() -> dict:
+    """Paragraph styles shared by every report (built once per process)."""
+    base = getSampleStyleSheet()
+    return {
+        "title": ParagraphStyle(
+            "TitleStyle",
+            parent=base["Title"],
+            fontName="Helvetica-Bold",
+            fontSize=22,
+            textColor=colors.HexColor("#1F4AB8"),
+            spaceAfter=12,
+        ),
+        "subtitle": ParagraphStyle(
+            "SubtitleStyle",
+            parent=base["Heading2"],
+            fontName="Helvetica-Bold",
+            fontSize=12,
+            textColor=colors.HexColor("#555555"),
+            spaceAfter=16,
+        ),
+        "body": ParagraphStyle(
+            "BodyStyle",
+            parent=base["BodyText"],
+            fontName="Helvetica",
+            fontSize=11,
+            leading=15,
+            textColor=colors.HexColor("#222222"),
+        ),
+        "section": ParagraphStyle(
+            "CompTitle",
+            parent=base["Heading3"],
+            fontName="Helvetica-Bold",
+            fontSize=13,
+            textColor=colors.HexColor("#1F4AB8"),
+        ),
+        "footer": ParagraphStyle("Footer", parent=base["BodyText"], fontSize=9, textColor=colors.HexColor("#666666")),
+    }
+
+
+_ACCENT_STYLE = TableStyle([
+    ('BACKGROUND', (0,0), (-1,-1), colors.HexColor('#1F4AB8')),
+    ('LINEBELOW', (0,0), (-1,-1), 0, colors.white),
+    ('LEFTPADDING', (0,0), (-1,-1), 0),
+    ('RIGHTPADDING', (0,0), (-1,-1), 0),
+    ('TOPPADDING', (0,0), (-1,-1), 1),
+    ('BOTTOMPADDING', (0,0), (-1,-1), 1),
+])
+
+_STATS_STYLE = TableStyle([
+    ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#F0F5FF')),
+    ('TEXTCOLOR', (0,0), (-1,-1), colors.HexColor('#1A1A1A')),
+    ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
+    ('FONTSIZE', (0,0), (-1,-1), 10),
+    ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+    ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+    ('BOX', (0,0), (-1,-1), 0.5, colors.HexColor('#D9E2FF')),
+    ('INNERGRID', (0,0), (-1,-1), 0.5, colors.HexColor('#D9E2FF')),
+    ('BACKGROUND', (0,1), (-1,-1), colors.white),
+    ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.HexColor('#FAFBFF')]),
+])
+
+_COMPARISON_STYLE = TableStyle([
+    ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#FFF5E6')),
+    ('BOX', (0,0), (-1,-1), 0.5, colors.HexColor('#FFE0B2')),
+    ('INNERGRID', (0,0), (-1,-1), 0.5, colors.HexColor('#FFE0B2')),
+    ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+    ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+])
+
+
+def report_filename(child: dict) -> str:
+    name = child.get("name") or child.get("username")
+    return f"report_{name}.pdf" if name else "report.pdf"
+
+
+def build_report_pdf(report_text: str, child: dict, comparison: dict | None = None) -> bytes:
+    """Render the parent report as PDF bytes.
+
+    Takes plain dicts (ChildStats / Comparison fields) so jobs pickle cheaply.
+    """
+    styles = _styles()
+    buffer = BytesIO()
+    name = child.get("name") or child.get("username")
+    cls = child.get("class_level") or child.get("level")
+
+    doc = SimpleDocTemplate(buffer, pagesize=LETTER, rightMargin=48, leftMargin=48, topMargin=48, bottomMargin=48)
+    elements = []
+
+    # Header block with accent bar
+    elements.append(Paragraph("Child Progress Report", styles["title"]))
+    elements.append(Paragraph(f"Student: <b>{name}</b> &nbsp;&nbsp;|&nbsp;&nbsp; Class: <b>{cls}</b>", styles["subtitle"]))
+
+    accent_table = Table([['']], colWidths=[doc.width])
+    accent_table.setStyle(_ACCENT_STYLE)
+    elements.append(accent_table)
+    elements.append(Spacer(1, 12))
+
+    # Report text block
+    elements.append(Paragraph(report_text.replace('\n', '<br/>'), styles["body"]))
+    elements.append(Spacer(1, 16))
+
+    # Stats card grid
+    stats_data = [
+        ["Score", f"{child.get('score', 0.0):.2f}", "Accuracy", f"{child.get('accuracy', 0.0):.2f}"],
+        ["Attempts", f"{child.get('total_attempts', 0)}", "Correct", f"{child.get('correct_attempts', 0)}"],
+        ["Current Streak", f"{child.get('current_streak', 0)}", "Max Streak", f"{child.get('max_streak', 0)}"],
+    ]
+    stats_table = Table(stats_data, colWidths=[doc.width/4.0]*4)
+    stats_table.setStyle(_STATS_STYLE)
+    elements.append(stats_table)
+
+    # Optional comparison section
+    if comparison is not None:
+        elements.append(Spacer(1, 18))
+        elements.append(Paragraph("Class Comparison", styles["section"]))
+        comp_data = [
+            ["Class Count", str(comparison.get("class_count", 0)), "Avg Score", f"{comparison.get('avg_score', 0.0):.2f}"],
+            ["Avg Accuracy", f"{comparison.get('avg_accuracy', 0.0):.2f}", "Top Score", f"{comparison.get('top_score', 0.0):.2f}"],
+            ["Rank", str(comparison.get("rank", 0)), "Percentile", f"{comparison.get('percentile', 0.0):.2f}"],
+        ]
+        comp_table = Table(comp_data, colWidths=[doc.width/4.0]*4)
+        comp_table.setStyle(_COMPARISON_STYLE)
+        elements.append(comp_table)
+
+    # Footer note
+    elements.append(Spacer(1, 20))
+    elements.append(Paragraph(
+        "This report is auto-generated to support learning. For detailed feedback, connect with your child on recent topics.",
+        styles["footer"],
+    ))
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def _render_job(submitted_at: float, report_text: str, child: dict, comparison: dict | None):
+    """Worker entry point: returns (pdf bytes, queue wait seconds, render seconds)."""
+    started = time.time()
+    pdf = build_report_pdf(report_text, child, comparison)
+    return pdf, started - submitted_at, time.time() - started
+
+
+class ReportRenderer:
+    """Bounded process pool for `build_report_pdf`."""
+
+    def __init__(self, workers: int = REPORT_RENDER_WORKERS, max_pending: int = REPORT_RENDER_QUEUE):
+        self.workers = workers
+        self.max_pending = max(1, max_pending)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+        # Imported here so worker processes only load reportlab
+        import metrics
+
+        self._render_seconds = metrics.histogram(
+            "report_render_seconds", "Time spent building a report PDF in a worker"
+        )
+        self._queue_wait_seconds = metrics.histogram(
+            "report_render_queue_wait_seconds", "Time a report PDF job waited for a free worker"
+        )
+        self._rejected = metrics.counter(
+            "report_render_rejected_total", "Report PDF jobs rejected because the render queue was full"
+        )
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: the API process runs background threads, which fork does not copy safely
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def _finish(self, job: Future, future: Future):
+        # Free the slot before anyone waiting on `future` wakes up, so they can submit again at once
+        self._slots.release()
+        if not future.set_running_or_notify_cancel():
+            return
+        if job.cancelled():
+            future.set_exception(CancelledError())
+            return
+        if job.exception() is not None:
+            future.set_exception(job.exception())
+            return
+        result = job.result()
+        _, waited, rendered = result
+        self._queue_wait_seconds.observe(max(0.0, waited))
+        self._render_seconds.observe(rendered)
+        future.set_result(result)
+
+    def submit(self, report_text: str, child: dict, comparison: dict | None = None) -> Future:
+        """Queue a render; the future resolves to (pdf bytes, queue wait, render time).
+
+        The queue slot is released before the future resolves.
+        """
+        if not self._slots.acquire(blocking=False):
+            self._rejected.inc()
+            raise RendererBusy("report renderer queue is full")
+        try:
+            if self.workers <= 0:
+                job = Future()
+                job.set_result(_render_job(time.time(), report_text, child, comparison))
+            else:
+                job = self._executor().submit(_render_job, time.time(), report_text, child, comparison)
+        except BaseException:
+            self._slots.release()
+            raise
+        future = Future()
+        job.add_done_callback(lambda done: self._finish(done, future))
+        return future
+
+    def render(self, report_text: str, child: dict, comparison: dict | None = None,
+               timeout: float = REPORT_RENDER_TIMEOUT_SECONDS) -> bytes:
+        """Render and wait for the PDF; the calling thread sleeps instead of holding the GIL."""
+        return self.submit(report_text, child, comparison).result(timeout=timeout)[0]
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=True)
+                self._pool = None
+
+
+report_renderer = ReportRenderer()
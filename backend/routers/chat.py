@@ -1,20 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException ,Header
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import case, desc, func, update
 from models.schemas import Message as MessageSchema, Chat as ChatSchema
 from models.models import Chat, Message,User
 from helper import get_db
 import base64, uuid
 import os, json
-from pathlib import Path
 import llm
+import class_stats
+import content_registry
+import conversation_summary
+from fast_json import model_response
+from rate_limit import llm_rate_limit, llm_slot
 
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
 # Read from environment: True → user must be logged in, False → guest allowed
 CHAT_AUTH_REQUIRED = os.getenv("CHAT_AUTH_REQUIRED", "true").lower() == "true"
-@router.post("/send/instant/{username}")
+@router.post("/send/instant/{username}", dependencies=[Depends(llm_slot), Depends(llm_rate_limit)])
 def send_message_instant(
     username: str,
     message: MessageSchema,
@@ -57,7 +61,6 @@ def send_message_instant(
             # Use the column expression (User.total_time_taken) as the key
             # — don't use the instance value `user.total_time_taken` which is a float
             # (that caused the "got 0.0" error when used as a dict key).
-            from sqlalchemy import func
 
             # Safely add time_taken; coalesce handles NULLs in the DB.
             db.query(User).filter(User.id == user_id).update(
@@ -71,14 +74,8 @@ def send_message_instant(
         
         
             # Load previous messages for context
-            previous_messages = (
-                db.query(Message)
-                .filter(Message.chat_id == chat.id)
-                .order_by(desc(Message.id))
-                .limit(10)
-                .all()
-            )
-            previous_messages.reverse()
+            # Messages after the chat's rolling summary, oldest first
+            previous_messages = conversation_summary.recent_messages(db, chat, 10)
 
             # Convert to conversation format
             conversation = [
@@ -87,28 +84,10 @@ def send_message_instant(
                 if m.text
             ]
 
-            # Helper to load class topics
-            def get_topics_for_class(level):
-                try:
-                    base = Path(__file__).resolve().parents[1] / "syllabus" / "topics.json"
-                    if not base.exists():
-                        return None
-                    data = json.load(open(base, encoding="utf-8"))
-                    key = f"class_{str(level).strip().replace('class_', '')}"
-                    return data.get(key)
-                except Exception:
-                    return None
-
-            topics = get_topics_for_class(user.class_level or user.level)
-
-        previous_messages = (
-            db.query(Message)
-            .filter(Message.chat_id == chat.id)
-            .order_by(desc(Message.id))
-            .limit(6)
-            .all()
-        )
-        previous_messages.reverse()
+            topics = content_registry.class_topics(user.class_level or user.level)
+
+        # Messages after the chat's rolling summary, oldest first
+        previous_messages = conversation_summary.recent_messages(db, chat, 6)
         last_context = "\n".join(
             [f"{msg.sender.capitalize()}: {msg.text}" for msg in previous_messages if msg.text]
         )
@@ -126,6 +105,7 @@ def send_message_instant(
                     image_b64=image_b64,
                     user_class=user.class_level or user.level,
                     parent_feedback=getattr(user, "Parent_feedback", None),
+                    summary=chat.summary,
             )
         else:
             bot_text = llm.generate_hint(
@@ -134,6 +114,7 @@ def send_message_instant(
                     user_class=user.class_level or user.level,
                     topics=topics,
                     parent_feedback=getattr(user, "Parent_feedback", None),
+                    summary=chat.summary,
             )
 
         print(bot_text)
@@ -146,6 +127,7 @@ def send_message_instant(
         )
         db.add(bot_msg)
         db.commit()
+        conversation_summary.summarizer.maybe_schedule(db, chat)
 
         # Return only current interaction
         return {
@@ -162,7 +144,7 @@ def send_message_instant(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/send/{username}", response_model=ChatSchema)
+@router.post("/send/{username}", response_model=ChatSchema, dependencies=[Depends(llm_slot), Depends(llm_rate_limit)])
 def send_message_by_username(
     username: str,                       # path variable
     message: MessageSchema,
@@ -205,16 +187,8 @@ def send_message_by_username(
         db.commit()
 
         # --- Fetch previous 6 messages as context ---
-        previous_messages = (
-            db.query(Message)
-            .filter(Message.chat_id == chat.id)
-            .order_by(desc(Message.id))
-            .limit(6)
-            .all()
-        )
-
-        # Reverse so oldest first
-        previous_messages.reverse()
+        # Messages after the chat's rolling summary, oldest first
+        previous_messages = conversation_summary.recent_messages(db, chat, 6)
         # Combine messages into readable context text
         last_context = "\n".join(
             [f"{msg.sender.capitalize()}: {msg.text}" for msg in previous_messages if msg.text]
@@ -234,6 +208,7 @@ def send_message_by_username(
                 image_b64=image_b64,
                 user_class=user.class_level or user.level,
                 parent_feedback=getattr(user, "Parent_feedback", None),
+                summary=chat.summary,
             )
         else:
             bot_text = llm.generate_hint(
@@ -241,6 +216,7 @@ def send_message_by_username(
                 last_context=last_context,
                 user_class=user.class_level or user.level,
                 parent_feedback=getattr(user, "Parent_feedback", None),
+                summary=chat.summary,
             )
 
        
@@ -257,6 +233,7 @@ def send_message_by_username(
         )
         db.add(bot_msg)
         db.commit()
+        conversation_summary.summarizer.maybe_schedule(db, chat)
         db.refresh(chat)
 
         return chat
@@ -281,7 +258,7 @@ def get_chats_by_username(username: str, db: Session = Depends(get_db)):
         .order_by(desc(Chat.id))
         .all()
     )
-    return chats
+    return model_response(list[ChatSchema], chats)
 
 # --- New: Get chats by session_id ---
 @router.get("/session/{session_id}", response_model=list[ChatSchema])
@@ -289,10 +266,10 @@ def get_chats_by_session(session_id: str, db: Session = Depends(get_db)):
     chats = db.query(Chat).filter(Chat.session_id == session_id).all()
     if not chats:
         raise HTTPException(status_code=404, detail="No chats for this session")
-    return chats
+    return model_response(list[ChatSchema], chats)
 
 
-@router.post("/send/check/{username}")
+@router.post("/send/check/{username}", dependencies=[Depends(llm_slot), Depends(llm_rate_limit)])
 ##divide the check answer
 def check_message_instant(
     username: str,
@@ -336,7 +313,6 @@ def check_message_instant(
             # Use the column expression (User.total_time_taken) as the key
             # — don't use the instance value `user.total_time_taken` which is a float
             # (that caused the "got 0.0" error when used as a dict key).
-            from sqlalchemy import func
 
             # Safely add time_taken; coalesce handles NULLs in the DB.
             db.query(User).filter(User.id == user_id).update(
@@ -350,14 +326,8 @@ def check_message_instant(
         
         try:
             # Load previous messages for context
-            previous_messages = (
-                db.query(Message)
-                .filter(Message.chat_id == chat.id)
-                .order_by(desc(Message.id))
-                .limit(10)
-                .all()
-            )
-            previous_messages.reverse()
+            # Messages after the chat's rolling summary, oldest first
+            previous_messages = conversation_summary.recent_messages(db, chat, 10)
 
             # Convert to conversation format
             conversation = [
@@ -366,102 +336,76 @@ def check_message_instant(
                 if m.text
             ]
 
-            # Helper to load class topics
-            def get_topics_for_class(level):
-                try:
-                    base = Path(__file__).resolve().parents[1] / "syllabus" / "topics.json"
-                    if not base.exists():
-                        return None
-                    data = json.load(open(base, encoding="utf-8"))
-                    key = f"class_{str(level).strip().replace('class_', '')}"
-                    return data.get(key)
-                except Exception:
-                    return None
-
-            topics = get_topics_for_class(user.class_level or user.level)
+            topics = content_registry.class_topics(user.class_level or user.level)
 
             # Ask LLM to detect if final + correct
-            judge = llm.check_answer(conversation=conversation, class_topics=topics)
+            judge = llm.check_answer(conversation=conversation, class_topics=topics, summary=chat.summary)
             print("Judge output:", judge, flush=True)
 
             if isinstance(judge, dict):
                 if judge.get("final"):
-                    # Use atomic UPDATEs to avoid race conditions and ensure counters increment correctly.
+                    # Counters, score clamp, streaks and class statistics change in one transaction.
+                    # Nothing is read before the first UPDATE: it takes the row lock (the database write
+                    # lock on SQLite, where FOR UPDATE is a no-op), computes the streak from the locked
+                    # row and RETURNs the score as it was, so concurrent checks for the same student
+                    # are serialized and class statistics get exact before/after snapshots.
                     try:
                         is_correct = bool(judge.get("correct"))
+                        streak = func.coalesce(User.current_streak, 0)
+                        best = func.coalesce(User.max_streak, 0)
 
                         if is_correct:
                             print("✅ correct answer (atomic update)", flush=True)
-                            db.query(User).filter(User.id == user_id).update(
-                                {
-                                    User.total_attempts: (User.total_attempts + 1),
-                                    User.correct_attempts: (User.correct_attempts + 1),
-                                    User.score: (User.score + 1.0),
-                                },
-                                synchronize_session=False,
-                            )
+                            counters = {
+                                User.total_attempts: (User.total_attempts + 1),
+                                User.correct_attempts: (User.correct_attempts + 1),
+                                User.current_streak: streak + 1,
+                                User.max_streak: case((streak + 1 > best, streak + 1), else_=best),
+                            }
+                            delta = 1.0
                         else:
                             print("❌ incorrect answer (atomic update)", flush=True)
-                            db.query(User).filter(User.id == user_id).update(
-                                {
-                                    User.total_attempts: (User.total_attempts + 1),
-                                    User.score: (User.score - 0.25),
-                                },
-                                synchronize_session=False,
-                            )
-
-                        # Commit the atomic update
+                            counters = {User.total_attempts: (User.total_attempts + 1), User.current_streak: 0}
+                            delta = -0.25
+
+                        counted = db.execute(
+                            update(User)
+                            .where(User.id == user_id)
+                            .values(counters)
+                            .returning(User.username, User.class_level, User.level, User.score,
+                                       User.total_attempts, User.correct_attempts)
+                        ).one()
+                        before = {
+                            "username": counted.username,
+                            "class_level": counted.class_level,
+                            "level": counted.level,
+                            "score": float(counted.score or 0.0),
+                            "total_attempts": int(counted.total_attempts or 0) - 1,
+                            "correct_attempts": int(counted.correct_attempts or 0) - (1 if is_correct else 0),
+                        }
+
+                        # Clamp negative score to 0.0 in the same statement
+                        new_score = User.score + delta
+                        (score,) = db.execute(
+                            update(User)
+                            .where(User.id == user_id)
+                            .values({User.score: case((new_score < 0.0, 0.0), else_=new_score)})
+                            .returning(User.score)
+                        ).one()
+                        after = {
+                            **before,
+                            "score": float(score),
+                            "total_attempts": int(counted.total_attempts or 0),
+                            "correct_attempts": int(counted.correct_attempts or 0),
+                        }
+                        class_stats.apply_user_change(db, before, after)
+
+                        # Log resulting values for verification
+                        print(
+                            f"ℹ️ Post-update user id={user_id} -> total_attempts={after['total_attempts']}, correct_attempts={after['correct_attempts']}, score={after['score']}",
+                            flush=True,
+                        )
                         db.commit()
-
-                        # Clamp negative score to 0.0 if it happened
-                        try:
-                            u_after = db.query(User).filter(User.id == user_id).first()
-                            if u_after and (u_after.score or 0.0) < 0.0:
-                                db.query(User).filter(User.id == user_id).update({User.score: 0.0}, synchronize_session=False)
-                                db.commit()
-
-                            # Log resulting values for verification
-                            if u_after:
-                                print(
-                                    f"ℹ️ Post-update user id={user_id} -> total_attempts={u_after.total_attempts}, correct_attempts={u_after.correct_attempts}, score={u_after.score}",
-                                    flush=True,
-                                )
-                            else:
-                                print(f"⚠️ User id={user_id} not found after update", flush=True)
-                        except Exception as requery_err:
-                            # Non-fatal: log and continue
-                            db.rollback()
-                            print(f"⚠️ Could not re-query/normalize user id={user_id} after commit: {requery_err}", flush=True)
-
-                        # Update streaks based on correctness: maintain current_streak and max_streak
-                        try:
-                            u_after = db.query(User).filter(User.id == user_id).first()
-                            if u_after:
-                                prev_streak = int(u_after.current_streak or 0)
-                                prev_max = int(u_after.max_streak or 0)
-                                # Compute new streak: if last update was a correct answer, increment, else reset to 0
-                                if is_correct:
-                                    new_streak = prev_streak + 1
-                                else:
-                                    new_streak = 0
-
-                                new_max = prev_max
-                                if new_streak > prev_max:
-                                    new_max = new_streak
-
-                                # Only write if changed
-                                if new_streak != prev_streak or new_max != prev_max:
-                                    db.query(User).filter(User.id == user_id).update(
-                                        {
-                                            User.current_streak: new_streak,
-                                            User.max_streak: new_max,
-                                        },
-                                        synchronize_session=False,
-                                    )
-                                    db.commit()
-                        except Exception as streak_err:
-                            db.rollback()
-                            print(f"⚠️ Could not update streaks for user id={user_id}: {streak_err}", flush=True)
                     except Exception as commit_err:
                         db.rollback()
                         print(f"❗ Failed to apply atomic user update for id={user_id}: {commit_err}", flush=True)
@@ -474,14 +418,8 @@ def check_message_instant(
         # ------------------------------------------
         #  2️⃣ Generate bot’s reply (LLM Hint)
         # ------------------------------------------
-        previous_messages = (
-            db.query(Message)
-            .filter(Message.chat_id == chat.id)
-            .order_by(desc(Message.id))
-            .limit(6)
-            .all()
-        )
-        previous_messages.reverse()
+        # Messages after the chat's rolling summary, oldest first
+        previous_messages = conversation_summary.recent_messages(db, chat, 6)
         last_context = "\n".join(
             [f"{msg.sender.capitalize()}: {msg.text}" for msg in previous_messages if msg.text]
         )
@@ -499,6 +437,7 @@ def check_message_instant(
                     image_b64=image_b64,
                     user_class=user.class_level or user.level,
                     parent_feedback=getattr(user, "Parent_feedback", None),
+                    summary=chat.summary,
             )
         else:
             bot_text = llm.generate_hint(
@@ -506,6 +445,7 @@ def check_message_instant(
                 last_context=last_context,
                 user_class=user.class_level or user.level,
                 parent_feedback=getattr(user, "Parent_feedback", None),
+                summary=chat.summary,
             )
 
         print(bot_text)
@@ -518,6 +458,7 @@ def check_message_instant(
         )
         db.add(bot_msg)
         db.commit()
+        conversation_summary.summarizer.maybe_schedule(db, chat)
 
         # Return only current interaction
         return {
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from models.schemas import Chat as ChatSchema
 from models.models import Chat
 from helper import get_db
+from fast_json import model_response
 
 router = APIRouter(prefix="/history", tags=["history"])
 
@@ -10,4 +11,4 @@ router = APIRouter(prefix="/history", tags=["history"])
 @router.get("/", response_model=list[ChatSchema])
 def get_history(db: Session = Depends(get_db)):
     chats = db.query(Chat).all()
-    return chats
+    return model_response(list[ChatSchema], chats)
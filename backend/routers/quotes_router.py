@@ -1,37 +1,52 @@
-from fastapi import APIRouter, HTTPException
-import json
-import os
-import random
+from datetime import date
+
+from fastapi import APIRouter, HTTPException, Response
+
+from content_registry import ContentUnavailable, quotes_content
+from quotes_index import QuotesIndex
 
 
 router = APIRouter(prefix="/quotes", tags=["Quotes"])
 
 
-def load_quotes():
-    """Load quotes from the JSON file."""
-    quotes_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), "quotes.json")
+def load_quotes() -> QuotesIndex:
+    """Quotes index for the current quotes.json version (in memory, see content_registry)."""
     try:
-        with open(quotes_file, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        raise HTTPException(status_code=500, detail="Quotes file not found")
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=500, detail="Invalid JSON in quotes file")
+        return quotes_content.snapshot().index
+    except ContentUnavailable as e:
+        raise HTTPException(status_code=500, detail=f"Quotes not available: {e}")
+
+
+def _json(body: bytes) -> Response:
+    # Bodies are serialized once per quotes.json version by QuotesIndex
+    return Response(content=body, media_type="application/json")
 
 
 @router.get("/random", summary="Get a random quote")
-async def get_random_quote():
+async def get_random_quote(topic: str | None = None):
     """
     Returns a randomly selected quote from the collection.
     
-    The quote includes the text, author, and topic.
+    The quote includes the text, author, and topic. Pass `topic` to pick
+    from one topic only.
     """
-    quotes = load_quotes()
-    if not quotes:
-        raise HTTPException(status_code=404, detail="No quotes available")
-    
-    random_quote = random.choice(quotes)
-    return random_quote
+    body = load_quotes().random_body(topic)
+    if body is None:
+        raise HTTPException(status_code=404, detail="No quotes available" if topic is None else f"No quotes found for topic: {topic}")
+    return _json(body)
+
+
+@router.get("/today", summary="Get the quote of the day")
+async def get_quote_of_the_day(topic: str | None = None):
+    """
+    Returns the quote of the day: the same quote for everyone until midnight (server time).
+
+    Pass `topic` for a daily quote from one topic.
+    """
+    body = load_quotes().daily_body(date.today(), topic)
+    if body is None:
+        raise HTTPException(status_code=404, detail="No quotes available" if topic is None else f"No quotes found for topic: {topic}")
+    return _json(body)
 
 
 @router.get("/", summary="Get all quotes")
@@ -41,8 +56,7 @@ async def get_all_quotes():
     
     This endpoint returns the entire collection of quotes.
     """
-    quotes = load_quotes()
-    return {"quotes": quotes}
+    return _json(load_quotes().all_body)
 
 
 @router.get("/by-topic/{topic}", summary="Get quotes by topic")
@@ -52,10 +66,9 @@ async def get_quotes_by_topic(topic: str):
     
     Topics can be 'education', 'motivation', or 'math'.
     """
-    quotes = load_quotes()
-    filtered_quotes = [quote for quote in quotes if quote.get("topic", "").lower() == topic.lower()]
+    body = load_quotes().topic_bodies.get(topic.strip().lower())
     
-    if not filtered_quotes:
+    if body is None:
         raise HTTPException(status_code=404, detail=f"No quotes found for topic: {topic}")
     
-    return {"quotes": filtered_quotes}
\ No newline at end of file
+    return _json(body)
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from models.schemas import (
     TeacherCreate, TeacherLogin, TeacherOut, TeacherUpdate,
     VideoCreate, VideoOut, VideoDetail, TeacherWithVideos,
@@ -7,6 +7,11 @@ from models.schemas import (
 )
 from models.models import Teacher, Video, TeacherStudent, User
 from helper import get_db
+import queries
+import search_index
+from view_counter import view_counter
+from trending import trending_board
+from fast_json import model_response
 from auth import create_access_token, verify_token
 from datetime import timedelta, datetime
 import os
@@ -183,7 +188,7 @@ def get_teacher_profile(username: str = Depends(verify_token), db: Session = Dep
     db_teacher = db.query(Teacher).filter(Teacher.username == username).first()
     if not db_teacher:
         raise HTTPException(status_code=404, detail="Teacher not found")
-    return db_teacher
+    return model_response(TeacherWithVideos, db_teacher)
 
 
 @router.put("/me", response_model=TeacherOut)
@@ -489,6 +494,7 @@ def delete_file(
         # Delete from database
         db.delete(db_file)
         db.commit()
+        trending_board.forget(file_id)
         
         return {"message": "Video deleted successfully"}
     
@@ -548,6 +554,30 @@ def upload_video(
     }
 
 
+@router.get("/videos/trending")
+def get_trending_videos(limit: int = 10, class_level: str = None, db: Session = Depends(get_db)):
+    """Get trending videos (time-decayed view score), optionally for one class.
+
+    Served from the precomputed trending board; only the `limit` returned
+    videos are read from the database.
+    """
+    ranked = trending_board.top(limit, class_level)
+    if not ranked:
+        raise HTTPException(status_code=404, detail="No videos found")
+
+    ids = [video_id for video_id, _ in ranked]
+    by_id = {
+        v.id: v
+        for v in db.query(Video).options(joinedload(Video.teacher)).filter(Video.id.in_(ids)).all()
+    }
+    videos = [by_id[video_id] for video_id in ids if video_id in by_id]
+
+    if not videos:
+        raise HTTPException(status_code=404, detail="No videos found")
+
+    return queries.group_videos_by_teacher(videos, teacher_fields=("id", "name", "bio"))
+
+
 @router.get("/videos/{video_id}", response_model=VideoDetail)
 def get_video_details(video_id: int, db: Session = Depends(get_db)):
     """Get video details and increment view count"""
@@ -555,12 +585,13 @@ def get_video_details(video_id: int, db: Session = Depends(get_db)):
     if not db_video:
         raise HTTPException(status_code=404, detail="Video not found")
 
-    # Increment view count
-    db_video.view_count += 1
-    db.commit()
-    db.refresh(db_video)
+    # Buffered increment: written to the DB by the view counter's next flush
+    view_counter.record(db_video.id)
+    trending_board.record_view(db_video.id, db_video.class_level)
 
-    return db_video
+    detail = VideoDetail.model_validate(db_video)
+    detail.view_count = (db_video.view_count or 0) + view_counter.pending(db_video.id)
+    return detail
 
 
 @router.delete("/videos/{video_id}")
@@ -595,6 +626,7 @@ def delete_video(
     # Delete from database
     db.delete(db_video)
     db.commit()
+    trending_board.forget(video_id)
 
     return {"message": "Video deleted successfully"}
 
@@ -605,6 +637,7 @@ def update_video(
     title: str = None,
     description: str = None,
     subject: str = None,
+    class_level: str = None,
     username: str = Depends(verify_token),
     db: Session = Depends(get_db),
 ):
@@ -627,9 +660,13 @@ def update_video(
         db_video.description = description
     if subject:
         db_video.subject = subject
+    if class_level:
+        db_video.class_level = class_level
 
     db.commit()
     db.refresh(db_video)
+    if class_level:
+        trending_board.move(video_id, class_level)
 
     return {"message": "Video updated successfully", "video": db_video}
 
@@ -639,20 +676,15 @@ def update_video(
 @router.get("/class/{class_level}")
 def get_teachers_by_class(class_level: str, db: Session = Depends(get_db)):
     """Get all teachers who have videos for a specific class"""
-    # Get all videos for the class
-    videos = db.query(Video).filter(Video.class_level == class_level).all()
-    
-    if not videos:
-        raise HTTPException(status_code=404, detail="No teachers found for this class")
+    # Teachers and their video counts for the class in one grouped query
+    rows = queries.class_teachers_with_video_counts(db, class_level)
 
-    # Get unique teachers
-    teacher_ids = list(set([v.teacher_id for v in videos]))
-    teachers = db.query(Teacher).filter(Teacher.id.in_(teacher_ids)).all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="No teachers found for this class")
 
     # Create response with teacher info and video count
     response = []
-    for teacher in teachers:
-        teacher_videos = [v for v in videos if v.teacher_id == teacher.id]
+    for teacher, video_count in rows:
         response.append({
             "id": teacher.id,
             "username": teacher.username,
@@ -660,7 +692,7 @@ def get_teachers_by_class(class_level: str, db: Session = Depends(get_db)):
             "bio": teacher.bio,
             "avatar": teacher.avatar,
             "email": teacher.email,
-            "video_count": len(teacher_videos),
+            "video_count": video_count,
         })
 
     return response
@@ -726,74 +758,29 @@ def search_videos(
     subject: str = None,
     teacher_id: int = None,
     query: str = None,
+    limit: int = 20,
+    offset: int = 0,
     db: Session = Depends(get_db),
 ):
-    """Search videos by class, subject, teacher, or title"""
-    videos_query = db.query(Video)
-
-    if class_level:
-        videos_query = videos_query.filter(Video.class_level == class_level)
-    
-    if subject:
-        videos_query = videos_query.filter(Video.subject == subject)
-    
-    if teacher_id:
-        videos_query = videos_query.filter(Video.teacher_id == teacher_id)
-    
-    if query:
-        videos_query = videos_query.filter(
-            (Video.title.ilike(f"%{query}%")) |
-            (Video.description.ilike(f"%{query}%"))
-        )
-
-    videos = videos_query.all()
+    """Search videos by class, subject, teacher, or title/description text.
+
+    Text matches are ranked by relevance (title hits first) and paginated with
+    `limit`/`offset`; short queries match word prefixes.
+    """
+    videos = search_index.search_videos(
+        db,
+        query=query,
+        class_level=class_level,
+        subject=subject,
+        teacher_id=teacher_id,
+        limit=limit,
+        offset=offset,
+    )
 
     if not videos:
         raise HTTPException(status_code=404, detail="No videos found matching the criteria")
 
-    # Group by teacher
-    result = {}
-    for video in videos:
-        teacher_id = video.teacher_id
-        if teacher_id not in result:
-            result[teacher_id] = {
-                "teacher": {
-                    "id": video.teacher.id,
-                    "name": video.teacher.name,
-                    "bio": video.teacher.bio,
-                    "email": video.teacher.email,
-                },
-                "videos": [],
-            }
-        result[teacher_id]["videos"].append(video)
-
-    return list(result.values())
-
-
-@router.get("/videos/trending")
-def get_trending_videos(limit: int = 10, db: Session = Depends(get_db)):
-    """Get trending videos (by view count)"""
-    videos = db.query(Video).order_by(Video.view_count.desc()).limit(limit).all()
-
-    if not videos:
-        raise HTTPException(status_code=404, detail="No videos found")
-
-    # Group by teacher
-    result = {}
-    for video in videos:
-        teacher_id = video.teacher_id
-        if teacher_id not in result:
-            result[teacher_id] = {
-                "teacher": {
-                    "id": video.teacher.id,
-                    "name": video.teacher.name,
-                    "bio": video.teacher.bio,
-                },
-                "videos": [],
-            }
-        result[teacher_id]["videos"].append(video)
-
-    return list(result.values())
+    return queries.group_videos_by_teacher(videos, teacher_fields=("id", "name", "bio", "email"))
 
 
 # ============ STUDENT MANAGEMENT ============
@@ -878,16 +865,13 @@ def get_teacher_students_raw(
         if not teacher:
             return {"error": "Teacher not found", "students": []}
         
-        # Get relationships
-        relationships = db.query(TeacherStudent).filter(
-            TeacherStudent.teacher_id == teacher.id
-        ).all()
+        # Get relationships with their students in one query
+        relationships = queries.teacher_enrollments(db, teacher.id)
         
         print(f"DEBUG: Found {len(relationships)} relationships")
         
         students = []
-        for rel in relationships:
-            student = db.query(User).filter(User.username == rel.student_username).first()
+        for rel, student in relationships:
             if student:
                 students.append({
                     "username": rel.student_username,
@@ -941,35 +925,23 @@ def get_student_teachers(
     if not db_student:
         raise HTTPException(status_code=404, detail="Student not found")
     
-    # Get all teacher-student relationships for this student
-    relationships = db.query(TeacherStudent).filter(
-        TeacherStudent.student_username == student_username
-    ).all()
-    
+    # Teachers and their videos for the student's class, batched
     teachers = []
-    for rel in relationships:
-        teacher = db.query(Teacher).filter(Teacher.id == rel.teacher_id).first()
-        if teacher:
-            # Get teacher's videos for the student's class
-            videos = db.query(Video).filter(
-                Video.teacher_id == teacher.id,
-                Video.class_level == rel.class_level
-            ).all()
-            
-            teachers.append({
-                "teacher": {
-                    "id": teacher.id,
-                    "name": teacher.name,
-                    "username": teacher.username,
-                    "bio": teacher.bio,
-                    "email": teacher.email,
-                    "avatar": teacher.avatar,
-                },
-                "enrolled_date": rel.enrolled_date,
-                "class_level": rel.class_level,
-                "videos": videos,
-                "video_count": len(videos),
-            })
+    for rel, teacher, videos in queries.student_teachers_with_videos(db, student_username):
+        teachers.append({
+            "teacher": {
+                "id": teacher.id,
+                "name": teacher.name,
+                "username": teacher.username,
+                "bio": teacher.bio,
+                "email": teacher.email,
+                "avatar": teacher.avatar,
+            },
+            "enrolled_date": rel.enrolled_date,
+            "class_level": rel.class_level,
+            "videos": videos,
+            "video_count": len(videos),
+        })
     
     return teachers
 
@@ -987,10 +959,8 @@ def debug_teacher_students(
     if not db_teacher:
         return {"error": "Teacher not found"}
     
-    # Get all teacher-student relationships
-    relationships = db.query(TeacherStudent).filter(
-        TeacherStudent.teacher_id == db_teacher.id
-    ).all()
+    # Get all teacher-student relationships with their students
+    relationships = queries.teacher_enrollments(db, db_teacher.id)
     
     result = {
         "teacher_id": db_teacher.id,
@@ -999,8 +969,7 @@ def debug_teacher_students(
         "relationships": []
     }
     
-    for rel in relationships:
-        student = db.query(User).filter(User.username == rel.student_username).first()
+    for rel, student in relationships:
         rel_data = {
             "relationship_id": rel.id,
             "teacher_id": rel.teacher_id,
@@ -1042,29 +1011,23 @@ def get_teacher_students(
         
         print(f"DEBUG: Teacher found: {db_teacher.id}")
         
-        # Get relationships
-        relationships = db.query(TeacherStudent).filter(
-            TeacherStudent.teacher_id == db_teacher.id
-        ).all()
+        # Get relationships with their students in one query
+        relationships = queries.teacher_enrollments(db, db_teacher.id)
         
         print(f"DEBUG: Found {len(relationships)} relationships")
         
         students = []
-        for rel in relationships:
-            print(f"DEBUG: Processing relationship for student: {rel.student_username}")
-            student = db.query(User).filter(User.username == rel.student_username).first()
+        for rel, student in relationships:
             if student:
-                student_data = {
+                students.append({
                     "username": rel.student_username,
                     "name": student.name or "No Name",
                     "email": student.email or "",
                     "class_level": rel.class_level,
                     "enrolled_date": rel.enrolled_date,
-                }
-                students.append(student_data)
-                print(f"DEBUG: Added student data: {student_data}")
+                })
         
-        print(f"DEBUG: Final students array: {students}")
+        print(f"DEBUG: Returning {len(students)} students")
         return JSONResponse(content=students, status_code=200)
         
     except Exception as e:
@@ -1094,14 +1057,11 @@ def get_students_hardcoded():
 def get_students_db_direct(db: Session = Depends(get_db)):
     """Direct database query without parameters"""
     try:
-        # Get all relationships
-        relationships = db.query(TeacherStudent).all()
+        # Get all relationships with teacher and student joined in
+        relationships = queries.all_enrollments(db)
         
         result = []
-        for rel in relationships:
-            teacher = db.query(Teacher).filter(Teacher.id == rel.teacher_id).first()
-            student = db.query(User).filter(User.username == rel.student_username).first()
-            
+        for rel, teacher, student in relationships:
             result.append({
                 "teacher_name": teacher.name if teacher else "Unknown",
                 "teacher_username": teacher.username if teacher else "Unknown",
@@ -1123,4 +1083,4 @@ def get_teacher_by_id(teacher_id: int, db: Session = Depends(get_db)):
     db_teacher = db.query(Teacher).filter(Teacher.id == teacher_id).first()
     if not db_teacher:
         raise HTTPException(status_code=404, detail="Teacher not found")
-    return db_teacher
\ No newline at end of file
+    return model_response(TeacherWithVideos, db_teacher)
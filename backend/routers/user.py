@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from models.schemas import UserCreate, UserLogin, UserOut, UserUpdate
 from models.models import User
 from helper import get_db
 from auth import create_access_token, verify_token
 from datetime import timedelta
+import auth_context
+import class_stats
+from leaderboard import leaderboards
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -28,6 +31,8 @@ def signup(user: UserCreate, db: Session = Depends(get_db)):
     )
 
     db.add(new_user)
+    db.flush()  # apply column defaults (score, attempts) before counting the new student
+    class_stats.apply_user_change(db, None, class_stats.snapshot(new_user))
     db.commit()
     db.refresh(new_user)
     return new_user
@@ -64,10 +69,71 @@ def update_user(
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    before = class_stats.snapshot(db_user)
     update_data = updates.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_user, key, value)  # no hashing
 
+    # Moves the student between class groups if class_level/level changed
+    class_stats.apply_user_change(db, before, class_stats.snapshot(db_user))
     db.commit()
+    auth_context.invalidate_user(username)
     db.refresh(db_user)
     return db_user
+
+# ---------------- Leaderboard ----------------
+def _class_board(username: str, db: Session):
+    db_user = db.query(User).filter(User.username == username).first()
+    if not db_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    if not leaderboards.loaded:
+        raise HTTPException(status_code=503, detail="Leaderboard is not available yet")
+    key = class_stats.key_for(db_user)
+    return db_user, key, leaderboards.board(key)
+
+
+def _leaderboard_response(db: Session, db_user: User, key: str, board, entries: list):
+    names = {}
+    if entries:
+        names = dict(
+            db.query(User.username, User.name)
+            .filter(User.username.in_([e["username"] for e in entries]))
+            .all()
+        )
+    if board is not None:
+        class_count, my_rank, my_percentile = leaderboards.read(
+            lambda: (len(board), board.rank(db_user.score), board.percentile(db_user.score))
+        )
+    else:
+        class_count, my_rank, my_percentile = 0, None, None
+    return {
+        "class_key": key,
+        "class_count": class_count,
+        "my_rank": my_rank,
+        "my_percentile": my_percentile,
+        "entries": [{**e, "name": names.get(e["username"])} for e in entries],
+    }
+
+
+@router.get("/leaderboard")
+def get_leaderboard(
+    limit: int = Query(10, ge=1, le=100),
+    username: str = Depends(verify_token),
+    db: Session = Depends(get_db),
+):
+    """Top students in the caller's class (same group as /parents/stats), best first."""
+    db_user, key, board = _class_board(username, db)
+    entries = leaderboards.read(lambda: board.top(limit)) if board is not None else []
+    return _leaderboard_response(db, db_user, key, board, entries)
+
+
+@router.get("/leaderboard/near-me")
+def get_leaderboard_near_me(
+    radius: int = Query(5, ge=0, le=50),
+    username: str = Depends(verify_token),
+    db: Session = Depends(get_db),
+):
+    """The caller plus up to `radius` classmates ranked directly above and below."""
+    db_user, key, board = _class_board(username, db)
+    entries = leaderboards.read(lambda: board.around(username, radius)) if board is not None else []
+    return _leaderboard_response(db, db_user, key, board, entries)
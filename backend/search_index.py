@@ -0,0 +1,185 @@
+"""Full-text search over teacher videos.
+
+SQLite uses an external-content FTS5 table (`videos_fts`) kept in sync with
+`videos` by triggers, so every insert, update and delete made through the ORM
+(or raw SQL) updates the index in the same transaction. Postgres uses a stored
+generated `tsvector` column with a GIN index, which the database maintains
+itself. Other databases (or SQLite builds without FTS5) fall back to `ILIKE`.
+"""
+import re
+
+from sqlalchemy import column, table, text
+from sqlalchemy.orm import Session, joinedload
+
+from models.models import Video
+
+# Which index backend is active: "fts5", "tsvector" or None (ILIKE fallback).
+# Set once at startup by ensure_video_search_index().
+SEARCH_BACKEND = None
+
+# Queries with at most this many terms match every term as a prefix
+# ("alg" finds "algebra"); longer queries only prefix-match the last term.
+SHORT_QUERY_MAX_TERMS = 3
+
+# Relative weight of title vs description hits when ranking
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 4.0
+
+MAX_PAGE_SIZE = 100
+
+_videos_fts = table("videos_fts", column("rowid"), column("class_level"), column("subject"))
+
+_SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS videos_fts USING fts5(
+        title, description, class_level UNINDEXED, subject UNINDEXED,
+        content='videos', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS videos_fts_ai AFTER INSERT ON videos BEGIN
+        INSERT INTO videos_fts(rowid, title, description, class_level, subject)
+        VALUES (new.id, new.title, new.description, new.class_level, new.subject);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS videos_fts_ad AFTER DELETE ON videos BEGIN
+        INSERT INTO videos_fts(videos_fts, rowid, title, description, class_level, subject)
+        VALUES ('delete', old.id, old.title, old.description, old.class_level, old.subject);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS videos_fts_au AFTER UPDATE OF title, description, class_level, subject ON videos BEGIN
+        INSERT INTO videos_fts(videos_fts, rowid, title, description, class_level, subject)
+        VALUES ('delete', old.id, old.title, old.description, old.class_level, old.subject);
+        INSERT INTO videos_fts(rowid, title, description, class_level, subject)
+        VALUES (new.id, new.title, new.description, new.class_level, new.subject);
+    END
+    """,
+]
+
+# Older databases have videos_fts_au firing on every UPDATE, including the batched
+# view_count flush; it is replaced by the column-restricted trigger above.
+_SQLITE_STALE_TRIGGER = """
+    SELECT 1 FROM sqlite_master
+    WHERE type = 'trigger' AND name = 'videos_fts_au' AND sql NOT LIKE '%UPDATE OF%'
+"""
+
+_POSTGRES_DDL = [
+    """
+    ALTER TABLE videos ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_videos_search_vector ON videos USING GIN (search_vector)",
+]
+
+
+def ensure_video_search_index(engine):
+    """Create the full-text index for `videos` if missing (dev-time migration).
+
+    Must run after the `videos` table exists. Non-fatal: on error the search
+    endpoint keeps working through the ILIKE fallback.
+    """
+    global SEARCH_BACKEND
+    dialect = engine.dialect.name
+    try:
+        with engine.begin() as conn:
+            if dialect == "sqlite":
+                existed = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'videos_fts'")
+                ).first() is not None
+                if conn.execute(text(_SQLITE_STALE_TRIGGER)).first() is not None:
+                    conn.execute(text("DROP TRIGGER videos_fts_au"))
+                    print("DB migration applied: videos_fts_au now fires on indexed columns only", flush=True)
+                for stmt in _SQLITE_DDL:
+                    conn.execute(text(stmt))
+                if not existed:
+                    # Index rows that were inserted before the triggers existed
+                    conn.execute(text("INSERT INTO videos_fts(videos_fts) VALUES ('rebuild')"))
+                    print("DB migration applied: created videos_fts full-text index", flush=True)
+                SEARCH_BACKEND = "fts5"
+            elif dialect == "postgresql":
+                for stmt in _POSTGRES_DDL:
+                    conn.execute(text(stmt))
+                SEARCH_BACKEND = "tsvector"
+    except Exception as e:
+        SEARCH_BACKEND = None
+        print(f"Search index setup error (non-fatal, using ILIKE): {e}", flush=True)
+
+
+def _query_terms(query: str) -> list:
+    return re.findall(r"\w+", (query or "").lower())
+
+
+def _fts5_match(terms: list) -> str:
+    prefix_all = len(terms) <= SHORT_QUERY_MAX_TERMS
+    parts = []
+    for i, term in enumerate(terms):
+        # Quote every term so FTS5 operators (AND, NEAR, ...) are taken literally
+        quoted = '"' + term.replace('"', '""') + '"'
+        if prefix_all or i == len(terms) - 1:
+            quoted += "*"
+        parts.append(quoted)
+    return " ".join(parts)
+
+
+def _tsquery(terms: list) -> str:
+    prefix_all = len(terms) <= SHORT_QUERY_MAX_TERMS
+    parts = []
+    for i, term in enumerate(terms):
+        parts.append(f"{term}:*" if prefix_all or i == len(terms) - 1 else term)
+    return " & ".join(parts)
+
+
+def search_videos(
+    db: Session,
+    query: str | None = None,
+    class_level: str | None = None,
+    subject: str | None = None,
+    teacher_id: int | None = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> list:
+    """Return one page of matching videos, best match first.
+
+    Filters are applied inside the same statement as the text match, and each
+    video's teacher is loaded in that statement too.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    offset = max(0, int(offset))
+    terms = _query_terms(query)
+
+    q = db.query(Video).options(joinedload(Video.teacher))
+
+    if terms and SEARCH_BACKEND == "fts5":
+        q = (
+            q.join(_videos_fts, _videos_fts.c.rowid == Video.id)
+            .filter(text("videos_fts MATCH :match"))
+            .params(match=_fts5_match(terms))
+        )
+        if class_level:
+            q = q.filter(_videos_fts.c.class_level == class_level)
+        if subject:
+            q = q.filter(_videos_fts.c.subject == subject)
+        # bm25() is lower-is-better
+        order_by = [text(f"bm25(videos_fts, {TITLE_WEIGHT}, {DESCRIPTION_WEIGHT})"), Video.id]
+    elif terms and SEARCH_BACKEND == "tsvector":
+        q = q.filter(text("videos.search_vector @@ to_tsquery('simple', :match)")).params(match=_tsquery(terms))
+        order_by = [text("ts_rank_cd(videos.search_vector, to_tsquery('simple', :match)) DESC"), Video.id]
+    else:
+        if query:
+            q = q.filter((Video.title.ilike(f"%{query}%")) | (Video.description.ilike(f"%{query}%")))
+        order_by = [Video.id]
+
+    if SEARCH_BACKEND != "fts5" or not terms:
+        if class_level:
+            q = q.filter(Video.class_level == class_level)
+        if subject:
+            q = q.filter(Video.subject == subject)
+    if teacher_id:
+        q = q.filter(Video.teacher_id == teacher_id)
+
+    return q.order_by(*order_by).limit(limit).offset(offset).all()
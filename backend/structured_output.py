@@ -0,0 +1,121 @@
+"""JSON-schema output and parsing for the answer-checking verdict.
+
+`check_answer` asks the provider for a response constrained to
+`VERDICT_SCHEMA` when the model supports it (litellm's capability table), so
+the happy path is a single strict `json.loads`. Models without schema support
+and the occasional malformed reply go through `_repair`. It takes the outermost
+`{...}`, which drops code fences and chatter around it, then decodes it as JSON,
+or as a Python-style literal (single quotes, True/False/None, trailing
+commas) without evaluating anything.
+
+Parse outcomes (strict / repaired / failed) and parse time are exported
+as metrics.
+"""
+import ast
+import json
+import time
+from functools import lru_cache
+
+import litellm
+
+import metrics
+
+VERDICT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "final": {"type": "boolean"},
+        "correct": {"type": "boolean"},
+        "feedback": {"type": "string"},
+        "correct_answer": {"type": "string"},
+    },
+    "required": ["final", "correct", "feedback", "correct_answer"],
+    "additionalProperties": False,
+}
+
+VERDICT_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "answer_verdict", "schema": VERDICT_SCHEMA, "strict": True},
+}
+
+_strict = metrics.counter("check_answer_parse_strict_total", "Verdicts parsed by the strict JSON decoder")
+_repaired = metrics.counter("check_answer_parse_repaired_total", "Verdicts that needed the repair path")
+_failed = metrics.counter("check_answer_parse_failed_total", "Verdicts that could not be parsed")
+_parse_seconds = metrics.histogram(
+    "check_answer_parse_seconds", "Time to parse a verdict", buckets=(0.00001, 0.0001, 0.001, 0.01, 0.1)
+)
+
+_LITERALS = {"true": True, "false": False, "null": None, "True": True, "False": False, "None": None}
+
+
+@lru_cache(maxsize=None)
+def supports_response_format(model: str) -> bool:
+    """Whether litellm knows `model` accepts a JSON-schema response_format."""
+    try:
+        return bool(litellm.supports_response_schema(model=model))
+    except Exception:
+        return False
+
+
+def _literal(node):
+    # ast.literal_eval, plus JSON's lowercase true/false/null
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.Name) and node.id in _LITERALS:
+        return _LITERALS[node.id]
+    if isinstance(node, ast.Dict):
+        return {_literal(k): _literal(v) for k, v in zip(node.keys, node.values)}
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return [_literal(item) for item in node.elts]
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        return -_literal(node.operand)
+    raise ValueError(f"unsupported literal: {type(node).__name__}")
+
+
+def _repair(text: str):
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    body = text[start:end + 1]
+    try:
+        return json.loads(body)
+    except ValueError:
+        pass
+    try:
+        return _literal(ast.parse(body, mode="eval").body)
+    except (ValueError, SyntaxError, TypeError):
+        return None
+
+
+def _as_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() == "true"
+    return bool(value)
+
+
+def _verdict(value) -> dict | None:
+    if not isinstance(value, dict) or "final" not in value or "correct" not in value:
+        return None
+    return {
+        "final": _as_bool(value["final"]),
+        "correct": _as_bool(value["correct"]),
+        "feedback": str(value.get("feedback") or ""),
+        "correct_answer": str(value.get("correct_answer") or ""),
+    }
+
+
+def parse_verdict(text: str) -> dict | None:
+    """The verdict in a model reply, normalised to VERDICT_SCHEMA's keys, or None."""
+    start = time.perf_counter()
+    try:
+        try:
+            verdict = _verdict(json.loads(text))
+            if verdict is not None:
+                _strict.inc()
+                return verdict
+        except ValueError:
+            pass
+        verdict = _verdict(_repair(text))
+        (_repaired if verdict is not None else _failed).inc()
+        return verdict
+    finally:
+        _parse_seconds.observe(time.perf_counter() - start)
@@ -0,0 +1,102 @@
+"""Benchmark: /parents/stats class comparison with large classes.
+
+Runs in-process against a throwaway SQLite file (no server needed):
+
+    cd backend && python test/bench_parent_stats.py [students_per_class]
+
+Seeds classes of increasing size (up to 100k students) and times the previous
+six-query aggregate, the single-statement live aggregate, and the full
+/parents/stats request served from the materialized class_stats tables.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import func, insert  # noqa: E402
+
+import main  # noqa: E402
+import queries  # noqa: E402
+from auth import create_access_token  # noqa: E402
+from class_stats import rebuild_class_stats  # noqa: E402
+from database import SessionLocal, engine  # noqa: E402
+from models.models import Parent, User  # noqa: E402
+
+LARGEST_CLASS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+CLASS_SIZES = sorted({1_000, 10_000, LARGEST_CLASS})
+REPEAT = 20
+
+
+def seed(class_level, size):
+    rng = random.Random(size)
+    rows = []
+    for i in range(size):
+        attempts = rng.randint(0, 200)
+        rows.append({
+            "username": f"{class_level}_s{i}",
+            "password": "x",
+            "class_level": class_level,
+            "level": 6,
+            "total_attempts": attempts,
+            "correct_attempts": rng.randint(0, attempts),
+            "score": rng.randint(0, 800) * 0.25,
+        })
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), rows)
+        conn.execute(insert(Parent.__table__), [{
+            "username": f"parent_{class_level}",
+            "password": "x",
+            "student_username": f"{class_level}_s{size // 2}",
+        }])
+
+
+def previous_comparison(db, student):
+    """The pre-change implementation: six separate aggregate queries."""
+    class_filter = (User.class_level == student.class_level)
+    total = db.query(func.count(User.id)).filter(class_filter).scalar() or 0
+    db.query(func.avg(User.score)).filter(class_filter).scalar()
+    db.query(func.sum(User.correct_attempts)).filter(class_filter).scalar()
+    db.query(func.sum(User.total_attempts)).filter(class_filter).scalar()
+    db.query(func.max(User.score)).filter(class_filter).scalar()
+    higher = db.query(func.count(User.id)).filter(class_filter & (User.score > student.score)).scalar() or 0
+    return total, higher
+
+
+def timed(fn):
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        fn()
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+def main_bench():
+    print(f"{'class size':>10}  {'previous 6 queries':>20}  {'single statement':>20}  {'GET /parents/stats':>20}")
+    with TestClient(main.app) as client:
+        for size in CLASS_SIZES:
+            class_level = f"class_{size}"
+            seed(class_level, size)
+            db = SessionLocal()
+            rebuild_class_stats(db)
+            db.close()
+            headers = {"Authorization": f"Bearer {create_access_token({'sub': f'parent_{class_level}'})}"}
+
+            db = SessionLocal()
+            student = db.query(User).filter(User.username == f"{class_level}_s{size // 2}").one()
+            old_ms = timed(lambda: previous_comparison(db, student))
+            live_ms = timed(lambda: queries.class_comparison(db, student))
+            db.close()
+
+            new_ms = timed(lambda: client.get("/parents/stats", headers=headers))
+            print(f"{size:>10}  {old_ms:>17.2f} ms  {live_ms:>17.2f} ms  {new_ms:>17.2f} ms")
+
+
+if __name__ == "__main__":
+    main_bench()
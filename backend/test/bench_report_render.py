@@ -0,0 +1,99 @@
+"""Benchmark: rendering 1,000 parent report PDFs.
+
+No server or database needed:
+
+    cd backend && python test/bench_report_render.py [reports]
+
+Renders the reports inline in the calling process (what the endpoints used to
+do) and then through the `report_renderer` process pool. While rendering, a
+probe thread wakes every 5 ms, like a small request on the same worker; its
+worst delays show how much the render holds the GIL away from other work.
+"""
+import os
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+
+from report_renderer import RendererBusy, ReportRenderer, build_report_pdf  # noqa: E402
+
+REPORTS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000
+CHILD = {"username": "kid", "name": "Kid", "class_level": "class_6", "score": 42.25, "accuracy": 0.81,
+         "total_attempts": 180, "correct_attempts": 146, "current_streak": 4, "max_streak": 11}
+COMPARISON = {"class_count": 120, "avg_score": 30.5, "avg_accuracy": 0.66, "top_score": 80.0, "rank": 14, "percentile": 89.2}
+TEXT = ("Kid has been practising regularly and accuracy keeps improving. " * 6 + "\n") * 3
+
+
+class Probe:
+    """Measures how late a thread that wants to run every 5 ms actually wakes up."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.delays = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            start = time.perf_counter()
+            time.sleep(self.interval)
+            self.delays.append(time.perf_counter() - start - self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def report(label, elapsed, probe):
+    delays = sorted(probe.delays)
+    p99 = delays[int(len(delays) * 0.99) - 1] if delays else 0.0
+    print(
+        f"{label:<22} {REPORTS / elapsed:8.1f} reports/s   total {elapsed:6.2f}s   "
+        f"other-request delay median {statistics.median(delays) * 1000:6.2f} ms  "
+        f"p99 {p99 * 1000:6.2f} ms  max {delays[-1] * 1000:6.2f} ms"
+    )
+
+
+def main():
+    print(f"Rendering {REPORTS} reports on {os.cpu_count()} CPU(s)")
+
+    with Probe() as probe:
+        start = time.perf_counter()
+        for _ in range(REPORTS):
+            build_report_pdf(TEXT, CHILD, COMPARISON)
+        inline = time.perf_counter() - start
+    report("inline (before)", inline, probe)
+
+    renderer = ReportRenderer()
+    renderer.render(TEXT, CHILD, COMPARISON)  # start the workers outside the timing
+    with Probe() as probe:
+        start = time.perf_counter()
+        pending = []
+        done = 0
+        while done < REPORTS:
+            while len(pending) < renderer.max_pending and done + len(pending) < REPORTS:
+                try:
+                    pending.append(renderer.submit(TEXT, CHILD, COMPARISON))
+                except RendererBusy:
+                    break
+            pending.pop(0).result()
+            done += 1
+        pooled = time.perf_counter() - start
+    report(f"process pool (x{renderer.workers})", pooled, probe)
+
+    print(renderer._queue_wait_seconds.count, "jobs; mean queue wait",
+          f"{renderer._queue_wait_seconds.sum / renderer._queue_wait_seconds.count * 1000:.1f} ms;",
+          "mean render", f"{renderer._render_seconds.sum / renderer._render_seconds.count * 1000:.1f} ms")
+    renderer.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Benchmark: payload size and serialization CPU for the largest JSON responses.
+
+Runs standalone (no server or database needed):
+
+    cd backend && python test/bench_serialization.py [iterations]
+
+For each payload, "before" is FastAPI's default path for a `response_model`
+(validate, convert to plain Python objects, then json.dumps in
+JSONResponse); "after" is `fast_json.model_response` (validate and write the
+JSON bytes in one pydantic-core pass), or orjson for plain dicts. Sizes are
+the raw body and what CompressionMiddleware would send with gzip (and
+brotli, when the optional package is installed).
+"""
+import json
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+
+from pydantic import TypeAdapter  # noqa: E402
+
+import compression  # noqa: E402
+from content_registry import quotes_content  # noqa: E402
+from fast_json import FastJSONResponse, model_response  # noqa: E402
+from models.schemas import Chat as ChatSchema, TeacherWithVideos  # noqa: E402
+
+ITERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+
+def chat_history(chats=50, messages=20):
+    return [
+        SimpleNamespace(
+            id=c, title=f"Fractions practice {c}", session_id=f"session-{c:04d}",
+            messages=[
+                SimpleNamespace(
+                    text=f"Step {m}: to add 1/{m + 2} and 1/{m + 3}, first find a common denominator.",
+                    image=None, sender="bot" if m % 2 else "user", session_id=f"session-{c:04d}",
+                    user_id=7, time_taken=1.25,
+                )
+                for m in range(messages)
+            ],
+        )
+        for c in range(chats)
+    ]
+
+
+def teacher_videos(videos=200):
+    return SimpleNamespace(
+        id=1, username="msharma", name="Meera Sharma", email="meera@example.com", phone_number=None,
+        bio="Maths teacher, classes 3-6", avatar=None,
+        videos=[
+            SimpleNamespace(
+                id=v, teacher_id=1, title=f"Long division, part {v}", description="Worked examples with remainders",
+                class_level=f"class_{3 + v % 4}", subject="Division", duration=600 + v, file_size=25_000_000 + v,
+                thumbnail=None, upload_date="2025-01-15T10:00:00", view_count=v * 13,
+                file_path=f"uploads/videos/{v:05d}.mp4",
+            )
+            for v in range(videos)
+        ],
+    )
+
+
+def before(schema, value) -> bytes:
+    adapter = TypeAdapter(schema)
+    plain = adapter.dump_python(adapter.validate_python(value, from_attributes=True), mode="json")
+    return json.dumps(plain, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def per_call_ms(fn):
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        fn()
+    return (time.perf_counter() - start) / ITERATIONS * 1000
+
+
+def run():
+    quotes = quotes_content.snapshot().data
+    chats, teacher = chat_history(), teacher_videos()
+    cases = [
+        ("chat history (50x20)", lambda: before(list[ChatSchema], chats), lambda: model_response(list[ChatSchema], chats).body),
+        ("teacher videos (200)", lambda: before(TeacherWithVideos, teacher), lambda: model_response(TeacherWithVideos, teacher).body),
+        ("quotes (dict)", lambda: before(dict, {"quotes": quotes}), lambda: FastJSONResponse({"quotes": quotes}).body),
+    ]
+    encodings = ["gzip"] + (["br"] if compression.brotli is not None else [])
+
+    size_cols = "".join(f"{enc + ' KB':>10}" for enc in encodings)
+    print(f"{'payload':<24}{'raw KB':>10}{size_cols}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name, old, new in cases:
+        body = new()
+        assert json.loads(body) == json.loads(old())
+        sizes = "".join(f"{len(compression.compress(body, enc)) / 1024:>10.1f}" for enc in encodings)
+        ms_before, ms_after = per_call_ms(old), per_call_ms(new)
+        print(f"{name:<24}{len(body) / 1024:>10.1f}{sizes}{ms_before:>12.3f}{ms_after:>12.3f}{ms_before / ms_after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,84 @@
+"""Benchmark: requests per second for the static-content endpoints.
+
+Runs in-process (no server needed):
+
+    cd backend && python test/bench_static_content.py [requests_per_endpoint]
+
+"before" are the previous handlers, which re-opened and re-parsed
+topics.json / quotes.json on every request, mounted on the app under
+/before so both go through the same middleware; "after" are the app's own
+routes, served from the in-memory content registry.
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+from fastapi import APIRouter, HTTPException  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+from content_registry import QUOTES_PATH, TOPICS_PATH  # noqa: E402
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+PATHS = ["/syllabus/3", "/quotes/", "/quotes/by-topic/math", "/quotes/random"]
+
+
+def _load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+before = APIRouter(prefix="/before")
+
+
+@before.get("/syllabus/{class_num}")
+def old_syllabus(class_num: int):
+    topics = _load(TOPICS_PATH).get(f"class_{class_num}")
+    if topics is None:
+        raise HTTPException(status_code=404)
+    return {"class": class_num, "topics": topics}
+
+
+@before.get("/quotes/")
+async def old_all_quotes():
+    return {"quotes": _load(QUOTES_PATH)}
+
+
+@before.get("/quotes/by-topic/{topic}")
+async def old_quotes_by_topic(topic: str):
+    return {"quotes": [q for q in _load(QUOTES_PATH) if q.get("topic", "").lower() == topic.lower()]}
+
+
+@before.get("/quotes/random")
+async def old_random_quote():
+    return random.choice(_load(QUOTES_PATH))
+
+
+def measure(client, path):
+    client.get(path)  # warm up
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        assert client.get(path).status_code == 200
+    return REQUESTS / (time.perf_counter() - start)
+
+
+def run():
+    print(f"{'endpoint':<24}{'before rps':>12}{'after rps':>12}{'speedup':>10}")
+    main.app.include_router(before)
+    with TestClient(main.app) as client:
+        for path in PATHS:
+            rps_before = measure(client, "/before" + path)
+            rps_after = measure(client, path)
+            print(f"{path:<24}{rps_before:>12.0f}{rps_after:>12.0f}{rps_after / rps_before:>9.1f}x")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,106 @@
+"""Benchmark: teacher/video grouping endpoints with thousands of videos per class.
+
+Runs in-process against a throwaway SQLite file (no server needed):
+
+    cd backend && python test/bench_teachers_by_class.py [videos_per_class] [teachers]
+
+Reports latency and SQL statement counts for /teachers/class/{class_level},
+/teachers/search and /teachers/videos/trending, and compares the class
+listing against the previous per-teacher rescan of the full video list.
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+import main  # noqa: E402
+from database import SessionLocal, engine  # noqa: E402
+from models.models import Teacher, Video  # noqa: E402
+from trending import trending_board  # noqa: E402
+
+VIDEOS_PER_CLASS = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+TEACHERS = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+REPEAT = 20
+
+
+def seed():
+    db = SessionLocal()
+    teachers = [Teacher(username=f"bench_t{i}", password="x", name=f"Teacher {i}") for i in range(TEACHERS)]
+    db.add_all(teachers)
+    db.commit()
+    now = datetime.utcnow().isoformat()
+    db.add_all([
+        Video(
+            title=f"Lesson {i} fractions" if i % 10 == 0 else f"Lesson {i}",
+            description="practice problems",
+            class_level="class_6",
+            subject="Math",
+            file_path=f"/uploads/videos/{i}.mp4",
+            teacher_id=teachers[i % TEACHERS].id,
+            upload_date=now,
+            view_count=i % 97,
+        )
+        for i in range(VIDEOS_PER_CLASS)
+    ])
+    db.commit()
+    trending_board.load(db)
+    db.close()
+
+
+def previous_teachers_by_class(db, class_level):
+    """The pre-change implementation, kept here for comparison."""
+    videos = db.query(Video).filter(Video.class_level == class_level).all()
+    teacher_ids = list(set([v.teacher_id for v in videos]))
+    teachers = db.query(Teacher).filter(Teacher.id.in_(teacher_ids)).all()
+    return [
+        {"id": t.id, "video_count": len([v for v in videos if v.teacher_id == t.id])}
+        for t in teachers
+    ]
+
+
+def measure(label, fn):
+    statements = []
+
+    def count(*_args):
+        statements.append(1)
+
+    fn()  # warm up
+    event.listen(engine, "before_cursor_execute", count)
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        fn()
+    elapsed = (time.perf_counter() - start) / REPEAT
+    event.remove(engine, "before_cursor_execute", count)
+    print(f"{label:<42} {elapsed * 1000:9.2f} ms/req  {len(statements) / REPEAT:6.1f} statements/req")
+
+
+def main_bench():
+    seed()
+    print(f"{VIDEOS_PER_CLASS} videos in class_6 across {TEACHERS} teachers\n")
+    with TestClient(main.app) as client:
+        def old():
+            db = SessionLocal()
+            try:
+                previous_teachers_by_class(db, "class_6")
+            finally:
+                db.close()
+
+        measure("previous /teachers/class (rescan)", old)
+        measure("GET /teachers/class/class_6", lambda: client.get("/teachers/class/class_6"))
+        measure("GET /teachers/search?query=fractions", lambda: client.get(
+            "/teachers/search", params={"query": "fractions", "class_level": "class_6", "limit": 100}))
+        measure("GET /teachers/videos/trending?limit=50", lambda: client.get(
+            "/teachers/videos/trending", params={"limit": 50}))
+
+
+if __name__ == "__main__":
+    main_bench()
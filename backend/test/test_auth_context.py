@@ -0,0 +1,52 @@
+import time
+
+import auth_context
+from auth import create_access_token, get_user_class_number_by_username
+
+
+def _signup(client, username="kid", class_level="class_2"):
+    r = client.post("/users/signup", json={"username": username, "password": "x", "class_level": class_level})
+    assert r.status_code == 200
+    return {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+
+
+def test_user_is_loaded_once_and_reused_across_requests(client, count_queries):
+    headers = _signup(client)
+    client.headers["Accept-Encoding"] = "identity"
+
+    assert client.get("/topics/", headers=headers).status_code == 200
+    misses = auth_context._token_misses.value
+    with count_queries() as q:
+        r = client.get("/topics/", headers=headers)
+    assert r.status_code == 200
+    assert not any("FROM users" in s for s in q.statements)
+    assert auth_context._token_misses.value == misses  # token not decoded again
+
+
+def test_update_invalidates_cached_class(client, db):
+    headers = _signup(client)
+    topics_class_2 = client.get("/topics/", headers=headers).json()
+
+    r = client.put("/users/update", json={"class_level": "class_3"}, headers=headers)
+    assert r.status_code == 200
+    topics_class_3 = client.get("/topics/", headers=headers).json()
+    assert topics_class_3 != topics_class_2
+    assert get_user_class_number_by_username("kid", db) == 3
+
+
+def test_cached_token_still_expires(client):
+    headers = _signup(client)
+    token = headers["Authorization"].split()[1]
+    assert client.get("/users/me", headers=headers).status_code == 200
+
+    auth_context.token_cache.set(token, ("kid", time.time() - 1))
+    r = client.get("/users/me", headers=headers)
+    assert r.status_code == 401 and r.json()["detail"] == "Token expired"
+    assert client.get("/users/me", headers={"Authorization": "Bearer nonsense"}).json()["detail"] == "Invalid token"
+
+
+def test_class_resolution():
+    assert auth_context._resolve_class("class_7", 3) == ("class_7", 7)
+    assert auth_context._resolve_class("Grade 4", 3) == ("class_4", 4)
+    assert auth_context._resolve_class(None, 6) == ("class_6", 6)
+    assert auth_context._resolve_class("", None) == ("class_5", 5)
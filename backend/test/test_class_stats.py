@@ -0,0 +1,74 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import class_stats
+import llm
+import queries
+import rate_limit
+from auth import create_access_token
+from models.models import ClassScoreBucket, ClassStats, User
+
+
+def _tables(db):
+    stats = {r.class_key: (r.student_count, r.score_sum, r.total_attempts_sum, r.correct_attempts_sum, r.max_score)
+             for r in db.query(ClassStats).all()}
+    hist = {(r.class_key, r.bucket): r.count for r in db.query(ClassScoreBucket).all()}
+    return stats, hist
+
+
+def test_incremental_stats_match_live_aggregates_and_rebuild(client, db, answer):
+    for i in range(4):
+        r = client.post("/users/signup", json={"username": f"s{i}", "password": "x", "class_level": "class_6"})
+        assert r.status_code == 200
+
+    for _ in range(3):
+        answer("s0", True)
+    answer("s1", True)
+    answer("s1", False)
+    answer("s2", False)  # clamped at 0.0
+
+    # move s3 to another class
+    token = create_access_token({"sub": "s3"})
+    r = client.put("/users/update", json={"class_level": "class_7"}, headers={"Authorization": f"Bearer {token}"})
+    assert r.status_code == 200
+
+    db.expire_all()
+    for username in ("s0", "s1", "s2", "s3"):
+        student = db.query(User).filter(User.username == username).one()
+        assert class_stats.comparison(db, student) == queries.class_comparison(db, student)
+
+    s1 = db.query(User).filter(User.username == "s1").one()
+    assert s1.score == 0.75
+    assert class_stats.comparison(db, s1)["rank"] == 2
+    assert class_stats.comparison(db, s1)["top_score"] == 3.0
+
+    incremental = _tables(db)
+    class_stats.rebuild_class_stats(db)
+    assert _tables(db) == incremental
+
+
+def test_concurrent_checks_keep_stats_consistent(client, db, monkeypatch):
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr(rate_limit, "llm_admission", rate_limit.AdmissionControl(max_concurrent=64))
+    monkeypatch.setattr(llm, "get_chat_title", lambda text: "title")
+    monkeypatch.setattr(llm, "generate_hint", lambda **kwargs: "hint")
+    monkeypatch.setattr(llm, "check_answer", lambda conversation=None, **kwargs: {
+        "final": True, "correct": conversation[-1]["content"] == "right"})
+    for username in ("c0", "c1"):
+        assert client.post("/users/signup", json={"username": username, "password": "x", "class_level": "class_6"}).status_code == 200
+
+    def check(i):
+        username, text = f"c{i % 2}", "right" if i % 3 else "wrong"
+        r = client.post(f"/chat/send/check/{username}", json={"text": text, "sender": "user", "session_id": f"{username}-{i}"})
+        return r.status_code
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert set(pool.map(check, range(24))) == {200}
+
+    db.expire_all()
+    for username in ("c0", "c1"):
+        student = db.query(User).filter(User.username == username).one()
+        assert student.total_attempts == 12 and student.correct_attempts == 8
+        assert student.max_streak >= student.current_streak
+    incremental = _tables(db)
+    class_stats.rebuild_class_stats(db)
+    assert _tables(db) == incremental
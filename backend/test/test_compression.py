@@ -0,0 +1,44 @@
+import gzip
+
+from compression import negotiate
+from content_registry import topics_content
+
+
+def test_negotiate():
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("gzip;q=0, identity") is None
+    assert negotiate("*") in ("br", "gzip")
+    assert negotiate("") is None
+
+
+def test_large_json_is_gzipped_and_small_passes_through(client):
+    r = client.get("/quotes/", headers={"Accept-Encoding": "gzip"})
+    assert r.status_code == 200
+    assert r.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in r.headers["vary"]
+    assert r.json()["quotes"]
+
+    raw = client.get("/quotes/", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in raw.headers
+    assert raw.content == r.content  # httpx decodes the gzip body
+
+    small = client.get("/quotes/random", headers={"Accept-Encoding": "gzip"})
+    assert small.status_code == 200 and "content-encoding" not in small.headers
+
+
+def test_encoded_etag_round_trips_to_304(client):
+    r = client.get("/syllabus/3", headers={"Accept-Encoding": "gzip"})
+    version_tag = f'"t-{topics_content.snapshot().version}'
+    assert r.headers["etag"] == f'{version_tag}-gzip"'
+
+    again = client.get("/syllabus/3", headers={"Accept-Encoding": "gzip", "If-None-Match": r.headers["etag"]})
+    assert again.status_code == 304
+    assert again.headers["etag"] == r.headers["etag"]
+
+
+def test_compress_is_deterministic():
+    from compression import compress
+
+    body = b'{"a": 1}' * 500
+    assert compress(body, "gzip") == compress(body, "gzip")
+    assert gzip.decompress(compress(body, "gzip")) == body
@@ -0,0 +1,41 @@
+import json
+
+from content_registry import StaticContent, class_topics
+
+
+def test_reloads_changed_file_and_keeps_last_good_copy(tmp_path):
+    path = tmp_path / "quotes.json"
+    path.write_text(json.dumps([{"quote": "a", "topic": "Math"}]))
+    now = [0.0]
+    content = StaticContent(path, lambda data: len(data), check_interval=5, clock=lambda: now[0])
+
+    first = content.snapshot()
+    assert first.data[0]["quote"] == "a" and first.index == 1
+
+    path.write_text(json.dumps([{"quote": "a"}, {"quote": "b"}]))
+    assert content.snapshot() is first  # not re-checked before the interval
+
+    now[0] = 5.0
+    second = content.snapshot()
+    assert second.index == 2 and second.version != first.version
+
+    path.write_text("[{broken")
+    now[0] = 10.0
+    assert content.snapshot() is second
+
+    path.unlink()
+    now[0] = 15.0
+    assert content.snapshot() is second
+
+
+def test_endpoints_are_served_from_the_registry(client):
+    r = client.get("/syllabus/3")
+    assert r.status_code == 200 and r.json()["topics"] == class_topics(3)
+    assert client.get("/syllabus/42").status_code == 404
+
+    r = client.get("/quotes/by-topic/MATH")
+    assert r.status_code == 200
+    assert {q["topic"] for q in r.json()["quotes"]} == {"math"}
+    assert client.get("/quotes/by-topic/nothing").status_code == 404
+    assert len(client.get("/quotes/").json()["quotes"]) > 300
+    assert class_topics("class_2") == class_topics(2)
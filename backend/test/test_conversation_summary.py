@@ -0,0 +1,77 @@
+from conversation_summary import ConversationSummarizer, format_turns, recent_messages
+from database import SessionLocal
+from llm import LLMUnavailable
+from models.models import Chat, Message
+from prompt_budget import count_tokens
+
+
+def _chat_with_turns(db, turns: int) -> Chat:
+    chat = Chat(title="long division", session_id="s1")
+    db.add(chat)
+    db.commit()
+    _add_turns(db, chat, 0, turns)
+    return chat
+
+
+def _add_turns(db, chat, start: int, count: int):
+    for i in range(start, start + count):
+        db.add(Message(text=f"turn {i}: 144 / 12, carry the remainder", sender="user" if i % 2 == 0 else "bot", chat_id=chat.id))
+    db.commit()
+
+
+def _summarizer(calls):
+    def summarize(previous, turns):
+        calls.append((previous, turns))
+        return f"summary #{len(calls)} ({turns.count(chr(10)) + 1} turns)"
+
+    return ConversationSummarizer(SessionLocal, summarize=summarize, every=6, keep_recent=4, enabled=True)
+
+
+def test_older_turns_fold_into_summary_and_prompt_context_stays_flat(db):
+    calls = []
+    summarizer = _summarizer(calls)
+    chat = _chat_with_turns(db, 9)
+
+    summarizer.maybe_schedule(db, chat)
+    assert summarizer.run_pending() == 0  # 9 messages: below every + keep_recent
+
+    context_sizes = []
+    for start in range(9, 60, 2):
+        _add_turns(db, chat, start, 2)
+        summarizer.maybe_schedule(db, chat)
+        summarizer.run_pending()
+        db.refresh(chat)
+        context_sizes.append(count_tokens(format_turns(recent_messages(db, chat, 10))))
+
+    assert len(calls) >= 5
+    assert calls[0][0] is None and calls[1][0] == "summary #1 (7 turns)"  # each update builds on the last one
+    assert chat.summary.startswith(f"summary #{len(calls)}")
+    unsummarized = db.query(Message).filter(Message.chat_id == chat.id, Message.id > chat.summary_upto_id).count()
+    assert 4 <= unsummarized < 10
+    assert max(context_sizes[5:]) <= max(context_sizes[:5])  # per-turn context does not grow with the chat
+
+
+def test_concurrent_summaries_do_not_overwrite_each_other(db):
+    chat = _chat_with_turns(db, 12)
+    first, second = _summarizer([]), _summarizer([])
+
+    def racing(previous, turns):
+        second.summarize_chat(chat.id)  # another worker finishes in the meantime
+        return "stale summary"
+
+    first._summarize = racing
+    assert first.summarize_chat(chat.id) is False
+    db.refresh(chat)
+    assert chat.summary == "summary #1 (8 turns)"
+
+
+def test_llm_failure_keeps_previous_summary(db):
+    chat = _chat_with_turns(db, 12)
+
+    def unavailable(previous, turns):
+        raise LLMUnavailable("provider down", retry_after=5)
+
+    summarizer = ConversationSummarizer(SessionLocal, summarize=unavailable, every=6, keep_recent=4, enabled=True)
+    assert summarizer.summarize_chat(chat.id) is False
+    db.refresh(chat)
+    assert chat.summary is None and chat.summary_upto_id is None
@@ -0,0 +1,121 @@
+import socket
+import time
+from email import message_from_bytes
+
+import pytest
+
+import email_outbox
+import routers.parent
+from auth import create_access_token
+from email_outbox import EmailSender, SmtpSettings, enqueue_email
+from models.models import EmailOutbox, Parent
+from report_cache import report_cache
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+
+class SinkHandler:
+    def __init__(self):
+        self.messages = []
+        self.sessions = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(message_from_bytes(envelope.content))
+        return "250 OK"
+
+
+@pytest.fixture
+def smtp_sink():
+    handler = SinkHandler()
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        handler.settings = SmtpSettings(host="127.0.0.1", port=port, from_email="reports@example.com", starttls=False)
+        yield handler
+    finally:
+        controller.stop()
+
+
+def test_batch_is_sent_over_one_connection(db, smtp_sink):
+    for i in range(5):
+        enqueue_email(db, f"parent{i}@example.com", f"Report {i}", "body", b"%PDF-1.4 fake", "report.pdf", commit=False)
+    db.commit()
+
+    sender = EmailSender(settings_factory=lambda: smtp_sink.settings, batch_size=10)
+    assert sender.send_pending() == 5
+
+    assert smtp_sink.sessions == 1
+    assert sorted(m["To"] for m in smtp_sink.messages) == [f"parent{i}@example.com" for i in range(5)]
+    attachment = smtp_sink.messages[0].get_payload()[1]
+    assert attachment.get_filename() == "report.pdf"
+    assert attachment.get_payload(decode=True) == b"%PDF-1.4 fake"
+
+    db.expire_all()
+    assert {r.status for r in db.query(EmailOutbox).all()} == {"sent"}
+    assert sender.send_pending() == 0
+
+
+def test_failed_connection_backs_off_then_gives_up(db):
+    enqueue_email(db, "parent@example.com", "Report", "body")
+    now = [1000.0]
+    unreachable = SmtpSettings(host="127.0.0.1", port=1, starttls=False, timeout=1)
+    sender = EmailSender(settings_factory=lambda: unreachable, max_attempts=3,
+                         retry_base_seconds=10, clock=lambda: now[0])
+
+    assert sender.send_pending() == 0
+    row = db.query(EmailOutbox).one()
+    assert (row.status, row.attempts) == ("pending", 1)
+    assert 1005.0 <= row.next_attempt_at <= 1010.0
+    assert "ConnectionRefusedError" in row.last_error
+
+    assert sender.send_pending() == 0  # not due yet
+    db.refresh(row)
+    assert row.attempts == 1
+
+    for _ in range(2):
+        now[0] += 100
+        sender.send_pending()
+    db.refresh(row)
+    assert (row.status, row.attempts) == ("failed", 3)
+
+
+def test_expired_send_lease_is_retried(db, smtp_sink):
+    row = enqueue_email(db, "parent@example.com", "Report", "body")
+    row.status, row.next_attempt_at = "sending", time.time() - 1  # sender died mid-batch
+    db.commit()
+
+    assert EmailSender(settings_factory=lambda: smtp_sink.settings).send_pending() == 1
+    assert len(smtp_sink.messages) == 1
+
+
+def test_email_endpoint_queues_and_reports_status(client, db, monkeypatch, smtp_sink, report_child):
+    report_cache.clear()
+    monkeypatch.setattr(routers.parent, "generate_parent_report", lambda child, comparison: "Doing well.")
+    monkeypatch.setattr(email_outbox.email_sender, "settings_factory", lambda: smtp_sink.settings)
+
+    assert client.post("/users/signup", json={"username": "kid", "password": "x"}).status_code == 200
+    assert client.post("/parents/register", json={"username": "mum", "password": "x", "student_username": "kid"}).status_code == 200
+    db.query(Parent).filter_by(username="mum").update({"email": "mum@example.com"})
+    db.commit()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'mum'})}"}
+
+    r = client.post("/parents/report/email", json={"child": report_child}, headers=headers)
+    assert r.status_code == 202
+    job_id = r.json()["job_id"]
+
+    deadline = time.time() + 5
+    while client.get(f"/parents/report/email/{job_id}", headers=headers).json()["status"] != "sent":
+        assert time.time() < deadline
+        time.sleep(0.05)
+
+    assert smtp_sink.messages[0]["To"] == "mum@example.com"
+    other = {"Authorization": f"Bearer {create_access_token({'sub': 'someone-else'})}"}
+    assert client.get(f"/parents/report/email/{job_id}", headers=other).status_code == 404
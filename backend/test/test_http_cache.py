@@ -0,0 +1,44 @@
+from auth import create_access_token
+from content_registry import topics_content
+
+
+def test_version_etag_and_conditional_get(client):
+    client.headers["Accept-Encoding"] = "identity"  # compressed ETags are covered in test_compression.py
+    r = client.get("/syllabus/3")
+    etag = r.headers["etag"]
+    assert etag == f'"t-{topics_content.snapshot().version}"'
+    assert r.headers["cache-control"] == "public, max-age=3600"
+
+    r = client.get("/syllabus/3", headers={"If-None-Match": etag})
+    assert r.status_code == 304 and r.content == b""
+    assert r.headers["etag"] == etag
+    assert client.get("/syllabus/3", headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+
+    stale = client.get("/syllabus/3", headers={"If-None-Match": '"t-old"'})
+    assert stale.status_code == 200 and stale.json()["class"] == 3
+
+    missing = client.get("/syllabus/42")
+    assert missing.status_code == 404 and "etag" not in missing.headers
+    # The version tag covers the file, not the URL: conditional requests still get the route's errors
+    assert client.get("/syllabus/42", headers={"If-None-Match": "*"}).status_code == 404
+    assert client.get("/syllabus/42", headers={"If-None-Match": etag}).status_code == 404
+    assert client.head("/syllabus/3", headers={"If-None-Match": etag}).status_code == 405
+    # A URL not fetched before runs the route once, then answers 304
+    assert client.get("/syllabus/4", headers={"If-None-Match": "*"}).status_code == 304
+
+    quotes = client.get("/quotes/by-topic/math")
+    assert client.get("/quotes/by-topic/math", headers={"If-None-Match": quotes.headers["etag"]}).status_code == 304
+    assert "etag" not in client.get("/quotes/random").headers
+
+
+def test_per_user_topics_use_private_body_etag(client):
+    assert client.post("/users/signup", json={"username": "kid", "password": "x", "class_level": "class_2"}).status_code == 200
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'kid'})}"}
+
+    r = client.get("/topics/", headers=headers)
+    assert r.status_code == 200
+    assert r.headers["cache-control"] == "private, max-age=300"
+    assert "Authorization" in r.headers["vary"]
+
+    again = client.get("/topics/", headers={**headers, "If-None-Match": r.headers["etag"]})
+    assert again.status_code == 304 and again.content == b""
@@ -0,0 +1,103 @@
+import random
+
+import class_stats
+from auth import create_access_token
+from leaderboard import ClassLeaderboard, Leaderboards, leaderboards
+from models.models import User
+
+
+def _brute_rank(scores, score):
+    return sum(1 for s in scores.values() if s > score) + 1
+
+
+def test_order_statistics_match_brute_force():
+    rng = random.Random(7)
+    board = ClassLeaderboard()
+    scores = {}
+    for _ in range(2000):
+        name = f"u{rng.randrange(300)}"
+        if rng.random() < 0.15:
+            board.remove(name)
+            scores.pop(name, None)
+        else:
+            score = rng.randrange(0, 4000) * 0.25  # forces the tree to grow
+            board.add(name, score)
+            scores[name] = score
+
+    assert len(board) == len(scores)
+    for score in (0.0, 10.0, 500.25, 999.75, 2000.0):
+        assert board.rank(score) == _brute_rank(scores, score)
+        higher = _brute_rank(scores, score) - 1
+        assert board.percentile(score) == 100.0 * (1.0 - higher / len(scores))
+
+    ordered = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))
+    top = board.top(25)
+    assert [(e["username"], e["score"]) for e in top] == ordered[:25]
+    assert all(e["rank"] == _brute_rank(scores, e["score"]) for e in top)
+
+    names = [n for n, _ in ordered]
+    for name in (names[0], names[len(names) // 2], names[-1]):
+        i = names.index(name)
+        around = board.around(name, 3)
+        assert [e["username"] for e in around] == names[max(0, i - 3): i + 4]
+
+
+def test_endpoints_follow_committed_score_changes(client, db, answer):
+    for i in range(5):
+        r = client.post("/users/signup", json={"username": f"s{i}", "password": "x", "class_level": "class_6"})
+        assert r.status_code == 200
+    for _ in range(3):
+        answer("s3", True)
+    answer("s1", True)
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 's1'})}"}
+    body = client.get("/users/leaderboard?limit=3", headers=headers).json()
+    assert body["class_key"] == "class_level:class_6"
+    assert body["class_count"] == 5
+    assert body["my_rank"] == 2
+    assert [(e["rank"], e["username"], e["score"]) for e in body["entries"]] == [
+        (1, "s3", 3.0), (2, "s1", 1.0), (3, "s0", 0.0),
+    ]
+    assert body["entries"][0]["name"] == "s3"
+
+    near = client.get("/users/leaderboard/near-me?radius=1", headers=headers).json()
+    assert [e["username"] for e in near["entries"]] == ["s3", "s1", "s0"]
+
+    # A rolled-back change never reaches the index
+    student = db.query(User).filter(User.username == "s4").one()
+    before = class_stats.snapshot(student)
+    student.score = 50.0
+    class_stats.apply_user_change(db, before, class_stats.snapshot(student))
+    db.rollback()
+    assert leaderboards.board("class_level:class_6").rank(0.0) == 3
+
+    # Rank in /parents/stats agrees with the index
+    assert class_stats.comparison(db, db.query(User).filter(User.username == "s1").one())["rank"] == 2
+
+
+class _ScanningDb:
+    """Stands in for the session during rebuild(); runs `during()` halfway through the users scan."""
+
+    def __init__(self, rows, during):
+        self.rows = rows
+        self.during = during
+
+    def query(self, *columns):
+        yield self.rows[0]
+        self.during()
+        yield from self.rows[1:]
+
+
+def test_changes_committed_during_rebuild_are_kept():
+    board = Leaderboards()
+    board.rebuild(_ScanningDb([("a", "class_6", 6, 1.0), ("b", "class_6", 6, 2.0)], lambda: None))
+
+    def commit_during_scan():
+        board.apply({"username": "a", "class_level": "class_6", "level": 6, "score": 1.0},
+                    {"username": "a", "class_level": "class_6", "level": 6, "score": 5.0})
+
+    # the scan read a's old score before the change committed
+    board.rebuild(_ScanningDb([("a", "class_6", 6, 1.0), ("b", "class_6", 6, 2.0)], commit_during_scan))
+    assert [e["username"] for e in board.board("class_level:class_6").top(2)] == ["a", "b"]
+    assert board.board("class_level:class_6").rank(5.0) == 1
+    assert not board._recorders
@@ -0,0 +1,143 @@
+import litellm
+import pytest
+
+import llm
+import local_grader
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _reply(text):
+    return {"choices": [{"message": {"content": text}}]}
+
+
+def _timeout():
+    return litellm.Timeout(message="slow", model=llm.MODEL_NAME, llm_provider="gemini")
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    """Scripted llm.completion: each call pops the next reply (a string) or error (an exception)."""
+    script, calls = [], []
+
+    def fake_completion(**kwargs):
+        calls.append(kwargs)
+        outcome = script.pop(0)
+        if callable(outcome):
+            outcome = outcome()
+        if isinstance(outcome, Exception):
+            raise outcome
+        return _reply(outcome)
+
+    monkeypatch.setattr(llm, "completion", fake_completion)
+    monkeypatch.setattr(llm, "LLM_RETRY_BASE_SECONDS", 0.0)
+    monkeypatch.setattr(llm, "_breakers", {})
+    # One model per task and no hedging, so every call hits the scripted provider in order
+    monkeypatch.setattr(llm.model_router, "routes", {task: [llm.MODEL_NAME] for task in llm.LLM_ROUTES})
+    monkeypatch.setattr(llm.model_router, "hedge_tasks", set())
+    monkeypatch.setattr(llm.model_router, "_stats", {})
+    llm._hint_cache.clear()
+    return script, calls
+
+
+def test_breaker_opens_then_probes_once():
+    clock = FakeClock()
+    breaker = CircuitBreaker("m", failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+    assert breaker.retry_after() == 10
+
+    clock.now = 10
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() and not breaker.allow()  # a single probe
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_transient_errors_are_retried_with_a_timeout(provider):
+    script, calls = provider
+    script.extend([_timeout(), "Think about tens first."])
+    assert llm.generate_hint(question="What is 30 + 40?", user_class=3) == "Think about tens first."
+    assert len(calls) == 2
+    assert all(0 < c["timeout"] <= llm.LLM_TIMEOUT_SECONDS for c in calls)
+
+
+def test_failover_only_gets_the_remaining_deadline(provider, monkeypatch):
+    script, calls = provider
+    clock = FakeClock()
+    monkeypatch.setattr(llm.time, "monotonic", clock)
+    monkeypatch.setattr(llm.model_router, "clock", clock)
+    monkeypatch.setattr(llm.model_router, "routes", {"hint": [llm.MODEL_NAME, "gemini/gemini-2.0-flash"]})
+
+    def slow_failure():
+        clock.now += 20
+        return ValueError("malformed request")
+
+    script.extend([slow_failure, "Count on from 30."])
+    assert llm.generate_hint(question="What is 30 + 40?", user_class=3) == "Count on from 30."
+    assert calls[1]["model"] == "gemini/gemini-2.0-flash"
+    assert calls[1]["timeout"] == pytest.approx(llm.LLM_DEADLINE_SECONDS - 20)
+
+
+def test_open_breaker_serves_cached_then_canned_hint(provider, monkeypatch):
+    script, calls = provider
+    monkeypatch.setattr(llm, "LLM_MAX_RETRIES", 0)
+    script.append("Count on from 30.")
+    assert llm.generate_hint(question="What is 30 + 40?", user_class=3) == "Count on from 30."
+
+    script.extend(_timeout() for _ in range(llm.LLM_BREAKER_FAILURES))
+    for _ in range(llm.LLM_BREAKER_FAILURES):
+        llm.generate_hint(question="Something new", user_class=3)
+    assert llm.breaker_for(llm.MODEL_NAME).state == OPEN
+
+    made = len(calls)
+    assert llm.generate_hint(question="What is 30 + 40?", user_class=3) == "Count on from 30."
+    assert llm.generate_hint(question="What is 2 + 2?", user_class=3) == llm.FALLBACK_HINT
+    assert llm.get_chat_title("Help me with long division please") == "Help me with long..."
+    assert len(calls) == made  # no provider calls while open
+
+
+def test_check_answer_falls_back_to_local_grader(provider, monkeypatch):
+    script, _ = provider
+    monkeypatch.setattr(llm, "LLM_MAX_RETRIES", 0)
+    script.append(_timeout())
+    verdict = llm.check_answer(conversation=[
+        {"role": "assistant", "content": "What is 12 x 7?"},
+        {"role": "user", "content": "84!"},
+    ])
+    assert verdict["final"] is True and verdict["correct"] is True
+
+
+@pytest.mark.parametrize("question, answer, expected", [
+    ("What is 12 × 7?", "84", (True, True)),
+    ("Solve 100 ÷ 8", "12.5", (True, True)),
+    ("What is 9 - 4?", "6", (False, False)),  # wrong answers are left to the LLM grader
+    ("What is 12 x 7?", "12 x 7 = 84", (False, False)),
+    ("What is 12 x 7?", "7 times 12 is 84", (False, False)),
+    ("What is 12 x 7?", "I think it's 84", (False, False)),
+    ("How many cm is 12 x 7?", "84 cm.", (True, True)),
+    ("What is 3/4 of 12?", "9", (False, False)),
+    ("What is 1,000 + 250?", "1250", (False, False)),
+    ("What is 1,000 + 250?", "250", (False, False)),
+    ("What is 3/4 + 1/4?", "1", (True, True)),
+    ("Which is bigger, 3 or 5?", "5", (False, False)),
+    ("What is 2 + 3? And 4 + 5?", "5", (False, False)),
+    ("What is 6 + 1?", "seven", (False, False)),
+])
+def test_local_grader(question, answer, expected):
+    verdict = local_grader.grade([{"role": "assistant", "content": question}, {"role": "user", "content": answer}])
+    assert (verdict["final"], verdict["correct"]) == expected
@@ -0,0 +1,108 @@
+import threading
+
+import pytest
+
+import model_router
+from model_router import ModelRouter, NoHealthyModel
+
+
+class FakeBackends:
+    """call(model, messages): advances a fake clock by the model's latency, or raises if it is failing."""
+
+    def __init__(self, latency: dict):
+        self.latency = dict(latency)
+        self.failing = set()
+        self.calls = []
+        self.deadlines = []
+        self.now = 0.0
+
+    def clock(self):
+        return self.now
+
+    def __call__(self, model, messages, **kwargs):
+        self.calls.append(model)
+        self.deadlines.append(kwargs.get("deadline"))
+        self.now += self.latency[model]
+        if model in self.failing:
+            raise RuntimeError(f"{model} down")
+        return f"{model} reply"
+
+
+def _router(backends, **kwargs):
+    return ModelRouter({"hint": ["big", "small"]}, call=backends, clock=backends.clock, default_latency=2.0, **kwargs)
+
+
+def test_routes_to_fastest_model_once_measured():
+    backends = FakeBackends({"big": 3.0, "small": 0.5})
+    router = _router(backends)
+    assert router.complete("hint", []) == "big reply"  # both unmeasured: rank order
+    assert router.candidates("hint") == ["small", "big"]  # big measured 3.0 > small's assumed 2.0
+    assert router.complete("hint", []) == "small reply"
+    assert router.candidates("hint") == ["small", "big"]
+
+
+def test_fails_over_and_skips_unhealthy_models():
+    backends = FakeBackends({"big": 1.0, "small": 1.0})
+    backends.failing.add("big")
+    router = _router(backends, max_error_rate=0.5)
+    assert router.complete("hint", []) == "small reply"
+    assert backends.calls == ["big", "small"]
+    assert router.candidates("hint") == ["small"]  # big: 100% errors
+
+    open_breakers = {"small"}
+    router.is_available = lambda model: model not in open_breakers
+    assert router.candidates("hint") == ["big"]  # unhealthy but still better than nothing
+    open_breakers.add("big")
+    with pytest.raises(NoHealthyModel):
+        router.complete("hint", [])
+
+
+def test_failover_shares_the_calls_deadline():
+    backends = FakeBackends({"big": 10.0, "small": 1.0})
+    backends.failing.add("big")
+    router = _router(backends)
+    assert router.complete("hint", [], deadline=25.0) == "small reply"
+    assert backends.deadlines == [25.0, 25.0]  # the failover gets what is left, not a fresh budget
+
+    backends.latency["big"] = 30.0
+    router = _router(backends)
+    with pytest.raises(RuntimeError):
+        router.complete("hint", [], deadline=backends.now + 25.0)
+    assert backends.calls[-1] == "big"  # out of time: no failover
+
+
+def test_hedged_request_wins_the_tail():
+    backends = FakeBackends({"big": 3.0, "small": 0.5})
+    release = threading.Event()
+
+    def call(model, messages):
+        if model == "big":
+            release.wait(10)  # stuck in the tail until the test lets it go
+        return backends(model, messages)
+
+    router = ModelRouter({"hint": ["big", "small"]}, call=call, clock=backends.clock, hedge_tasks={"hint"},
+                         hedge_min_delay=0.01, default_latency=0.01)
+    wins = model_router._hedge_wins.value
+    try:
+        assert router.complete("hint", []) == "small reply"
+        assert backends.calls == ["small"]  # answered while big was still blocked
+        assert model_router._hedge_wins.value == wins + 1
+        assert router.stats("small").latency() == 0.5
+    finally:
+        release.set()
+        router.shutdown()
+
+
+def test_no_hedge_when_primary_is_fast():
+    calls = []
+
+    def call(model, messages):
+        calls.append(model)
+        return model
+
+    router = ModelRouter({"hint": ["big", "small"]}, call=call, hedge_tasks={"hint"}, hedge_min_delay=1.0)
+    try:
+        assert router.complete("hint", []) == "big"
+        assert calls == ["big"]
+    finally:
+        router.shutdown()
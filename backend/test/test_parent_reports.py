@@ -0,0 +1,43 @@
+import routers.parent
+from auth import create_access_token
+from models.models import Parent
+from report_cache import report_cache
+
+
+def _setup(client):
+    assert client.post("/users/signup", json={"username": "kid", "password": "x", "name": "Kid", "class_level": "class_6"}).status_code == 200
+    assert client.post("/users/signup", json={"username": "other", "password": "x", "class_level": "class_6"}).status_code == 200
+    assert client.post("/parents/register", json={"username": "mum", "password": "x", "student_username": "kid"}).status_code == 200
+    return {"Authorization": f"Bearer {create_access_token({'sub': 'mum'})}"}
+
+
+def test_report_without_body_reads_stats_server_side(client, monkeypatch, count_queries):
+    report_cache.clear()
+    seen = []
+    monkeypatch.setattr(routers.parent, "generate_parent_report",
+                        lambda child, comparison: seen.append((child, comparison)) or "Doing well.")
+    headers = _setup(client)
+
+    stats = client.get("/parents/stats", headers=headers).json()
+    with count_queries() as q:
+        r = client.post("/parents/report/pdf", headers=headers)
+    assert r.status_code == 200 and r.content.startswith(b"%PDF")
+    assert r.headers["content-disposition"] == 'attachment; filename="report_Kid.pdf"'
+    assert q.count <= 2  # parent + child in one statement, cached class totals
+
+    assert seen == [(stats["child"], stats["comparison"])]
+    assert seen[0][1]["class_count"] == 2
+
+    # Posting the same stats the dashboard showed hits the same cache entry
+    r = client.post("/parents/report", json=stats, headers=headers)
+    assert r.json() == {"report": "Doing well."}
+    assert len(seen) == 1
+
+
+def test_report_for_missing_child_is_404(client, db, monkeypatch):
+    monkeypatch.setattr(routers.parent, "generate_parent_report", lambda child, comparison: "x")
+    headers = _setup(client)
+    db.query(Parent).filter_by(username="mum").update({"student_username": "gone"})
+    db.commit()
+    assert client.post("/parents/report", headers=headers).status_code == 404
+    assert client.post("/parents/report", json={}, headers=headers).status_code == 404
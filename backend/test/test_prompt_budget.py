@@ -0,0 +1,71 @@
+import pytest
+
+import llm
+import prompt_budget
+from prompt_budget import Section, count_tokens, fit_messages, pack, truncate
+
+LINES = "\n".join(f"User: step {i} of the long division, carry the remainder" for i in range(40))
+
+
+def test_truncate_keeps_whole_lines_from_the_right_end():
+    head = truncate(LINES, 60)
+    assert count_tokens(head) <= 60
+    assert head.startswith("User: step 0 ") and head.endswith("\n...")
+
+    tail = truncate(LINES, 60, keep="tail")
+    assert count_tokens(tail) <= 60
+    assert tail.startswith("...\n") and tail.endswith("step 39 of the long division, carry the remainder")
+    assert truncate("short", 60) == "short"
+
+
+def test_pack_priorities_and_caps():
+    packed = pack([
+        Section("system", "You are a tutor. " * 20, required=True),
+        Section("question", "What is 144 / 12?", required=True),
+        Section("feedback", "Please be patient, she gets anxious. " * 30, priority=1, max_tokens=40),
+        Section("context", LINES, priority=2, keep="tail"),
+    ], budget=300)
+    assert packed.texts["question"] == "What is 144 / 12?"
+    assert packed.tokens["feedback"] <= 40
+    assert packed.total <= 300
+    assert packed.trimmed == ["feedback", "context"]
+    assert "step 39" in packed.texts["context"] and "step 0 " not in packed.texts["context"]
+
+    tight = pack([Section("system", "x " * 200, required=True), Section("context", LINES, priority=2)], budget=100)
+    assert tight.dropped == ["context"] and tight.texts["context"] == ""
+
+
+def test_fit_messages_drops_oldest_turns_first():
+    messages = [{"role": "system", "content": "Grade it."}] + [
+        {"role": "user" if i % 2 else "assistant", "content": f"turn {i} " * 30} for i in range(10)
+    ]
+    fitted = fit_messages(messages, budget=250)
+    assert fitted[0]["role"] == "system" and fitted[-1] is messages[-1]
+    assert sum(prompt_budget.message_tokens(m) for m in fitted) <= 250
+    assert fitted[1] is messages[len(messages) - len(fitted) + 1]
+
+
+def test_heuristic_when_tokenizer_is_unavailable(monkeypatch):
+    monkeypatch.setattr(prompt_budget, "_heuristic", True)
+    assert count_tokens("a" * 40) == 10
+    assert len(truncate("a" * 400, 20)) <= 80
+
+
+def test_generate_hint_sends_a_budgeted_prompt(monkeypatch):
+    sent = []
+
+    def fake_completion(**kwargs):
+        sent.append(kwargs["messages"])
+        return {"choices": [{"message": {"content": "Try dividing by 12."}}]}
+
+    monkeypatch.setattr(llm, "completion", fake_completion)
+    monkeypatch.setattr(llm, "_breakers", {})
+    monkeypatch.setattr(llm.model_router, "hedge_tasks", set())
+    monkeypatch.setattr(prompt_budget, "PROMPT_TOKEN_BUDGET", 400)
+
+    llm.generate_hint(question="What is 144 / 12?", last_context=LINES, user_class=4, parent_feedback="Go slowly.")
+    text = sent[0][1]["content"][0]["text"]
+    assert "step 39" in text and "step 0 " not in text
+    assert "Parent feedback: Go slowly." in text
+    system = sent[0][0]["content"]
+    assert count_tokens(text) + count_tokens(system if isinstance(system, str) else str(system)) <= 450
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+import content_registry
+import llm
+import prompt_cache
+from content_registry import StaticContent
+from prompt_budget import count_tokens
+
+
+class CachingProvider:
+    """Fake llm.completion that, like real providers, serves a previously seen system prefix from its cache."""
+
+    def __init__(self):
+        self.calls = []
+        self.prefixes = set()
+
+    def __call__(self, **kwargs):
+        messages = kwargs["messages"]
+        self.calls.append(kwargs)
+        prefix = json.dumps(messages[0], sort_keys=True)
+        prefix_tokens = count_tokens(prefix)
+        prompt_tokens = prefix_tokens + count_tokens(json.dumps(messages[1:]))
+        cached = prefix_tokens if prefix in self.prefixes else 0
+        self.prefixes.add(prefix)
+        return {
+            "choices": [{"message": {"content": "Try splitting 144 into 120 + 24."}}],
+            "usage": {"prompt_tokens": prompt_tokens, "prompt_tokens_details": {"cached_tokens": cached}},
+        }
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    fake = CachingProvider()
+    monkeypatch.setattr(llm, "completion", fake)
+    monkeypatch.setattr(llm, "_breakers", {})
+    monkeypatch.setattr(llm.model_router, "routes", {task: [llm.MODEL_NAME] for task in llm.LLM_ROUTES})
+    monkeypatch.setattr(llm.model_router, "hedge_tasks", set())
+    llm._hint_cache.clear()
+    return fake
+
+
+def test_hint_prompts_share_a_byte_identical_class_prefix(provider):
+    llm.generate_hint("What is 144 / 12?", user_class=5)
+    llm.generate_hint("And 96 / 8?", last_context="User: What is 144 / 12?\nBot: 12", user_class="class_5",
+                      parent_feedback="Go slowly.", summary="Worked on division with remainders.")
+    llm.generate_hint("What is 7 x 8?", user_class=3)
+
+    prefixes = [json.dumps(call["messages"][0], sort_keys=True).encode() for call in provider.calls]
+    assert prefixes[0] == prefixes[1] != prefixes[2]
+    assert provider.calls[0]["messages"][0] == {"role": "system", "content": llm.class_prefix(5)}
+    assert "Syllabus for class_5" in llm.class_prefix(5)
+    assert "144 / 12" not in prefixes[0].decode() and "96 / 8" in json.dumps(provider.calls[1]["messages"][1])
+
+
+def test_cached_token_ratio_is_exported(provider):
+    before = prompt_cache._cached_tokens.value
+    llm.generate_hint("What is 144 / 12?", user_class=4)
+    llm.generate_hint("What is 96 / 8?", user_class=4)
+
+    assert prompt_cache._cached_tokens.value - before == count_tokens(json.dumps(provider.calls[0]["messages"][0], sort_keys=True))
+    assert prompt_cache.record_usage({"usage": {"prompt_tokens": 200, "prompt_tokens_details": {"cached_tokens": 150}}}) == 0.75
+    assert prompt_cache.record_usage({"choices": []}) is None
+
+
+def test_cache_control_marks_only_the_leading_system_message(monkeypatch):
+    messages = [{"role": "system", "content": "You are a tutor."}, {"role": "user", "content": "Hi"}]
+    assert prompt_cache.with_cache_control(messages, "gemini/gemini-2.5-flash") is messages
+
+    marked = prompt_cache.with_cache_control(messages, "anthropic/claude-3-5-haiku-latest")
+    assert marked[0]["content"] == [{"type": "text", "text": "You are a tutor.", "cache_control": {"type": "ephemeral"}}]
+    assert marked[1] is messages[1] and messages[0]["content"] == "You are a tutor."
+
+
+def test_class_prefix_follows_syllabus_edits(tmp_path, monkeypatch):
+    topics = tmp_path / "topics.json"
+    topics.write_text(json.dumps({"class_2": {"Shapes": ["Circles"]}}))
+    monkeypatch.setattr(content_registry, "topics_content", StaticContent(topics, check_interval=0))
+
+    first = llm.class_prefix(2)
+    assert "Shapes: Circles" in first and llm.class_prefix(2) is first  # unchanged files: same cached string
+
+    topics.write_text(json.dumps({"class_2": {"Shapes": ["Circles", "Triangles"]}}))
+    assert "Shapes: Circles, Triangles" in llm.class_prefix(2)
@@ -0,0 +1,40 @@
+import json
+import random
+from datetime import date
+
+from content_registry import quotes_content
+from quotes_index import QuotesIndex
+
+QUOTES = [
+    {"quote": "a", "author": "x", "topic": "Math"},
+    {"quote": "b", "author": "y", "topic": "education"},
+    {"quote": "c", "author": "z", "topic": " math "},
+]
+
+
+def test_index_buckets_topics_and_preserializes_bodies():
+    index = QuotesIndex(QUOTES)
+    assert json.loads(index.all_body) == {"quotes": QUOTES}
+    assert [q["quote"] for q in json.loads(index.topic_bodies["math"])["quotes"]] == ["a", "c"]
+
+    rng = random.Random(1)
+    picks = {json.loads(index.random_body("MATH", rng))["quote"] for _ in range(50)}
+    assert picks == {"a", "c"}
+    assert index.random_body("history") is None
+
+    today = date(2026, 10, 19)
+    assert index.daily_body(today) == index.daily_body(today)
+    assert index.daily_body(today) != index.daily_body(date(2026, 10, 20))
+    assert json.loads(index.daily_body(today, "education"))["quote"] == "b"
+
+
+def test_quote_endpoints(client):
+    data = quotes_content.snapshot().data
+    assert client.get("/quotes/").json() == {"quotes": data}
+
+    r = client.get("/quotes/random", params={"topic": "Math"})
+    assert r.status_code == 200 and r.json()["topic"] == "math"
+    assert client.get("/quotes/random", params={"topic": "nope"}).status_code == 404
+    assert client.get("/quotes/today").json() == client.get("/quotes/today").json()
+    assert client.get("/quotes/today", params={"topic": "education"}).json()["topic"] == "education"
+    assert client.get("/quotes/by-topic/nothing").status_code == 404
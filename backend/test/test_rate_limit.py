@@ -0,0 +1,110 @@
+import pytest
+
+import llm
+import rate_limit
+from rate_limit import AdmissionControl, Limit, LocalStore, MemoryBackend, RateLimited, RateLimiter, SharedStoreBackend
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.parametrize("make_backend", [MemoryBackend, lambda: SharedStoreBackend(LocalStore())])
+def test_token_bucket_burst_refill_and_retry_after(make_backend):
+    clock = FakeClock()
+    limiter = RateLimiter(make_backend(), Limit(per_minute=6, burst=2), Limit(per_minute=600, burst=100), clock)
+
+    limiter.check("amy")
+    limiter.check("amy")
+    with pytest.raises(RateLimited) as e:
+        limiter.check("amy")
+    assert e.value.scope == "student" and e.value.retry_after == pytest.approx(10.0)
+    limiter.check("ben")  # other students have their own bucket
+
+    clock.now += 10
+    limiter.check("amy")
+
+
+def test_class_bucket_is_shared_by_classmates():
+    limiter = RateLimiter(MemoryBackend(), Limit(60, 5), Limit(60, 3), FakeClock())
+    for name in ("a", "b", "c"):
+        limiter.check(name, "class_4")
+    with pytest.raises(RateLimited) as e:
+        limiter.check("d", "class_4")
+    assert e.value.scope == "class"
+    limiter.check("d", "class_5")
+
+
+def test_memory_backend_is_bounded():
+    backend = MemoryBackend(max_keys=2)
+    for key in ("a", "b", "c"):
+        backend.take(key, Limit(60, 1), 0.0)
+    assert list(backend._buckets) == ["b", "c"]
+
+
+@pytest.fixture
+def chat(client, monkeypatch):
+    monkeypatch.setattr(llm, "get_chat_title", lambda text: "title")
+    monkeypatch.setattr(llm, "generate_hint", lambda **kwargs: "hint")
+    assert client.post("/users/signup", json={"username": "kid", "password": "x", "class_level": "class_3"}).status_code == 200
+    return lambda **kwargs: client.post(
+        "/chat/send/instant/kid", json={"text": "2+2?", "sender": "user", "session_id": "s1", "time_taken": 5}, **kwargs
+    )
+
+
+def test_chat_endpoint_returns_429_with_retry_after(chat, monkeypatch):
+    monkeypatch.setattr(rate_limit, "rate_limiter", RateLimiter(MemoryBackend(), Limit(6, 2), Limit(600, 100)))
+    assert chat().status_code == 200
+    assert chat().status_code == 200
+    r = chat()
+    assert r.status_code == 429
+    assert int(r.headers["retry-after"]) >= 1
+
+
+def test_anonymous_client_cannot_drain_a_students_bucket(chat, client, monkeypatch):
+    backend = MemoryBackend()
+    monkeypatch.setattr(rate_limit, "rate_limiter", RateLimiter(backend, Limit(6, 2), Limit(600, 100)))
+    assert chat().status_code == 200
+    assert chat().status_code == 200
+    assert chat().status_code == 429  # the anonymous caller's own bucket is empty
+
+    token = client.post("/users/login", json={"username": "kid", "password": "x"}).json()["access_token"]
+    assert chat(headers={"Authorization": f"Bearer {token}"}).status_code == 200
+    assert set(backend._buckets) == {"ip:testclient", "user:kid", "class:class_3"}
+
+
+def test_saturated_llm_pool_sheds_load(chat, monkeypatch):
+    admission = AdmissionControl(max_concurrent=1, initial_estimate=3.0)
+    monkeypatch.setattr(rate_limit, "llm_admission", admission)
+
+    assert admission.try_acquire()  # another request holds the only slot
+    r = chat()
+    assert r.status_code == 429 and r.headers["retry-after"] == "3"
+
+    admission.release(3.0)
+    assert chat().status_code == 200
+    assert admission.try_acquire()  # the finished request gave its slot back
+
+
+def test_unknown_username_is_rejected_without_a_bucket(client, monkeypatch):
+    backend = MemoryBackend()
+    monkeypatch.setattr(rate_limit, "rate_limiter", RateLimiter(backend, Limit(6, 2), Limit(600, 100)))
+    r = client.post("/chat/send/instant/nobody", json={"text": "2+2?", "sender": "user", "session_id": "s1", "time_taken": 5})
+    assert r.status_code == 404
+    assert not backend._buckets
+
+
+def test_shed_request_does_not_spend_a_token(chat, monkeypatch):
+    limiter = RateLimiter(MemoryBackend(), Limit(6, 1), Limit(600, 100))
+    admission = AdmissionControl(max_concurrent=1)
+    monkeypatch.setattr(rate_limit, "rate_limiter", limiter)
+    monkeypatch.setattr(rate_limit, "llm_admission", admission)
+
+    assert admission.try_acquire()
+    assert chat().status_code == 429  # shed: no slot
+    admission.release(1.0)
+    assert chat().status_code == 200  # the single token was still there
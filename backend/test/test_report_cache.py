@@ -0,0 +1,66 @@
+import threading
+import time
+
+import routers.parent
+from auth import create_access_token
+from report_cache import report_cache
+from ttl_cache import TTLCache
+
+
+def test_ttl_cache_expires_and_evicts_least_recently_used():
+    now = [0.0]
+    cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+    now[0] = 10.0
+    assert cache.get("a") is None
+    assert len(cache) == 1  # "c" has expired too but is only dropped when read
+
+
+def test_get_or_set_computes_once_for_concurrent_callers():
+    cache = TTLCache(maxsize=8, ttl=60)
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.05)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_set("k", slow))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == ["value"] * 8
+    assert len(calls) == 1
+
+
+def test_repeat_report_requests_reuse_text_and_pdf(client, monkeypatch, report_child, report_comparison):
+    report_cache.clear()
+    llm_calls, renders = [], []
+    monkeypatch.setattr(routers.parent, "generate_parent_report",
+                        lambda child, comparison: llm_calls.append(child) or "Doing well.")
+    real_render = routers.parent.report_renderer.render
+    monkeypatch.setattr(routers.parent.report_renderer, "render",
+                        lambda *args: renders.append(args) or real_render(*args))
+
+    assert client.post("/users/signup", json={"username": "kid", "password": "x"}).status_code == 200
+    assert client.post("/parents/register", json={"username": "mum", "password": "x", "student_username": "kid"}).status_code == 200
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'mum'})}"}
+    payload = {"child": report_child, "comparison": report_comparison}
+
+    assert client.post("/parents/report", json=payload, headers=headers).json() == {"report": "Doing well."}
+    first = client.post("/parents/report/pdf", json=payload, headers=headers).content
+    second = client.post("/parents/report/pdf", json=payload, headers=headers).content
+    assert first == second and first.startswith(b"%PDF")
+    assert len(llm_calls) == 1 and len(renders) == 1
+
+    changed = {"child": {**report_child, "score": report_child["score"] + 1}, "comparison": report_comparison}
+    assert client.post("/parents/report/pdf", json=changed, headers=headers).status_code == 200
+    assert len(llm_calls) == 2 and len(renders) == 2
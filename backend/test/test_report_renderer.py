@@ -0,0 +1,66 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+import routers.parent
+from auth import create_access_token
+from report_cache import report_cache
+from report_renderer import RendererBusy, ReportRenderer
+
+
+def test_pdf_endpoint_renders_on_pool_and_exports_metrics(client, monkeypatch, report_child, report_comparison):
+    report_cache.clear()
+    monkeypatch.setattr(routers.parent, "generate_parent_report", lambda child, comparison: "Doing well.\nKeep going.")
+    assert client.post("/users/signup", json={"username": "kid", "password": "x"}).status_code == 200
+    r = client.post("/parents/register", json={"username": "mum", "password": "x", "student_username": "kid"})
+    assert r.status_code == 200
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'mum'})}"}
+
+    r = client.post("/parents/report/pdf", json={"child": report_child, "comparison": report_comparison}, headers=headers)
+    assert r.status_code == 200
+    assert r.content.startswith(b"%PDF")
+    assert r.headers["content-disposition"] == 'attachment; filename="report_Kid.pdf"'
+
+    body = client.get("/metrics").text
+    assert "report_render_seconds_count" in body
+    assert "report_render_queue_wait_seconds_count" in body
+
+
+def test_full_queue_is_rejected_and_slots_are_released(report_child, report_comparison):
+    renderer = ReportRenderer(workers=0, max_pending=1)  # inline: no pool needed
+
+    renderer._slots.acquire()  # a job still queued or running
+    with pytest.raises(RendererBusy):
+        renderer.submit("text", report_child)
+    renderer._slots.release()
+
+    for _ in range(2):
+        assert renderer.render("text", report_child, report_comparison).startswith(b"%PDF")
+
+
+
+class _LateCallbacks(Future):
+    """A job future whose done-callbacks run a little after waiters have been woken."""
+
+    def _invoke_callbacks(self):
+        time.sleep(0.05)
+        super()._invoke_callbacks()
+
+
+class _ThreadExecutor:
+    def submit(self, fn, *args):
+        future = _LateCallbacks()
+        threading.Thread(target=lambda: future.set_result(fn(*args))).start()
+        return future
+
+    def shutdown(self, **kwargs):
+        pass
+
+
+def test_slot_is_free_once_the_result_is_returned(report_child):
+    renderer = ReportRenderer(workers=1, max_pending=1)
+    renderer._pool = _ThreadExecutor()
+    for _ in range(3):  # would hit RendererBusy if the slot were released after result() returned
+        assert renderer.submit("text", report_child).result(timeout=10)[0].startswith(b"%PDF")
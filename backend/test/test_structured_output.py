@@ -0,0 +1,50 @@
+import pytest
+
+import llm
+import structured_output
+from structured_output import VERDICT_RESPONSE_FORMAT, parse_verdict
+
+VERDICT = {"final": True, "correct": False, "feedback": "Check the carry.", "correct_answer": "42"}
+
+
+@pytest.mark.parametrize("text", [
+    '{"final": true, "correct": false, "feedback": "Check the carry.", "correct_answer": "42"}',
+    '```json\n{"final": true, "correct": false, "feedback": "Check the carry.", "correct_answer": "42"}\n```',
+    "Sure! {'final': True, 'correct': False, 'feedback': 'Check the carry.', 'correct_answer': '42',}",
+    '{"final": "true", "correct": "false", "feedback": "Check the carry.", "correct_answer": 42}',
+])
+def test_parse_verdict(text):
+    assert parse_verdict(text) == VERDICT
+
+
+def test_parse_counts_stages():
+    strict, repaired, failed = (structured_output._strict.value, structured_output._repaired.value,
+                                structured_output._failed.value)
+    parse_verdict('{"final": false, "correct": false}')
+    parse_verdict("{'final': False, 'correct': False}")
+    assert parse_verdict("I cannot grade this") is None
+    assert parse_verdict("{'final': __import__('os')}") is None  # nothing is evaluated
+    assert structured_output._strict.value == strict + 1
+    assert structured_output._repaired.value == repaired + 1
+    assert structured_output._failed.value == failed + 2
+
+
+def test_check_answer_requests_schema_only_where_supported(monkeypatch):
+    calls = []
+
+    def fake_completion(**kwargs):
+        calls.append(kwargs)
+        return {"choices": [{"message": {"content": '{"final": true, "correct": true, "feedback": "", "correct_answer": "4"}'}}]}
+
+    monkeypatch.setattr(llm, "completion", fake_completion)
+    monkeypatch.setattr(llm, "_breakers", {})
+    monkeypatch.setattr(llm.model_router, "hedge_tasks", set())
+    conversation = [{"role": "assistant", "content": "2+2?"}, {"role": "user", "content": "4"}]
+
+    monkeypatch.setattr(llm.model_router, "routes", {"grade": ["gemini/gemini-2.5-flash"]})
+    assert llm.check_answer(conversation=conversation)["correct"] is True
+    assert calls[-1]["response_format"] == VERDICT_RESPONSE_FORMAT
+
+    monkeypatch.setattr(llm.model_router, "routes", {"grade": ["custom/local-model"]})
+    llm.check_answer(conversation=conversation)
+    assert "response_format" not in calls[-1]
@@ -0,0 +1,62 @@
+"""SQL statement budgets for the teacher student-management endpoints.
+
+Each endpoint must issue the same number of statements whether a teacher
+has one student or many (no per-row queries).
+"""
+from datetime import datetime
+
+import pytest
+
+from auth import create_access_token
+from models.models import Teacher, TeacherStudent, User, Video
+
+
+def _seed(db, n_students, n_teachers=1):
+    teachers = [Teacher(username=f"teacher{i}", password="x", name=f"T{i}") for i in range(n_teachers)]
+    db.add_all(teachers)
+    db.commit()
+    now = datetime.utcnow().isoformat()
+    for i in range(n_students):
+        db.add(User(username=f"student{i}", password="x", name=f"S{i}", class_level="class_6"))
+        for t in teachers:
+            db.add(TeacherStudent(teacher_id=t.id, student_username=f"student{i}",
+                                  class_level="class_6", enrolled_date=now))
+    for t in teachers:
+        db.add(Video(title=f"{t.username} lesson", class_level="class_6", file_path="/uploads/videos/x.mp4",
+                     teacher_id=t.id, upload_date=now))
+    db.commit()
+
+
+def _auth(username):
+    return {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+
+
+ENDPOINTS = [
+    ("/teachers/students", lambda: {"headers": _auth("teacher0")}, 2),
+    ("/teachers/students/debug", lambda: {"headers": _auth("teacher0")}, 2),
+    ("/teachers/students-raw", lambda: {"params": {"teacher_username": "teacher0"}}, 2),
+    ("/teachers/students-db-direct", lambda: {}, 1),
+]
+
+
+@pytest.mark.parametrize("path,kwargs,budget", ENDPOINTS)
+@pytest.mark.parametrize("n_students", [1, 40])
+def test_student_listing_statement_budget(client, db, count_queries, path, kwargs, budget, n_students):
+    _seed(db, n_students)
+    with count_queries() as q:
+        r = client.get(path, **kwargs())
+    assert r.status_code == 200
+    assert q.count == budget, q.statements
+
+
+@pytest.mark.parametrize("n_teachers", [1, 15])
+def test_my_teachers_statement_budget(client, db, count_queries, n_teachers):
+    _seed(db, 1, n_teachers=n_teachers)
+    with count_queries() as q:
+        r = client.get("/teachers/my-teachers", params={"student_username": "student0"})
+    assert r.status_code == 200
+    body = r.json()
+    assert len(body) == n_teachers
+    assert all(t["video_count"] == 1 for t in body)
+    # student lookup + enrollments joined with teachers + one batched video query
+    assert q.count == 3, q.statements
@@ -0,0 +1,129 @@
+import os
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+import routers.teacher
+from auth import create_access_token
+from models.models import Teacher, Video
+from trending import ALL_CLASSES, TrendingBoard
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_recent_views_outrank_older_ones():
+    clock = FakeClock()
+    board = TrendingBoard(bucket_seconds=60, half_life_hours=1, clock=clock)
+
+    for _ in range(10):
+        board.record_view(1, "class_6")
+    clock.now += 3 * 3600  # three half-lives later
+    for _ in range(3):
+        board.record_view(2, "class_6")
+    board.record_view(3, "class_7")
+    board.refresh()
+
+    assert [vid for vid, _ in board.top(10, "class_6")] == [2, 1]
+    (_, old_score), = [e for e in board.top(10, "class_6") if e[0] == 1]
+    assert abs(old_score - 10 / 8) < 1e-6
+    assert [vid for vid, _ in board.top(2, ALL_CLASSES)] == [2, 1]
+    assert board.top(10, "class_7") == [(3, 1.0)]
+
+    board.forget(2)
+    board.refresh()
+    assert [vid for vid, _ in board.top(10, "class_6")] == [1]
+
+
+@pytest.fixture
+def trending_board(monkeypatch):
+    """A fresh board behind the teacher routes, so scores from earlier tests do not leak in."""
+    board = TrendingBoard()
+    monkeypatch.setattr(routers.teacher, "trending_board", board)
+    return board
+
+
+def test_trending_endpoint_serves_board(client, db, trending_board):
+    t = Teacher(username="t1", password="secret")
+    db.add(t)
+    db.commit()
+    videos = [
+        Video(title=f"v{i}", class_level="class_6", file_path=f"/uploads/videos/{i}.mp4",
+              teacher_id=t.id, upload_date=datetime.utcnow().isoformat(), view_count=i)
+        for i in range(3)
+    ]
+    db.add_all(videos)
+    db.commit()
+
+    trending_board.load(db)
+
+    r = client.get("/teachers/videos/trending", params={"limit": 2, "class_level": "class_6"})
+    assert r.status_code == 200
+    body = r.json()
+    assert [v["title"] for v in body[0]["videos"]] == ["v2", "v1"]
+    assert "password" not in str(body)
+
+
+@pytest.fixture
+def local_time_not_utc():
+    old = os.environ.get("TZ")
+    os.environ["TZ"] = "Asia/Kolkata"  # ahead of UTC, so a local-time reading ages the upload
+    time.tzset()
+    yield
+    if old is None:
+        os.environ.pop("TZ", None)
+    else:
+        os.environ["TZ"] = old
+    time.tzset()
+
+
+def _video(db, view_count, upload_date, class_level="class_6"):
+    teacher = db.query(Teacher).first()
+    if teacher is None:
+        teacher = Teacher(username="t1", password="secret")
+        db.add(teacher)
+        db.commit()
+    video = Video(title="v", class_level=class_level, file_path="/uploads/videos/v.mp4", teacher_id=teacher.id,
+                  upload_date=upload_date, view_count=view_count)
+    db.add(video)
+    db.commit()
+    return video
+
+
+def test_seed_reads_upload_dates_as_utc(db, local_time_not_utc):
+    clock = FakeClock()
+    uploaded = datetime.fromtimestamp(clock.now, timezone.utc).replace(tzinfo=None).isoformat()
+    video = _video(db, 8, uploaded)
+    board = TrendingBoard(bucket_seconds=60, half_life_hours=1, clock=clock)
+    board.load(db)
+    assert board.top(1, "class_6") == [(video.id, pytest.approx(8.0))]  # uploaded now: not decayed
+
+
+def test_reseeding_keeps_live_scores(db):
+    clock = FakeClock()
+    video = _video(db, 100, datetime.fromtimestamp(clock.now, timezone.utc).replace(tzinfo=None).isoformat())
+    board = TrendingBoard(bucket_seconds=60, half_life_hours=1, clock=clock)
+    for _ in range(3):
+        board.record_view(video.id, "class_6")
+    board.refresh()
+
+    board.load(db)
+    assert board.top(1, "class_6") == [(video.id, pytest.approx(3.0))]
+
+
+def test_changing_a_videos_class_moves_it_on_the_board(client, db, trending_board):
+    video = _video(db, 5, datetime.utcnow().isoformat())
+    trending_board.load(db)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 't1'})}"}
+
+    r = client.put(f"/teachers/videos/{video.id}", params={"class_level": "class_7"}, headers=headers)
+    assert r.status_code == 200
+    trending_board.refresh()
+    assert [vid for vid, _ in trending_board.top(10, "class_7")] == [video.id]
+    assert trending_board.top(10, "class_6") == []
@@ -0,0 +1,104 @@
+from datetime import datetime
+
+from sqlalchemy import text
+
+from database import engine
+from models.models import Teacher, Video
+import search_index
+
+
+def _add_videos(db, teacher, rows):
+    videos = []
+    for title, description, class_level, subject in rows:
+        v = Video(
+            title=title,
+            description=description,
+            class_level=class_level,
+            subject=subject,
+            file_path=f"/uploads/videos/{title}.mp4",
+            teacher_id=teacher.id,
+            upload_date=datetime.utcnow().isoformat(),
+        )
+        db.add(v)
+        videos.append(v)
+    db.commit()
+    return videos
+
+
+def _teacher(db, username="t1"):
+    t = Teacher(username=username, password="x", name=username)
+    db.add(t)
+    db.commit()
+    return t
+
+
+def test_fts_backend_active():
+    assert search_index.SEARCH_BACKEND == "fts5"
+
+
+def test_ranked_prefix_search_with_filters(db):
+    t = _teacher(db)
+    _add_videos(db, t, [
+        ("Fractions intro", "what is a fraction", "class_6", "Math"),
+        ("Decimals", "fractions and decimals compared", "class_6", "Math"),
+        ("Algebra basics", "variables", "class_6", "Math"),
+        ("Fractions revision", "more fractions", "class_7", "Math"),
+    ])
+
+    titles = [v.title for v in search_index.search_videos(db, query="fract", class_level="class_6")]
+    # title hits outrank description hits; class_7 is filtered inside the index query
+    assert titles == ["Fractions intro", "Decimals"]
+
+    page = search_index.search_videos(db, query="fractions", limit=1, offset=1)
+    assert len(page) == 1
+
+
+def test_index_follows_update_and_delete(db):
+    t = _teacher(db)
+    (video,) = _add_videos(db, t, [("Geometry", "angles", "class_6", "Math")])
+
+    video.title = "Trigonometry"
+    db.commit()
+    assert search_index.search_videos(db, query="geometry") == []
+    assert [v.id for v in search_index.search_videos(db, query="trig")] == [video.id]
+
+    db.delete(video)
+    db.commit()
+    assert search_index.search_videos(db, query="trig") == []
+
+
+def test_search_endpoint_groups_by_teacher(client, db):
+    t = _teacher(db)
+    _add_videos(db, t, [("Ratio and proportion", None, "class_6", "Math")])
+
+    r = client.get("/teachers/search", params={"query": "ratio OR geometry", "class_level": "class_6"})
+    assert r.status_code == 404  # "or" is a literal term, not an FTS operator
+
+    r = client.get("/teachers/search", params={"query": "rat", "class_level": "class_6"})
+    assert r.status_code == 200
+    body = r.json()
+    assert body[0]["teacher"]["id"] == t.id
+    assert body[0]["videos"][0]["title"] == "Ratio and proportion"
+
+
+def test_view_count_update_leaves_index_alone(db):
+    t = _teacher(db)
+    (video,) = _add_videos(db, t, [("Geometry", "angles", "class_6", "Math")])
+
+    before = db.execute(text("SELECT total_changes()")).scalar()
+    db.execute(text("UPDATE videos SET view_count = coalesce(view_count, 0) + 5 WHERE id = :id"), {"id": video.id})
+    # total_changes() counts rows written by triggers too: only the videos row changed
+    assert db.execute(text("SELECT total_changes()")).scalar() - before == 1
+    db.commit()
+    assert [v.id for v in search_index.search_videos(db, query="geometry")] == [video.id]
+
+
+def test_stale_update_trigger_is_replaced(db):
+    with engine.begin() as conn:
+        conn.execute(text("DROP TRIGGER videos_fts_au"))
+        conn.execute(text(search_index._SQLITE_DDL[3].replace(
+            "AFTER UPDATE OF title, description, class_level, subject ON", "AFTER UPDATE ON")))
+    search_index.ensure_video_search_index(engine)
+    with engine.connect() as conn:
+        sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE name = 'videos_fts_au'")).scalar()
+    assert "AFTER UPDATE OF title, description, class_level, subject ON videos" in sql
@@ -0,0 +1,34 @@
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+import main
+from models.models import Teacher, Video
+from view_counter import view_counter
+
+
+def test_views_are_buffered_then_flushed_in_one_batch(monkeypatch, db):
+    # keep the background thread from flushing mid-test
+    monkeypatch.setattr(view_counter, "flush_interval", 3600)
+    t = Teacher(username="t1", password="x")
+    db.add(t)
+    db.commit()
+    v = Video(title="Lesson", class_level="class_6", file_path="/uploads/videos/a.mp4",
+              teacher_id=t.id, upload_date=datetime.utcnow().isoformat())
+    db.add(v)
+    db.commit()
+
+    view_counter.flush()
+    with TestClient(main.app) as client:
+        for expected in (1, 2, 3):
+            r = client.get(f"/teachers/videos/{v.id}")
+            assert r.status_code == 200
+            assert r.json()["view_count"] == expected  # viewer sees the buffered count
+
+        db.refresh(v)
+        assert v.view_count == 0
+        assert view_counter.flush() == 1
+
+    db.refresh(v)
+    assert v.view_count == 3
+    assert view_counter.pending(v.id) == 0
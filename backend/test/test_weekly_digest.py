@@ -0,0 +1,98 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from database import SessionLocal
+from models.models import DigestRun, EmailOutbox, Parent, User
+from report_renderer import ReportRenderer
+from weekly_digest import run_weekly_digest
+
+
+def _seed(db, n):
+    for i in range(n):
+        db.add(User(username=f"kid{i}", password="x", name=f"Kid {i}", class_level="class_6", score=float(i)))
+        db.add(Parent(username=f"parent{i}", password="x", student_username=f"kid{i}",
+                      email=None if i % 5 == 4 else f"parent{i}@example.com"))
+    db.commit()
+
+
+def _fake_report(child, comparison):
+    return f"{child['name']} is ranked {comparison['rank']} of {comparison['class_count']}."
+
+
+class Crash(BaseException):
+    pass
+
+
+def test_digest_queues_every_parent_once_and_resumes_after_crash(db):
+    _seed(db, 25)  # 20 parents have an email address
+    calls = []
+
+    def crashing_report(child, comparison):
+        calls.append(child["username"])
+        if child["username"] == "kid12":
+            raise Crash()
+        return _fake_report(child, comparison)
+
+    with pytest.raises(Crash):
+        run_weekly_digest(SessionLocal, week="2026-W42", chunk_size=8, llm_concurrency=4,
+                          renderer=ReportRenderer(workers=0, max_pending=8), generate=crashing_report)
+
+    db.expire_all()
+    run = db.get(DigestRun, "2026-W42")
+    assert run.reports_sent == 8 and run.finished_at is None
+    assert db.query(EmailOutbox).count() == 8
+
+    summary = run_weekly_digest(SessionLocal, week="2026-W42", chunk_size=8, llm_concurrency=4,
+                                renderer=ReportRenderer(workers=0, max_pending=8), generate=_fake_report)
+    assert summary["reports"] == 12 and summary["failures"] == 0
+    assert summary["reports_per_minute"] > 0
+
+    db.expire_all()
+    outbox = db.query(EmailOutbox).order_by(EmailOutbox.id).all()
+    assert sorted(r.to_email for r in outbox) == sorted(f"parent{i}@example.com" for i in range(25) if i % 5 != 4)
+    kid3 = next(r for r in outbox if r.to_email == "parent3@example.com")
+    assert "Kid 3 is ranked 22 of 25." in kid3.body
+    assert kid3.attachment.startswith(b"%PDF")
+    assert db.get(DigestRun, "2026-W42").finished_at is not None
+
+    # A finished week is not sent again
+    assert run_weekly_digest(SessionLocal, week="2026-W42", generate=_fake_report,
+                             renderer=ReportRenderer(workers=0))["reports"] == 0
+    assert db.query(EmailOutbox).count() == 20
+
+
+def test_failed_reports_are_counted_and_skipped(db):
+    _seed(db, 5)
+
+    def flaky(child, comparison):
+        if child["username"] == "kid1":
+            raise RuntimeError("LLM timeout")
+        return _fake_report(child, comparison)
+
+    summary = run_weekly_digest(SessionLocal, week="2026-W43", chunk_size=10,
+                                renderer=ReportRenderer(workers=0, max_pending=10), generate=flaky)
+    assert (summary["reports"], summary["failures"]) == (3, 1)
+    db.expire_all()
+    run = db.get(DigestRun, "2026-W43")
+    kid1_parent = db.query(Parent).filter(Parent.student_username == "kid1").one()
+    assert run.failures == 1 and run.failed_parent_ids == str(kid1_parent.id) and run.finished_at is None
+
+    # The next run of the week retries the failed parent only, then finishes the week
+    summary = run_weekly_digest(SessionLocal, week="2026-W43", chunk_size=10,
+                                renderer=ReportRenderer(workers=0, max_pending=10), generate=_fake_report)
+    assert (summary["reports"], summary["failures"]) == (1, 0)
+    db.expire_all()
+    run = db.get(DigestRun, "2026-W43")
+    assert run.failed_parent_ids is None and run.finished_at is not None and run.reports_sent == 4
+    assert db.query(EmailOutbox).filter(EmailOutbox.to_email == kid1_parent.email).count() == 1
+
+
+def test_full_render_queue_waits_instead_of_failing(db):
+    _seed(db, 10)
+    renderer = ReportRenderer(workers=2, max_pending=1)  # one render in flight at a time
+    renderer._pool = ThreadPoolExecutor(max_workers=2)
+
+    summary = run_weekly_digest(SessionLocal, week="2026-W44", chunk_size=10, llm_concurrency=4,
+                                renderer=renderer, generate=_fake_report)
+    assert (summary["reports"], summary["failures"]) == (8, 0)
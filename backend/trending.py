@@ -0,0 +1,187 @@
+"""Time-decayed trending leaderboard for teacher videos.
+
+Views are counted into fixed time buckets (`TRENDING_BUCKET_SECONDS`). A
+background thread folds finished buckets into one decayed score per video and
+rebuilds the top-N list per class every `TRENDING_REFRESH_SECONDS`. The
+`/teachers/videos/trending` endpoint only slices that precomputed list, so its
+cost depends on `limit`, not on the size of the `videos` table.
+
+Scores use forward decay: a bucket's views are added with weight
+2 ** (bucket_age_from_base / half_life), which grows over time instead of
+shrinking every stored score. Rankings only compare scores, so the common
+factor does not matter; the current decayed value is score / weight(now).
+With the default 24h half-life a view from yesterday counts half as much as
+one from now.
+
+The board lives in process memory. At startup it is seeded from
+`videos.view_count`, treating historical views as if they happened at upload
+time, so old all-time favourites start out heavily decayed. Seeding again
+(e.g. a second `start()`) only adds videos the board is not tracking yet, so
+live scores are kept.
+"""
+import heapq
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from database import SessionLocal
+from models.models import Video
+
+TRENDING_BUCKET_SECONDS = int(os.getenv("TRENDING_BUCKET_SECONDS", "300"))
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "24"))
+TRENDING_REFRESH_SECONDS = float(os.getenv("TRENDING_REFRESH_SECONDS", "30"))
+TRENDING_TOP_N = int(os.getenv("TRENDING_TOP_N", "100"))
+
+ALL_CLASSES = None  # snapshot key for the cross-class leaderboard
+
+# Rebase forward-decay weights before 2 ** exponent gets near float overflow
+_MAX_EXPONENT = 500.0
+
+
+class TrendingBoard:
+    """Bucketed view events -> decayed scores -> precomputed top-N per class."""
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        bucket_seconds: int = TRENDING_BUCKET_SECONDS,
+        half_life_hours: float = TRENDING_HALF_LIFE_HOURS,
+        refresh_seconds: float = TRENDING_REFRESH_SECONDS,
+        top_n: int = TRENDING_TOP_N,
+        clock=time.time,
+    ):
+        self.session_factory = session_factory
+        self.bucket_seconds = bucket_seconds
+        self.half_life_buckets = half_life_hours * 3600.0 / bucket_seconds
+        self.refresh_seconds = refresh_seconds
+        self.top_n = top_n
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._open_buckets = {}  # bucket -> {video_id: views}
+        self._scores = {}  # video_id -> forward-decayed score
+        self._classes = {}  # video_id -> class_level
+        self._base_bucket = self._bucket(self.clock())
+        # class_level (or ALL_CLASSES) -> tuple of (video_id, decayed score), best first
+        self._snapshot = {}
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _bucket(self, ts: float) -> int:
+        return int(ts // self.bucket_seconds)
+
+    def _exponent(self, bucket: int) -> float:
+        return (bucket - self._base_bucket) / self.half_life_buckets
+
+    # ---------- write path ----------
+
+    def record_view(self, video_id: int, class_level: str, ts: float | None = None):
+        bucket = self._bucket(self.clock() if ts is None else ts)
+        with self._lock:
+            views = self._open_buckets.setdefault(bucket, {})
+            views[video_id] = views.get(video_id, 0) + 1
+            self._classes[video_id] = class_level
+
+    def forget(self, video_id: int):
+        """Drop a deleted video; it leaves the snapshot on the next refresh."""
+        with self._lock:
+            self._scores.pop(video_id, None)
+            self._classes.pop(video_id, None)
+            for views in self._open_buckets.values():
+                views.pop(video_id, None)
+
+    def move(self, video_id: int, class_level: str):
+        """Re-file a tracked video under a new class; it moves on the next refresh."""
+        with self._lock:
+            if video_id in self._classes:
+                self._classes[video_id] = class_level
+
+    def load(self, db):
+        """Seed scores of untracked videos from stored all-time counts (one table scan at startup)."""
+        rows = db.query(Video.id, Video.class_level, Video.view_count, Video.upload_date).all()
+        now_bucket = self._bucket(self.clock())
+        with self._lock:
+            for video_id, class_level, view_count, upload_date in rows:
+                self._classes[video_id] = class_level
+                if video_id in self._scores:
+                    continue  # already live; view_count would count its recent views twice
+                try:
+                    uploaded_at = datetime.fromisoformat(upload_date)
+                    if uploaded_at.tzinfo is None:
+                        uploaded_at = uploaded_at.replace(tzinfo=timezone.utc)  # stored as utcnow().isoformat()
+                    uploaded = self._bucket(uploaded_at.timestamp())
+                except Exception:
+                    uploaded = now_bucket
+                self._scores[video_id] = float(view_count or 0) * 2.0 ** self._exponent(min(uploaded, now_bucket))
+        self.refresh()
+
+    # ---------- background refresh ----------
+
+    def refresh(self):
+        """Fold buffered buckets into scores and rebuild every top-N list."""
+        now_bucket = self._bucket(self.clock())
+        with self._lock:
+            for bucket, views in self._open_buckets.items():
+                weight = 2.0 ** self._exponent(bucket)
+                for video_id, n in views.items():
+                    self._scores[video_id] = self._scores.get(video_id, 0.0) + n * weight
+            self._open_buckets = {}
+
+            if self._exponent(now_bucket) > _MAX_EXPONENT:
+                shift = 2.0 ** -self._exponent(now_bucket)
+                self._scores = {vid: s * shift for vid, s in self._scores.items()}
+                self._base_bucket = now_bucket
+
+            scores = dict(self._scores)
+            classes = dict(self._classes)
+            now_weight = 2.0 ** self._exponent(now_bucket)
+
+        by_class = {}
+        for video_id, score in scores.items():
+            by_class.setdefault(classes.get(video_id), []).append((score, video_id))
+
+        snapshot = {}
+        overall = []
+        for class_level, entries in by_class.items():
+            top = heapq.nlargest(self.top_n, entries)
+            snapshot[class_level] = tuple((vid, s / now_weight) for s, vid in top)
+            overall.extend(top)
+        snapshot[ALL_CLASSES] = tuple((vid, s / now_weight) for s, vid in heapq.nlargest(self.top_n, overall))
+        self._snapshot = snapshot  # atomic swap; readers never see a half-built board
+
+    def top(self, limit: int, class_level: str | None = None) -> list:
+        """Return up to `limit` (video_id, decayed score) pairs, best first."""
+        return list(self._snapshot.get(class_level, ())[: max(0, limit)])
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_seconds):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠️ trending refresh failed: {e}", flush=True)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        try:
+            db = self.session_factory()
+            try:
+                self.load(db)
+            finally:
+                db.close()
+        except Exception as e:
+            print(f"⚠️ trending board seed failed (starting empty): {e}", flush=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="trending-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.refresh_seconds + 5)
+            self._thread = None
+
+
+trending_board = TrendingBoard()
@@ -0,0 +1,97 @@
+"""Buffered view-count increments for videos.
+
+`get_video_details` used to run `view_count += 1` and commit on every view,
+so a popular lesson serialised all of its viewers on one row and paid one
+fsync per view. Views are now added to an in-memory per-video counter and a
+background thread folds them into the table with one batched UPDATE every
+`VIEW_COUNT_FLUSH_SECONDS` (default 2s).
+
+Staleness and loss window:
+- `videos.view_count` lags live traffic by at most one flush interval (plus
+  the flush itself). Readers that need the live figure can add `pending()`.
+- The buffer is flushed on graceful shutdown (app lifespan). A hard crash or
+  SIGKILL loses at most the views recorded since the last flush.
+- A failed flush puts its increments back into the buffer for the next try.
+- Each worker process buffers its own views; increments are additive, so
+  several workers flushing to the same row stay correct.
+"""
+import os
+import threading
+
+from sqlalchemy import bindparam, update
+
+from database import engine
+from models.models import Video
+
+VIEW_COUNT_FLUSH_SECONDS = float(os.getenv("VIEW_COUNT_FLUSH_SECONDS", "2"))
+
+_videos = Video.__table__
+_increment_stmt = (
+    update(_videos)
+    .where(_videos.c.id == bindparam("b_id"))
+    .values(view_count=_videos.c.view_count + bindparam("b_views"))
+)
+
+
+class ViewCounter:
+    """Aggregate view increments per video_id and flush them in batches."""
+
+    def __init__(self, bind=engine, flush_interval: float = VIEW_COUNT_FLUSH_SECONDS):
+        self.bind = bind
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def record(self, video_id: int, views: int = 1):
+        with self._lock:
+            self._pending[video_id] = self._pending.get(video_id, 0) + views
+
+    def pending(self, video_id: int) -> int:
+        """Views recorded for `video_id` that are not in the database yet."""
+        with self._lock:
+            return self._pending.get(video_id, 0)
+
+    def flush(self) -> int:
+        """Write all buffered increments in one transaction; return rows touched."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            rows = [{"b_id": vid, "b_views": n} for vid, n in batch.items()]
+            try:
+                with self.bind.begin() as conn:
+                    conn.execute(_increment_stmt, rows)
+            except Exception as e:
+                # Put the views back so the next flush retries them
+                with self._lock:
+                    for vid, n in batch.items():
+                        self._pending[vid] = self._pending.get(vid, 0) + n
+                print(f"⚠️ view count flush failed ({len(rows)} videos), will retry: {e}", flush=True)
+                return 0
+            return len(rows)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="view-counter-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread and flush whatever is still buffered."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.flush_interval + 5)
+            self._thread = None
+        self.flush()
+
+
+view_counter = ViewCounter()
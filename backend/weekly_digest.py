@@ -0,0 +1,255 @@
+"""Nightly batch that emails every parent a weekly PDF progress digest.
+
+    python weekly_digest.py [--week 2026-W42] [--chunk-size 500] [--llm-concurrency 8] [--render-workers N]
+
+Parents (with an email address) are read in keyset order by id, in chunks,
+joined with their child in the same statement. For each chunk:
+
+1. the child's stats and class comparison are assembled (class comparison from
+   the materialized class_stats tables and the in-memory leaderboard),
+2. `generate_parent_report` runs on a thread pool of `--llm-concurrency`
+   workers (the calls are network-bound),
+3. each finished text is rendered to PDF on the report process pool,
+4. the emails are queued in the outbox and the checkpoint in `digest_runs` is
+   advanced in the same transaction.
+
+A crash therefore loses at most the chunk in progress; running the command
+again for the same week resumes after the last committed chunk and never
+queues a parent twice. When the render queue is full, the batch waits for a
+render to finish instead of failing the report. Parents whose report still
+failed (LLM or renderer) are counted and recorded in
+`digest_runs.failed_parent_ids`, with the same commit as their chunk. The week
+is only marked finished once that list is empty; running the command again
+retries those parents first. Throughput is printed in reports per minute.
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from datetime import date, datetime
+
+from sqlalchemy import inspect, text
+
+import class_stats
+import queries
+from email_outbox import enqueue_email
+from leaderboard import leaderboards
+from llm import generate_parent_report
+from models.models import DigestRun, Parent, User
+from report_renderer import REPORT_RENDER_WORKERS, RendererBusy, ReportRenderer, report_filename
+
+DIGEST_CHUNK_SIZE = 500
+DIGEST_LLM_CONCURRENCY = 8
+
+
+def current_week() -> str:
+    year, week, _ = date.today().isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def _parents_after(db, last_parent_id: int, limit: int) -> list:
+    """Next chunk of (Parent, User) pairs after `last_parent_id` (one statement)."""
+    return (
+        db.query(Parent, User)
+        .join(User, User.username == Parent.student_username)
+        .filter(Parent.id > last_parent_id, Parent.email.isnot(None), Parent.email != "")
+        .order_by(Parent.id)
+        .limit(limit)
+        .all()
+    )
+
+
+def _parents_by_id(db, parent_ids: list) -> list:
+    """(Parent, User) pairs for `parent_ids` that still have an email address."""
+    return (
+        db.query(Parent, User)
+        .join(User, User.username == Parent.student_username)
+        .filter(Parent.id.in_(parent_ids), Parent.email.isnot(None), Parent.email != "")
+        .order_by(Parent.id)
+        .all()
+    )
+
+
+def _failed_ids(run: DigestRun) -> list:
+    return [int(i) for i in (run.failed_parent_ids or "").split(",") if i]
+
+
+def ensure_digest_columns(engine):
+    """Add `digest_runs.failed_parent_ids` to an existing table (lightweight dev-time migration)."""
+    try:
+        cols = {c["name"] for c in inspect(engine).get_columns("digest_runs")}
+        if "failed_parent_ids" not in cols:
+            with engine.begin() as conn:
+                conn.execute(text("ALTER TABLE digest_runs ADD COLUMN failed_parent_ids TEXT"))
+            print("DB migration applied: added columns -> digest_runs.failed_parent_ids", flush=True)
+    except Exception as e:
+        print(f"DB migration error (non-fatal): {e}", flush=True)
+
+
+def _submit_render(renderer: ReportRenderer, rendering: set, report_text: str, child: dict, comparison: dict):
+    """Queue a render, waiting for one of this batch's renders to finish while the queue is full."""
+    while True:
+        try:
+            future = renderer.submit(report_text, child, comparison)
+        except RendererBusy:
+            pending = {f for f in rendering if not f.done()}
+            if not pending:
+                raise  # the queue is held by someone else; count the report as failed
+            wait(pending, return_when=FIRST_COMPLETED)
+            continue
+        rendering.add(future)
+        return future
+
+
+def _process_chunk(db, rows: list, generate, renderer: ReportRenderer, llm_pool: ThreadPoolExecutor) -> tuple:
+    """Generate, render and enqueue (uncommitted) the digests for `rows`; returns (sent, failed parent ids)."""
+    jobs = []
+    for parent, student in rows:
+        child = queries.child_stats(student)
+        comparison = class_stats.comparison(db, student) or queries.class_comparison(db, student)
+        jobs.append((parent, child, comparison))
+
+    failed = []
+    texts = {llm_pool.submit(generate, child, comparison): i for i, (_, child, comparison) in enumerate(jobs)}
+    renders, rendering = {}, set()
+    for future in as_completed(texts):
+        i = texts[future]
+        try:
+            report_text = future.result()
+            _, child, comparison = jobs[i]
+            renders[i] = (report_text, _submit_render(renderer, rendering, report_text, child, comparison))
+        except Exception as e:
+            failed.append(jobs[i][0].id)
+            print(f"⚠️ digest: report for parent {jobs[i][0].id} failed: {e}", flush=True)
+
+    sent = 0
+    for i in sorted(renders):
+        parent, child, _ = jobs[i]
+        report_text, pdf_future = renders[i]
+        try:
+            pdf = pdf_future.result()[0]
+        except Exception as e:
+            failed.append(parent.id)
+            print(f"⚠️ digest: PDF for parent {parent.id} failed: {e}", flush=True)
+            continue
+        subject, body = _digest_email(parent, child, report_text)
+        enqueue_email(db, parent.email, subject, body, pdf, report_filename(child),
+                      owner=parent.username, commit=False)
+        sent += 1
+    return sent, sorted(failed)
+
+
+def _digest_email(parent: Parent, child: dict, report_text: str) -> tuple:
+    name = child["name"] or child["username"]
+    subject = f"Weekly progress digest for {name}"
+    body = f"""Dear {parent.name or parent.username},
+
+Here is this week's progress digest for {name}.
+
+{report_text}
+
+Best regards,
+Toeho Learning Platform
+"""
+    return subject, body
+
+
+def run_weekly_digest(
+    session_factory,
+    week: str | None = None,
+    chunk_size: int = DIGEST_CHUNK_SIZE,
+    llm_concurrency: int = DIGEST_LLM_CONCURRENCY,
+    renderer: ReportRenderer | None = None,
+    generate=generate_parent_report,
+) -> dict:
+    """Run (or resume) the digest for `week`; returns a summary with reports/min."""
+    week = week or current_week()
+    renderer = renderer or ReportRenderer(workers=REPORT_RENDER_WORKERS, max_pending=chunk_size)
+    db = session_factory()
+    llm_pool = ThreadPoolExecutor(max_workers=llm_concurrency, thread_name_prefix="digest-llm")
+    started = time.perf_counter()
+    sent = failed = 0
+    try:
+        run = db.get(DigestRun, week)
+        if run is None:
+            run = DigestRun(run_key=week, last_parent_id=0, reports_sent=0, failures=0,
+                            started_at=datetime.utcnow().isoformat())
+            db.add(run)
+            db.commit()
+        if run.finished_at:
+            print(f"Digest {week} already finished ({run.reports_sent} reports)")
+            return {"week": week, "reports": 0, "failures": 0, "reports_per_minute": 0.0}
+        if run.last_parent_id:
+            print(f"Resuming digest {week} after parent id {run.last_parent_id}")
+
+        leaderboards.rebuild(db)  # rank/percentile without a per-student query
+
+        def record(chunk_sent, chunk_failed, retried=()):
+            # Emails, checkpoint and failed ids commit together: a chunk is either fully queued or redone
+            nonlocal sent, failed
+            sent += chunk_sent
+            failed += len(chunk_failed)
+            still_failed = (set(_failed_ids(run)) - set(retried)) | set(chunk_failed)
+            run.failed_parent_ids = ",".join(str(i) for i in sorted(still_failed)) or None
+            run.reports_sent += chunk_sent
+            run.failures = (run.failures or 0) + len(chunk_failed)
+            db.commit()
+
+        retry_ids = _failed_ids(run)
+        if retry_ids:
+            print(f"Retrying {len(retry_ids)} parents whose digest {week} failed", flush=True)
+            for start in range(0, len(retry_ids), chunk_size):
+                batch = retry_ids[start:start + chunk_size]
+                rows = _parents_by_id(db, batch)
+                record(*_process_chunk(db, rows, generate, renderer, llm_pool), retried=batch)
+
+        while True:
+            chunk_started = time.perf_counter()
+            rows = _parents_after(db, run.last_parent_id, chunk_size)
+            if not rows:
+                break
+
+            chunk_sent, chunk_failed = _process_chunk(db, rows, generate, renderer, llm_pool)
+            run.last_parent_id = rows[-1][0].id
+            record(chunk_sent, chunk_failed)
+
+            elapsed = time.perf_counter() - chunk_started
+            print(f"digest {week}: {run.reports_sent} queued up to parent {run.last_parent_id} "
+                  f"({chunk_sent / elapsed * 60:.0f} reports/min this chunk)", flush=True)
+
+        if run.failed_parent_ids:
+            print(f"Digest {week} not finished: run it again to retry parents {run.failed_parent_ids}", flush=True)
+        else:
+            run.finished_at = datetime.utcnow().isoformat()
+        db.commit()
+    finally:
+        llm_pool.shutdown(wait=True, cancel_futures=True)
+        renderer.shutdown()
+        db.close()
+
+    elapsed = time.perf_counter() - started
+    rate = sent / elapsed * 60 if elapsed > 0 else 0.0
+    print(f"Digest {week}: {sent} reports queued, {failed} failed, {rate:.0f} reports/min")
+    return {"week": week, "reports": sent, "failures": failed, "reports_per_minute": rate}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Email every parent a weekly PDF progress digest.")
+    parser.add_argument("--week", default=None, help="run key, default: current ISO week (e.g. 2026-W42)")
+    parser.add_argument("--chunk-size", type=int, default=DIGEST_CHUNK_SIZE)
+    parser.add_argument("--llm-concurrency", type=int, default=DIGEST_LLM_CONCURRENCY)
+    parser.add_argument("--render-workers", type=int, default=REPORT_RENDER_WORKERS)
+    args = parser.parse_args()
+
+    from database import Base, SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    ensure_digest_columns(engine)
+    summary = run_weekly_digest(
+        SessionLocal,
+        week=args.week,
+        chunk_size=args.chunk_size,
+        llm_concurrency=args.llm_concurrency,
+        renderer=ReportRenderer(workers=args.render_workers, max_pending=args.chunk_size),
+    )
+    sys.exit(0 if summary["failures"] == 0 else 1)
@@ -218,7 +218,7 @@ export async function generateParentReport(token) {
   }
 
   try {
-    const res = await fetch(`${API_URL}/parent/generate`, {
+    const res = await fetch(`${API_URL}/parents/report/email`, {
       method: "POST",
       headers: {
         "Authorization": `Bearer ${token}`,